@@ -0,0 +1,62 @@
+"""keyset pagination indexes
+
+Revision ID: 42f99b44c9e4
+Revises: 8c338beb037c
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "42f99b44c9e4"
+down_revision = "8c338beb037c"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_bug_tracker_users_create_dt_id",
+        "bug_tracker_users",
+        ["create_dt", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_bug_tracker_bugs_create_dt_id",
+        "bug_tracker_bugs",
+        ["create_dt", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_bug_tracker_bugs_author_id_create_dt_id",
+        "bug_tracker_bugs",
+        ["author_id", "create_dt", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_bug_tracker_bugs_assignee_id_create_dt_id",
+        "bug_tracker_bugs",
+        ["assignee_id", "create_dt", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_bug_tracker_comments_author_id_create_dt_id",
+        "bug_tracker_comments",
+        ["author_id", "create_dt", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_bug_tracker_comments_bug_id_create_dt_id",
+        "bug_tracker_comments",
+        ["bug_id", "create_dt", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_bug_tracker_comments_bug_id_create_dt_id", table_name="bug_tracker_comments")
+    op.drop_index("ix_bug_tracker_comments_author_id_create_dt_id", table_name="bug_tracker_comments")
+    op.drop_index("ix_bug_tracker_bugs_assignee_id_create_dt_id", table_name="bug_tracker_bugs")
+    op.drop_index("ix_bug_tracker_bugs_author_id_create_dt_id", table_name="bug_tracker_bugs")
+    op.drop_index("ix_bug_tracker_bugs_create_dt_id", table_name="bug_tracker_bugs")
+    op.drop_index("ix_bug_tracker_users_create_dt_id", table_name="bug_tracker_users")
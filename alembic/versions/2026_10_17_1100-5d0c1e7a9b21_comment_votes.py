@@ -0,0 +1,44 @@
+"""comment votes
+
+Revision ID: 5d0c1e7a9b21
+Revises: 42f99b44c9e4
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5d0c1e7a9b21"
+down_revision = "42f99b44c9e4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "bug_tracker_votes",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column(
+            "create_dt",
+            postgresql.TIMESTAMP(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("update_dt", postgresql.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column("comment_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("value", sa.SmallInteger(), nullable=False),
+        sa.ForeignKeyConstraint(["comment_id"], ["bug_tracker_comments.id"], ondelete="cascade"),
+        sa.ForeignKeyConstraint(["user_id"], ["bug_tracker_users.id"], ondelete="cascade"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("comment_id", "user_id", name="uq_bug_tracker_votes_comment_id_user_id"),
+    )
+    op.create_index(op.f("ix_bug_tracker_votes_user_id"), "bug_tracker_votes", ["user_id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_bug_tracker_votes_user_id"), table_name="bug_tracker_votes")
+    op.drop_table("bug_tracker_votes")
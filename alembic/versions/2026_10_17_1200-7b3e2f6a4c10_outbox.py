@@ -0,0 +1,62 @@
+"""outbox
+
+Revision ID: 7b3e2f6a4c10
+Revises: 5d0c1e7a9b21
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "7b3e2f6a4c10"
+down_revision = "5d0c1e7a9b21"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "bug_tracker_outbox",
+        sa.Column("id", sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column(
+            "create_dt",
+            postgresql.TIMESTAMP(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("aggregate_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("event_name", sa.String(length=255), nullable=False),
+        sa.Column("event_data", sa.JSON(), nullable=False),
+        sa.Column("attempts", sa.Integer(), server_default="0", nullable=False),
+        sa.Column(
+            "available_at",
+            postgresql.TIMESTAMP(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("failed_at", postgresql.TIMESTAMP(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_bug_tracker_outbox_aggregate_id_id",
+        "bug_tracker_outbox",
+        ["aggregate_id", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_bug_tracker_outbox_available_at_id",
+        "bug_tracker_outbox",
+        ["available_at", "id"],
+        unique=False,
+        postgresql_where=sa.text("failed_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_bug_tracker_outbox_available_at_id", table_name="bug_tracker_outbox")
+    op.drop_index("ix_bug_tracker_outbox_aggregate_id_id", table_name="bug_tracker_outbox")
+    op.drop_table("bug_tracker_outbox")
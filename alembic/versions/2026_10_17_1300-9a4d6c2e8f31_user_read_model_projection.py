@@ -0,0 +1,120 @@
+"""user read model projection
+
+Revision ID: 9a4d6c2e8f31
+Revises: 7b3e2f6a4c10
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "9a4d6c2e8f31"
+down_revision = "7b3e2f6a4c10"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE SEQUENCE bug_tracker_event_store_seq")
+    op.add_column("bug_tracker_event_store", sa.Column("seq", sa.BigInteger(), nullable=True))
+    op.add_column("bug_tracker_event_store", sa.Column("txid", sa.BigInteger(), nullable=True))
+    # existing rows keep their create_dt order, all of their transactions are long finished so txid 0 is fine
+    op.execute(
+        """
+        UPDATE bug_tracker_event_store AS e
+        SET seq = ordered.seq, txid = 0
+        FROM (
+            SELECT id, nextval('bug_tracker_event_store_seq') AS seq
+            FROM (SELECT id FROM bug_tracker_event_store ORDER BY create_dt, id) AS by_time
+        ) AS ordered
+        WHERE e.id = ordered.id
+        """
+    )
+    op.alter_column(
+        "bug_tracker_event_store",
+        "seq",
+        nullable=False,
+        server_default=sa.text("nextval('bug_tracker_event_store_seq')"),
+    )
+    op.alter_column(
+        "bug_tracker_event_store",
+        "txid",
+        nullable=False,
+        server_default=sa.text("txid_current()"),
+    )
+    op.create_index("ix_bug_tracker_event_store_txid_seq", "bug_tracker_event_store", ["txid", "seq"], unique=False)
+
+    op.create_index(
+        "ix_bug_tracker_user_read_model_create_dt_id",
+        "bug_tracker_user_read_model",
+        ["create_dt", "id"],
+        unique=False,
+    )
+    op.create_table(
+        "bug_tracker_projection_checkpoints",
+        sa.Column("name", sa.String(length=100), nullable=False),
+        sa.Column("txid", sa.BigInteger(), nullable=False),
+        sa.Column("seq", sa.BigInteger(), nullable=False),
+        sa.Column("update_dt", postgresql.TIMESTAMP(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("name"),
+    )
+    op.create_table(
+        "bug_tracker_projection_bug_state",
+        sa.Column("bug_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("author_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("assignee_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("status", sa.String(length=50), nullable=False),
+        sa.Column("record_status", sa.String(length=50), nullable=False),
+        sa.PrimaryKeyConstraint("bug_id"),
+    )
+    op.create_index(
+        op.f("ix_bug_tracker_projection_bug_state_author_id"),
+        "bug_tracker_projection_bug_state",
+        ["author_id"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_bug_tracker_projection_bug_state_assignee_id"),
+        "bug_tracker_projection_bug_state",
+        ["assignee_id"],
+        unique=False,
+    )
+    op.create_table(
+        "bug_tracker_projection_comment_state",
+        sa.Column("comment_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("author_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("vote_count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("comment_id"),
+    )
+    op.create_index(
+        op.f("ix_bug_tracker_projection_comment_state_author_id"),
+        "bug_tracker_projection_comment_state",
+        ["author_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        op.f("ix_bug_tracker_projection_comment_state_author_id"),
+        table_name="bug_tracker_projection_comment_state",
+    )
+    op.drop_table("bug_tracker_projection_comment_state")
+    op.drop_index(
+        op.f("ix_bug_tracker_projection_bug_state_assignee_id"),
+        table_name="bug_tracker_projection_bug_state",
+    )
+    op.drop_index(
+        op.f("ix_bug_tracker_projection_bug_state_author_id"),
+        table_name="bug_tracker_projection_bug_state",
+    )
+    op.drop_table("bug_tracker_projection_bug_state")
+    op.drop_table("bug_tracker_projection_checkpoints")
+    op.drop_index("ix_bug_tracker_user_read_model_create_dt_id", table_name="bug_tracker_user_read_model")
+    op.drop_index("ix_bug_tracker_event_store_txid_seq", table_name="bug_tracker_event_store")
+    op.drop_column("bug_tracker_event_store", "txid")
+    op.drop_column("bug_tracker_event_store", "seq")
+    op.execute("DROP SEQUENCE bug_tracker_event_store_seq")
@@ -0,0 +1,34 @@
+"""replay progress
+
+Revision ID: c41e8b7d2a55
+Revises: 9a4d6c2e8f31
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c41e8b7d2a55"
+down_revision = "9a4d6c2e8f31"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "bug_tracker_replay_progress",
+        sa.Column("name", sa.String(length=100), nullable=False),
+        sa.Column("bound_txid", sa.BigInteger(), nullable=False),
+        sa.Column("last_aggregate_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("events", sa.BigInteger(), nullable=False),
+        sa.Column("create_dt", postgresql.TIMESTAMP(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("update_dt", postgresql.TIMESTAMP(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("bug_tracker_replay_progress")
@@ -0,0 +1,33 @@
+"""aggregate snapshots
+
+Revision ID: e5a7f9c3b812
+Revises: c41e8b7d2a55
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e5a7f9c3b812"
+down_revision = "c41e8b7d2a55"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "bug_tracker_snapshots",
+        sa.Column("aggregate_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("last_seq", sa.BigInteger(), nullable=False),
+        sa.Column("state", sa.JSON(), nullable=False),
+        sa.Column("create_dt", postgresql.TIMESTAMP(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("aggregate_id", "version"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("bug_tracker_snapshots")
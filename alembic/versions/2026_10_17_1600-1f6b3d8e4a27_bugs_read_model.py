@@ -0,0 +1,69 @@
+"""bugs read model
+
+Revision ID: 1f6b3d8e4a27
+Revises: e5a7f9c3b812
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "1f6b3d8e4a27"
+down_revision = "e5a7f9c3b812"
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "ix_bug_tracker_bugs_read_model_created_dt_bug_id": ["bug_created_dt", "bug_id"],
+    "ix_bug_tracker_bugs_read_model_status_created_dt": ["status", "bug_created_dt", "bug_id"],
+    "ix_bug_tracker_bugs_read_model_urgency_created_dt": ["urgency", "bug_created_dt", "bug_id"],
+    "ix_bug_tracker_bugs_read_model_environment_created_dt": ["environment", "bug_created_dt", "bug_id"],
+    "ix_bug_tracker_bugs_read_model_assignee_created_dt": ["assigned_user_id", "bug_created_dt", "bug_id"],
+    "ix_bug_tracker_bugs_read_model_author_created_dt": ["author_id", "bug_created_dt", "bug_id"],
+}
+
+
+def upgrade() -> None:
+    op.create_table(
+        "bug_tracker_bugs_read_model",
+        sa.Column("bug_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("bug_created_dt", postgresql.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("bug_updated_dt", postgresql.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("title", sa.String(length=50), nullable=False),
+        sa.Column("author_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("assigned_user_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("description", sa.Text(), nullable=False),
+        sa.Column("environment", sa.String(length=50), nullable=False),
+        sa.Column("urgency", sa.String(length=50), nullable=False),
+        sa.Column("status", sa.String(length=50), nullable=False),
+        sa.Column("record_status", sa.String(length=50), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("edited", sa.Boolean(), nullable=True),
+        sa.Column("images", sa.ARRAY(sa.String(length=255)), nullable=True),
+        sa.Column("author_create_dt", postgresql.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column("author_update_dt", postgresql.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column("author_username", sa.String(length=100), nullable=True),
+        sa.Column("author_email", sa.String(length=100), nullable=True),
+        sa.Column("author_user_type", sa.String(length=50), nullable=True),
+        sa.Column("author_user_status", sa.String(length=50), nullable=True),
+        sa.Column("author_is_admin", sa.Boolean(), nullable=True),
+        sa.Column("assignee_create_dt", postgresql.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column("assignee_update_dt", postgresql.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column("assignee_username", sa.String(length=100), nullable=True),
+        sa.Column("assignee_email", sa.String(length=100), nullable=True),
+        sa.Column("assignee_user_type", sa.String(length=50), nullable=True),
+        sa.Column("assignee_user_status", sa.String(length=50), nullable=True),
+        sa.Column("assignee_is_admin", sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint("bug_id"),
+    )
+    for name, columns in INDEXES.items():
+        op.create_index(name, "bug_tracker_bugs_read_model", columns, unique=False)
+
+
+def downgrade() -> None:
+    for name in INDEXES:
+        op.drop_index(name, table_name="bug_tracker_bugs_read_model")
+    op.drop_table("bug_tracker_bugs_read_model")
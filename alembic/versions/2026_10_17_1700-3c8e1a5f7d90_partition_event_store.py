@@ -0,0 +1,111 @@
+"""partition the event store by month, jsonb event data
+
+Revision ID: 3c8e1a5f7d90
+Revises: 1f6b3d8e4a27
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "3c8e1a5f7d90"
+down_revision = "1f6b3d8e4a27"
+branch_labels = None
+depends_on = None
+
+TABLE = "bug_tracker_event_store"
+OLD = f"{TABLE}_old"
+COLUMNS = "id, create_dt, aggregate_id, event_name, event_data, seq, txid"
+INDEXES = {
+    "ix_bug_tracker_event_store_id": ["id"],
+    "ix_bug_tracker_event_store_aggregate_id": ["aggregate_id"],
+    "ix_bug_tracker_event_store_txid_seq": ["txid", "seq"],
+}
+PARTITIONED_INDEXES = {
+    **INDEXES,
+    "ix_bug_tracker_event_store_event_name_create_dt": ["event_name", "create_dt"],
+}
+MONTHS_AHEAD = 3
+
+
+def _columns(event_data) -> list[sa.Column]:
+    return [
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("create_dt", postgresql.TIMESTAMP(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("aggregate_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("event_name", sa.String(length=255), nullable=False),
+        sa.Column("event_data", event_data, nullable=False),
+        sa.Column(
+            "seq", sa.BigInteger(), server_default=sa.text("nextval('bug_tracker_event_store_seq')"), nullable=False
+        ),
+        sa.Column("txid", sa.BigInteger(), server_default=sa.text("txid_current()"), nullable=False),
+    ]
+
+
+def _set_aside():
+    op.rename_table(TABLE, OLD)
+    op.execute(f"ALTER TABLE {OLD} RENAME CONSTRAINT {TABLE}_pkey TO {OLD}_pkey")
+    for name in INDEXES:
+        op.drop_index(name, table_name=OLD)
+
+
+def upgrade() -> None:
+    _set_aside()
+    op.create_table(
+        TABLE,
+        *_columns(postgresql.JSONB()),
+        sa.PrimaryKeyConstraint("id", "create_dt"),
+        postgresql_partition_by="RANGE (create_dt)",
+    )
+    op.execute(f"CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT")
+    # a partition for every month there are events for and a few ahead, make partitions keeps it going from here
+    op.execute(
+        f"""
+        DO $$
+        DECLARE month timestamptz;
+        BEGIN
+            FOR month IN
+                SELECT generate_series(
+                    date_trunc('month', COALESCE((SELECT min(create_dt) FROM {OLD}), now()) AT TIME ZONE 'UTC'),
+                    date_trunc('month', now() AT TIME ZONE 'UTC') + interval '{MONTHS_AHEAD} months',
+                    interval '1 month'
+                ) AT TIME ZONE 'UTC'
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF {TABLE} FOR VALUES FROM (%L) TO (%L)',
+                    '{TABLE}_' || to_char(month AT TIME ZONE 'UTC', '"y"YYYY"m"MM'),
+                    month,
+                    month + interval '1 month'
+                );
+            END LOOP;
+        END $$
+        """
+    )
+    op.execute(
+        f"INSERT INTO {TABLE} ({COLUMNS}) "
+        f"SELECT id, COALESCE(create_dt, now()), aggregate_id, event_name, event_data::jsonb, seq, txid FROM {OLD}"
+    )
+    op.drop_table(OLD)
+    for name, columns in PARTITIONED_INDEXES.items():
+        op.create_index(name, TABLE, columns, unique=False)
+    op.create_index("ix_bug_tracker_event_store_event_data", TABLE, ["event_data"], postgresql_using="gin")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_bug_tracker_event_store_event_data", table_name=TABLE)
+    for name in PARTITIONED_INDEXES:
+        op.drop_index(name, table_name=TABLE)
+    op.rename_table(TABLE, OLD)
+    op.execute(f"ALTER TABLE {OLD} RENAME CONSTRAINT {TABLE}_pkey TO {OLD}_pkey")
+    op.create_table(TABLE, *_columns(sa.JSON()), sa.PrimaryKeyConstraint("id"))
+    op.execute(
+        f"INSERT INTO {TABLE} ({COLUMNS}) "
+        f"SELECT id, create_dt, aggregate_id, event_name, event_data::json, seq, txid FROM {OLD}"
+    )
+    # takes every partition, detached ones were already archived and aren't coming back
+    op.drop_table(OLD)
+    for name, columns in INDEXES.items():
+        op.create_index(name, TABLE, columns, unique=False)
@@ -0,0 +1,39 @@
+"""event archive for compacted aggregates
+
+Revision ID: 6e2d4b9a1c53
+Revises: 3c8e1a5f7d90
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "6e2d4b9a1c53"
+down_revision = "3c8e1a5f7d90"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "bug_tracker_event_archive",
+        sa.Column("id", sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column("aggregate_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("first_seq", sa.BigInteger(), nullable=False),
+        sa.Column("last_seq", sa.BigInteger(), nullable=False),
+        sa.Column("event_count", sa.Integer(), nullable=False),
+        sa.Column("payload", sa.LargeBinary(), nullable=False),
+        sa.Column("archive_dt", postgresql.TIMESTAMP(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_bug_tracker_event_archive_aggregate_id"), "bug_tracker_event_archive", ["aggregate_id"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_bug_tracker_event_archive_aggregate_id"), table_name="bug_tracker_event_archive")
+    op.drop_table("bug_tracker_event_archive")
@@ -0,0 +1,24 @@
+"""version column on users for optimistic locking
+
+Revision ID: 9a7c2e4f1b86
+Revises: 6e2d4b9a1c53
+Create Date: 2026-10-17 19:00:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "9a7c2e4f1b86"
+down_revision = "6e2d4b9a1c53"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("bug_tracker_users", sa.Column("version", sa.Integer(), server_default="1", nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column("bug_tracker_users", "version")
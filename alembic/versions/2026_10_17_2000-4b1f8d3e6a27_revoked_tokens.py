@@ -0,0 +1,43 @@
+"""revoked tokens
+
+Revision ID: 4b1f8d3e6a27
+Revises: 9a7c2e4f1b86
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "4b1f8d3e6a27"
+down_revision = "9a7c2e4f1b86"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "bug_tracker_revoked_tokens",
+        sa.Column("id", sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column("create_dt", postgresql.TIMESTAMP(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("jti", sa.String(length=64), nullable=True),
+        sa.Column("expires_at", postgresql.TIMESTAMP(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["bug_tracker_users.id"], ondelete="cascade"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("jti"),
+    )
+    op.create_index(
+        op.f("ix_bug_tracker_revoked_tokens_user_id"), "bug_tracker_revoked_tokens", ["user_id"], unique=False
+    )
+    op.create_index(
+        op.f("ix_bug_tracker_revoked_tokens_expires_at"), "bug_tracker_revoked_tokens", ["expires_at"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_bug_tracker_revoked_tokens_expires_at"), table_name="bug_tracker_revoked_tokens")
+    op.drop_index(op.f("ix_bug_tracker_revoked_tokens_user_id"), table_name="bug_tracker_revoked_tokens")
+    op.drop_table("bug_tracker_revoked_tokens")
@@ -0,0 +1,31 @@
+"""users email index
+
+Revision ID: d83a5c1f7e42
+Revises: 4b1f8d3e6a27
+Create Date: 2026-10-17 21:00:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "d83a5c1f7e42"
+down_revision = "4b1f8d3e6a27"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # fails on active users already sharing an email up to case, those have to be merged or deleted first
+    op.create_index(
+        "uq_bug_tracker_users_lower_email_active",
+        "bug_tracker_users",
+        [sa.text("lower(email)")],
+        unique=True,
+        postgresql_where=sa.text("user_status = 'active'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_bug_tracker_users_lower_email_active", table_name="bug_tracker_users")
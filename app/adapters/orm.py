@@ -41,6 +41,16 @@ users = sa.Table(
     sa.Column("is_admin", sa.Boolean),
     sa.Column("security_question", sa.Text, nullable=False),
     sa.Column("security_question_answer", sa.Text, nullable=False),
+    sa.Column("version", sa.Integer, nullable=False, default=1, server_default="1"),
+    # keyset pagination indexes, see app.utils.helpers.set_keyset_pagination
+    sa.Index("ix_bug_tracker_users_create_dt_id", "create_dt", "id"),
+    # one active user per email whatever its case, serves the login lookup and fails a duplicate sign up's insert
+    sa.Index(
+        "uq_bug_tracker_users_lower_email_active",
+        sa.text("lower(email)"),
+        unique=True,
+        postgresql_where=sa.text("user_status = 'active'"),
+    ),
 )
 
 
@@ -89,6 +99,9 @@ bugs = sa.Table(
     sa.Column("status", sa.String(length=50), nullable=False),
     sa.Column("record_status", sa.String(length=50), nullable=False),
     sa.Column("version", sa.Integer, nullable=False, default=1),
+    sa.Index("ix_bug_tracker_bugs_create_dt_id", "create_dt", "id"),
+    sa.Index("ix_bug_tracker_bugs_author_id_create_dt_id", "author_id", "create_dt", "id"),
+    sa.Index("ix_bug_tracker_bugs_assignee_id_create_dt_id", "assignee_id", "create_dt", "id"),
 )
 
 comments = sa.Table(
@@ -130,9 +143,81 @@ comments = sa.Table(
     sa.Column("text", sa.Text, nullable=False),
     sa.Column("vote_count", sa.Integer, nullable=False),
     sa.Column("edited", sa.Boolean),
+    sa.Index("ix_bug_tracker_comments_author_id_create_dt_id", "author_id", "create_dt", "id"),
+    sa.Index("ix_bug_tracker_comments_bug_id_create_dt_id", "bug_id", "create_dt", "id"),
 )
 
 
+# one row per user per comment, value is 1 or -1
+votes = sa.Table(
+    "bug_tracker_votes",
+    mapper_registry.metadata,
+    sa.Column(
+        "id",
+        postgresql.UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid4,
+    ),
+    sa.Column(
+        "create_dt",
+        postgresql.TIMESTAMP(timezone=True),
+        default=sa.func.now(),
+        server_default=sa.func.now(),
+        nullable=False,
+    ),
+    sa.Column(
+        "update_dt",
+        postgresql.TIMESTAMP(timezone=True),
+        onupdate=sa.func.current_timestamp(),
+    ),
+    sa.Column(
+        "comment_id",
+        postgresql.UUID(as_uuid=True),
+        sa.ForeignKey(f"{comments.name}.id", ondelete="cascade"),
+        nullable=False,
+    ),
+    sa.Column(
+        "user_id",
+        postgresql.UUID(as_uuid=True),
+        sa.ForeignKey(f"{users.name}.id", ondelete="cascade"),
+        index=True,
+        nullable=False,
+    ),
+    sa.Column("value", sa.SmallInteger, nullable=False),
+    sa.UniqueConstraint("comment_id", "user_id", name="uq_bug_tracker_votes_comment_id_user_id"),
+)
+
+
+# revoked tokens, mirrored in every worker by TokenRevocations
+# a row without a jti revokes every token of its user issued before create_dt
+# expires_at is when the row stops mattering, the token's exp or the longest a token issued before it lives
+revoked_tokens = sa.Table(
+    "bug_tracker_revoked_tokens",
+    mapper_registry.metadata,
+    sa.Column("id", sa.BigInteger, primary_key=True, autoincrement=True),
+    sa.Column(
+        "create_dt",
+        postgresql.TIMESTAMP(timezone=True),
+        default=sa.func.now(),
+        server_default=sa.func.now(),
+        nullable=False,
+    ),
+    sa.Column(
+        "user_id",
+        postgresql.UUID(as_uuid=True),
+        sa.ForeignKey(f"{users.name}.id", ondelete="cascade"),
+        index=True,
+        nullable=False,
+    ),
+    sa.Column("jti", sa.String(length=64), nullable=True, unique=True),
+    sa.Column("expires_at", postgresql.TIMESTAMP(timezone=True), index=True, nullable=False),
+)
+
+
+event_store_seq: sa.Sequence = sa.Sequence("bug_tracker_event_store_seq", metadata=mapper_registry.metadata)
+
+# range partitioned by create_dt month, see app/service/event_store/partitions.py
+# create_dt is in the primary key only because a partitioned table's keys have to include it
 event_store = sa.Table(
     "bug_tracker_event_store",
     mapper_registry.metadata,
@@ -146,6 +231,7 @@ event_store = sa.Table(
     sa.Column(
         "create_dt",
         postgresql.TIMESTAMP(timezone=True),
+        primary_key=True,
         default=sa.func.now(),
         server_default=sa.func.now(),
         nullable=False,
@@ -156,7 +242,92 @@ event_store = sa.Table(
         index=True,
     ),
     sa.Column("event_name", sa.String(length=255), nullable=False),
+    sa.Column("event_data", postgresql.JSONB, nullable=False),
+    # projections read in (txid, seq) order and only below the oldest running transaction,
+    # so an event committed late can never land behind their checkpoint
+    sa.Column("seq", sa.BigInteger, server_default=sa.text(f"nextval('{event_store_seq.name}')"), nullable=False),
+    sa.Column("txid", sa.BigInteger, server_default=sa.text("txid_current()"), nullable=False),
+    sa.Index("ix_bug_tracker_event_store_txid_seq", "txid", "seq"),
+    sa.Index("ix_bug_tracker_event_store_event_name_create_dt", "event_name", "create_dt"),
+    sa.Index("ix_bug_tracker_event_store_event_data", "event_data", postgresql_using="gin"),
+    postgresql_partition_by="RANGE (create_dt)",
+)
+
+# months without a partition of their own land here instead of failing the insert
+sa.event.listen(
+    event_store,
+    "after_create",
+    sa.DDL(f"CREATE TABLE {event_store.name}_default PARTITION OF {event_store.name} DEFAULT"),
+)
+
+# events the compaction job folded away, payload is zlib compressed json, see app/service/event_store/compaction.py
+event_archive = sa.Table(
+    "bug_tracker_event_archive",
+    mapper_registry.metadata,
+    sa.Column("id", sa.BigInteger, primary_key=True, autoincrement=True),
+    sa.Column("aggregate_id", postgresql.UUID(as_uuid=True), nullable=False, index=True),
+    sa.Column("first_seq", sa.BigInteger, nullable=False),
+    sa.Column("last_seq", sa.BigInteger, nullable=False),
+    sa.Column("event_count", sa.Integer, nullable=False),
+    sa.Column("payload", sa.LargeBinary, nullable=False),
+    sa.Column(
+        "archive_dt",
+        postgresql.TIMESTAMP(timezone=True),
+        default=sa.func.now(),
+        server_default=sa.func.now(),
+        nullable=False,
+    ),
+)
+
+# an aggregate's state after its first `version` events, last_seq being the event store seq of the last of them
+snapshots = sa.Table(
+    "bug_tracker_snapshots",
+    mapper_registry.metadata,
+    sa.Column("aggregate_id", postgresql.UUID(as_uuid=True), primary_key=True),
+    sa.Column("version", sa.Integer, primary_key=True),
+    sa.Column("last_seq", sa.BigInteger, nullable=False),
+    sa.Column("state", sa.JSON, nullable=False),
+    sa.Column(
+        "create_dt",
+        postgresql.TIMESTAMP(timezone=True),
+        default=sa.func.now(),
+        server_default=sa.func.now(),
+        nullable=False,
+    ),
+)
+
+# events waiting for their handlers, written in the same transaction as the change that raised them
+outbox = sa.Table(
+    "bug_tracker_outbox",
+    mapper_registry.metadata,
+    sa.Column("id", sa.BigInteger, primary_key=True, autoincrement=True),
+    sa.Column(
+        "create_dt",
+        postgresql.TIMESTAMP(timezone=True),
+        default=sa.func.now(),
+        server_default=sa.func.now(),
+        nullable=False,
+    ),
+    sa.Column("aggregate_id", postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column("event_name", sa.String(length=255), nullable=False),
     sa.Column("event_data", sa.JSON, nullable=False),
+    sa.Column("attempts", sa.Integer, default=0, server_default="0", nullable=False),
+    sa.Column(
+        "available_at",
+        postgresql.TIMESTAMP(timezone=True),
+        default=sa.func.now(),
+        server_default=sa.func.now(),
+        nullable=False,
+    ),
+    sa.Column("last_error", sa.Text, nullable=True),
+    sa.Column("failed_at", postgresql.TIMESTAMP(timezone=True), nullable=True),  # gave up after max attempts
+    sa.Index("ix_bug_tracker_outbox_aggregate_id_id", "aggregate_id", "id"),
+    sa.Index(
+        "ix_bug_tracker_outbox_available_at_id",
+        "available_at",
+        "id",
+        postgresql_where=sa.text("failed_at IS NULL"),
+    ),
 )
 
 user_read_model = sa.Table(
@@ -191,6 +362,104 @@ user_read_model = sa.Table(
     sa.Column("bugs_assigned_to_count", sa.Integer, default=0, nullable=False),
     sa.Column("bugs_closed_count", sa.Integer, default=0, nullable=False),
     sa.Column("votes_count", sa.Integer, default=0, nullable=False),
+    sa.Index("ix_bug_tracker_user_read_model_create_dt_id", "create_dt", "id"),
+)
+
+# one row per bug with its author and assignee flattened in, every list reads a single index range of it
+bugs_read_model = sa.Table(
+    "bug_tracker_bugs_read_model",
+    mapper_registry.metadata,
+    sa.Column("bug_id", postgresql.UUID(as_uuid=True), primary_key=True),
+    sa.Column("bug_created_dt", postgresql.TIMESTAMP(timezone=True), nullable=False),
+    sa.Column("bug_updated_dt", postgresql.TIMESTAMP(timezone=True), nullable=False),
+    sa.Column("title", sa.String(length=50), nullable=False),
+    sa.Column("author_id", postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column("assigned_user_id", postgresql.UUID(as_uuid=True), nullable=True),
+    sa.Column("description", sa.Text, nullable=False),
+    sa.Column("environment", sa.String(length=50), nullable=False),
+    sa.Column("urgency", sa.String(length=50), nullable=False),
+    sa.Column("status", sa.String(length=50), nullable=False),
+    sa.Column("record_status", sa.String(length=50), nullable=False),
+    sa.Column("version", sa.Integer, nullable=False),
+    sa.Column("edited", sa.Boolean),
+    sa.Column("images", sa.ARRAY(sa.String(255)), nullable=True),
+    # filled from bug_tracker_users by the projector, null until then
+    sa.Column("author_create_dt", postgresql.TIMESTAMP(timezone=True), nullable=True),
+    sa.Column("author_update_dt", postgresql.TIMESTAMP(timezone=True), nullable=True),
+    sa.Column("author_username", sa.String(length=100), nullable=True),
+    sa.Column("author_email", sa.String(length=100), nullable=True),
+    sa.Column("author_user_type", sa.String(length=50), nullable=True),
+    sa.Column("author_user_status", sa.String(length=50), nullable=True),
+    sa.Column("author_is_admin", sa.Boolean, nullable=True),
+    sa.Column("assignee_create_dt", postgresql.TIMESTAMP(timezone=True), nullable=True),
+    sa.Column("assignee_update_dt", postgresql.TIMESTAMP(timezone=True), nullable=True),
+    sa.Column("assignee_username", sa.String(length=100), nullable=True),
+    sa.Column("assignee_email", sa.String(length=100), nullable=True),
+    sa.Column("assignee_user_type", sa.String(length=50), nullable=True),
+    sa.Column("assignee_user_status", sa.String(length=50), nullable=True),
+    sa.Column("assignee_is_admin", sa.Boolean, nullable=True),
+    # each filter leads with its own column so a filtered, newest first page is one index range
+    sa.Index("ix_bug_tracker_bugs_read_model_created_dt_bug_id", "bug_created_dt", "bug_id"),
+    sa.Index("ix_bug_tracker_bugs_read_model_status_created_dt", "status", "bug_created_dt", "bug_id"),
+    sa.Index("ix_bug_tracker_bugs_read_model_urgency_created_dt", "urgency", "bug_created_dt", "bug_id"),
+    sa.Index("ix_bug_tracker_bugs_read_model_environment_created_dt", "environment", "bug_created_dt", "bug_id"),
+    sa.Index("ix_bug_tracker_bugs_read_model_assignee_created_dt", "assigned_user_id", "bug_created_dt", "bug_id"),
+    sa.Index("ix_bug_tracker_bugs_read_model_author_created_dt", "author_id", "bug_created_dt", "bug_id"),
+)
+
+# projection bookkeeping, only the projectors read or write these
+projection_checkpoints = sa.Table(
+    "bug_tracker_projection_checkpoints",
+    mapper_registry.metadata,
+    sa.Column("name", sa.String(length=100), primary_key=True),
+    sa.Column("txid", sa.BigInteger, nullable=False),
+    sa.Column("seq", sa.BigInteger, nullable=False),
+    sa.Column(
+        "update_dt",
+        postgresql.TIMESTAMP(timezone=True),
+        default=sa.func.now(),
+        onupdate=sa.func.current_timestamp(),
+    ),
+)
+
+projection_bug_state = sa.Table(
+    "bug_tracker_projection_bug_state",
+    mapper_registry.metadata,
+    sa.Column("bug_id", postgresql.UUID(as_uuid=True), primary_key=True),
+    sa.Column("author_id", postgresql.UUID(as_uuid=True), index=True, nullable=False),
+    sa.Column("assignee_id", postgresql.UUID(as_uuid=True), index=True, nullable=True),
+    sa.Column("status", sa.String(length=50), nullable=False),
+    sa.Column("record_status", sa.String(length=50), nullable=False),
+)
+
+projection_comment_state = sa.Table(
+    "bug_tracker_projection_comment_state",
+    mapper_registry.metadata,
+    sa.Column("comment_id", postgresql.UUID(as_uuid=True), primary_key=True),
+    sa.Column("author_id", postgresql.UUID(as_uuid=True), index=True, nullable=False),
+    sa.Column("vote_count", sa.Integer, default=0, nullable=False),
+)
+
+# where a replay into the shadow tables got to, it only ever replays events below bound_txid
+replay_progress = sa.Table(
+    "bug_tracker_replay_progress",
+    mapper_registry.metadata,
+    sa.Column("name", sa.String(length=100), primary_key=True),
+    sa.Column("bound_txid", sa.BigInteger, nullable=False),
+    sa.Column("last_aggregate_id", postgresql.UUID(as_uuid=True), nullable=True),
+    sa.Column("events", sa.BigInteger, default=0, nullable=False),
+    sa.Column(
+        "create_dt",
+        postgresql.TIMESTAMP(timezone=True),
+        default=sa.func.now(),
+        server_default=sa.func.now(),
+        nullable=False,
+    ),
+    sa.Column(
+        "update_dt",
+        postgresql.TIMESTAMP(timezone=True),
+        onupdate=sa.func.current_timestamp(),
+    ),
 )
 
 
@@ -205,9 +474,13 @@ def receive_load_user_application_queue(users: models.Users, _):
 
 
 def start_mappers():
+    # optimistic locking, an UPDATE or DELETE only matches the row at the version it was loaded at
+    # and raises StaleDataError otherwise, see SqlAlchemyUnitOfWork._commit
+    # the mapper bumps a user's version, a bug's is bumped by the domain since its events carry it
     mapper_registry.map_imperatively(
         models.Users,
         users,
+        version_id_col=users.c.version,
         properties={
             "comments": relationship(
                 models.Comments,
@@ -242,6 +515,8 @@ def start_mappers():
     mapper_registry.map_imperatively(
         models.Bugs,
         bugs,
+        version_id_col=bugs.c.version,
+        version_id_generator=False,
         properties={
             "author": relationship(
                 models.Users,
@@ -262,8 +537,13 @@ def start_mappers():
     mapper_registry.map_imperatively(
         models.EventStore,
         event_store,
+        primary_key=[event_store.c.id],
     )
     mapper_registry.map_imperatively(
         read_models.UserReadModel,
         user_read_model,
     )
+    mapper_registry.map_imperatively(
+        read_models.BugsReadModel,
+        bugs_read_model,
+    )
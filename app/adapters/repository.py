@@ -6,6 +6,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.sql.selectable import Select
 
+from app.utils.helpers import Page, build_keyset_page, set_keyset_pagination
+
 ModelType = TypeVar("ModelType", bound=object)
 
 
@@ -23,7 +25,7 @@ class AbstractRepository(abc.ABC):
         ...
 
     @abc.abstractmethod
-    def _get(self, ident: Any):
+    def _get(self, ident: Any, profile: str | None = None, **params: Any):
         ...
 
     @abc.abstractmethod
@@ -40,8 +42,9 @@ class AbstractRepository(abc.ABC):
     def add_all(self, items: list[Any]):
         self._add_all(items)
 
-    async def get(self, ident: Any):
-        return await self._get(ident)
+    # params fill in the bind parameters a profile leaves open
+    async def get(self, ident: Any, profile: str | None = None, **params: Any):
+        return await self._get(ident, profile, **params)
 
     async def remove(self, ident: Any):
         return await self._remove(ident)
@@ -57,6 +60,7 @@ class SqlAlchemyRepository(Generic[ModelType], AbstractRepository):
         self.model = model
         self.seen = set()
         self.query: Select = select(self.model)
+        self.profiles: dict[str, Select] = {}
 
     def _add(self, item: Type[ModelType]):
         self.session.add(item)
@@ -67,10 +71,20 @@ class SqlAlchemyRepository(Generic[ModelType], AbstractRepository):
         for item in items:
             self.seen.add(item)
 
-    async def _get(self, ident: UUID) -> Type[ModelType] | None:
-        _query = self.query.where(self.model.id == ident)  # type: ignore
-        execution = await self.session.execute(_query)
-        model: Type[ModelType] | None = execution.scalar_one_or_none()
+    # a profile names the columns and relationships one use case needs, None falls back to self.query
+    def _query_for(self, profile: str | None) -> Select:
+        if profile is None:
+            return self.query
+        try:
+            return self.profiles[profile]
+        except KeyError:
+            raise ValueError(f"unknown loading profile {profile}")
+
+    async def _get(self, ident: UUID, profile: str | None = None, **params: Any) -> Type[ModelType] | None:
+        _query = self._query_for(profile).where(self.model.id == ident)  # type: ignore
+        execution = await self.session.execute(_query, params)
+        # unique() for profiles that join a collection in
+        model: Type[ModelType] | None = execution.unique().scalar_one_or_none()
         if model:
             self.seen.add(model)
         return model
@@ -81,15 +95,7 @@ class SqlAlchemyRepository(Generic[ModelType], AbstractRepository):
             await self.session.delete(model)
         return
 
-    async def _list(
-        self,
-        *args,
-        **kwargs,
-    ) -> list[Type[ModelType]]:
-        if not args and not kwargs:
-            execution = await self.session.execute(self.query)
-            models = execution.scalars().all()
-            return models
+    def _build_filters(self, args: tuple[Any, ...], kwargs: dict[str, Any]) -> list[Any]:
         _filters: list[Any] = []
         _filters.extend(args)
         if kwargs:
@@ -121,8 +127,38 @@ class SqlAlchemyRepository(Generic[ModelType], AbstractRepository):
                     _filters.append(model_column.like(f"%{value}%"))
                 elif operator == "is":
                     _filters.append(model_column.is_(value))
+        return _filters
 
-        _query = self.query.where(*_filters)
+    async def _list(
+        self,
+        *args,
+        profile: str | None = None,
+        **kwargs,
+    ) -> list[Type[ModelType]]:
+        query = self._query_for(profile)
+        if not args and not kwargs:
+            execution = await self.session.execute(query)
+            models = execution.scalars().all()
+            return models
+        _query = query.where(*self._build_filters(args, kwargs))
         execution = await self.session.execute(_query)
         models = execution.scalars().all()
         return models
+
+    async def page(
+        self,
+        *args,
+        cursor: str | None = None,
+        count_per_page: int = 20,
+        order_by: tuple[str, ...] = ("create_dt", "id"),
+        descending: bool = False,
+        profile: str | None = None,
+        **kwargs,
+    ) -> Page:
+        # order_by should end in a unique column (id) so the seek key is never ambiguous
+        sort_columns = [getattr(self.model, column) for column in order_by]
+        _query = self._query_for(profile).where(*self._build_filters(args, kwargs))
+        _query = set_keyset_pagination(_query, sort_columns, cursor, count_per_page, descending)
+        execution = await self.session.execute(_query)
+        models = execution.scalars().all()
+        return build_keyset_page(models, sort_columns, cursor, count_per_page)
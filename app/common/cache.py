@@ -0,0 +1,65 @@
+import abc
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+# what get returns for a key that isn't cached, None is a value like any other
+MISSING: Any = object()
+
+
+# where cached reads live, async so a backend shared across workers (redis, memcached) fits behind it later
+class CacheBackend(abc.ABC):
+    @abc.abstractmethod
+    async def get(self, key: Hashable) -> Any:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def set(self, key: Hashable, value: Any):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def delete(self, key: Hashable):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def clear(self):
+        raise NotImplementedError
+
+
+# per process, least recently used entries go first once max_size is reached and none outlive ttl seconds
+# the ttl is what bounds staleness for changes made by other processes, see ReadCache
+class MemoryCache(CacheBackend):
+    def __init__(self, max_size: int = 10000, ttl: float = 30.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    async def get(self, key: Hashable) -> Any:
+        entry = self.entries.get(key)
+        if entry is None:
+            return MISSING
+        expires, value = entry
+        if expires <= time.monotonic():
+            del self.entries[key]
+            self.expirations += 1
+            return MISSING
+        self.entries.move_to_end(key)
+        return value
+
+    async def set(self, key: Hashable, value: Any):
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    async def delete(self, key: Hashable):
+        self.entries.pop(key, None)
+
+    async def clear(self):
+        self.entries.clear()
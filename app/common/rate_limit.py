@@ -0,0 +1,60 @@
+import abc
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+
+# where the token buckets live, async so a backend shared across workers (redis) fits behind it later
+class RateLimitBackend(abc.ABC):
+    # takes cost tokens from key's bucket, returns 0 when it could or else the seconds until it can
+    @abc.abstractmethod
+    async def take(self, key: Hashable, burst: int, per_second: float, cost: float = 1.0) -> float:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def reset(self, key: Hashable):
+        raise NotImplementedError
+
+
+# per process token buckets, a bucket starts full with burst tokens and refills per_second of them
+# only the max_keys most recently used are kept, a bucket that is dropped comes back full
+class MemoryRateLimitBackend(RateLimitBackend):
+    def __init__(self, max_keys: int = 100000, clock: Callable[[], float] = time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self.buckets: OrderedDict[Hashable, tuple[float, float]] = OrderedDict()  # key -> (tokens, when)
+
+    def __len__(self) -> int:
+        return len(self.buckets)
+
+    async def take(self, key: Hashable, burst: int, per_second: float, cost: float = 1.0) -> float:
+        now = self.clock()
+        tokens, when = self.buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - when) * per_second)
+        wait = 0.0
+        if tokens >= cost:
+            tokens -= cost
+        else:
+            wait = (cost - tokens) / per_second
+        self.buckets[key] = (tokens, now)
+        self.buckets.move_to_end(key)
+        if len(self.buckets) > self.max_keys:
+            self.buckets.popitem(last=False)
+        return wait
+
+    async def reset(self, key: Hashable):
+        self.buckets.pop(key, None)
+
+
+class RateLimit:
+    def __init__(self, backend: RateLimitBackend, name: str, burst: int, per_second: float):
+        self.backend = backend
+        self.name = name  # limits can share a backend
+        self.burst = burst
+        self.per_second = per_second
+
+    async def take(self, key: Hashable) -> float:
+        return await self.backend.take((self.name, key), self.burst, self.per_second)
+
+    async def reset(self, key: Hashable):
+        await self.backend.reset((self.name, key))
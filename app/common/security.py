@@ -1,3 +1,6 @@
+import hashlib
+import time
+from collections import OrderedDict
 from datetime import datetime
 from typing import Any
 from uuid import uuid4
@@ -8,6 +11,9 @@ from app.common import exceptions as exc
 from app.common.settings import settings
 from app.domain.common_schemas import Token
 
+# JWTSettings.secret_key base64 encodes the raw secret on every access, done once here instead
+SIGNING_KEY = settings.jwt_settings.secret_key.get_secret_value()
+
 
 def create_jwt_token(
     subject: str,
@@ -18,21 +24,66 @@ def create_jwt_token(
         settings.jwt_settings.refresh_expiration_delta if refresh else settings.jwt_settings.expiration_delta
     )
     expiration_datetime = datetime.utcnow() + expiration_delta
-    registered_claims = {"exp": expiration_datetime, "sub": subject, "iat": datetime.utcnow(), "jti": uuid4().hex}
+    # iat to the microsecond, a token issued right after its user's sessions were revoked compares newer
+    # than the revocation even within the same second, see TokenRevocations.is_revoked
+    registered_claims = {"exp": expiration_datetime, "sub": subject, "iat": time.time(), "jti": uuid4().hex}
     claims = registered_claims | private_claims if private_claims else registered_claims
     jwt_token = jwt.encode(
         claims=claims,
-        key=settings.jwt_settings.secret_key.get_secret_value(),
+        key=SIGNING_KEY,
         algorithm=settings.jwt_settings.algorithm,
     )
     return jwt_token
 
 
-def validate_jwt_token(token: str):
+# claims of tokens that already passed jwt.decode, so a client reusing its token skips the signature check
+# keyed by a digest of the token, entries go once the token's exp passes or the least recently used once full
+class VerifiedTokens:
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self.entries: OrderedDict[bytes, tuple[float, Token]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, digest: bytes) -> Token | None:
+        entry = self.entries.get(digest)
+        if entry is None:
+            return None
+        exp, claims = entry
+        if exp <= time.time():
+            del self.entries[digest]
+            return None
+        self.entries.move_to_end(digest)
+        return claims
+
+    def add(self, digest: bytes, exp: float, claims: Token):
+        self.entries[digest] = (exp, claims)
+        self.entries.move_to_end(digest)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+
+def _verify(token: str) -> tuple[float, Token]:
     try:
-        decoded_token = jwt.decode(token=token, key=settings.jwt_settings.secret_key.get_secret_value())
-        return Token(**decoded_token)
+        decoded_token = jwt.decode(token=token, key=SIGNING_KEY, algorithms=[settings.jwt_settings.algorithm])
+        return decoded_token["exp"], Token(**decoded_token)
     except ExpiredSignatureError:
         raise exc.TokenExpired("token has expired")
     except Exception as e:
         raise exc.InvalidToken(f"token is invalid: {str(e)}")
+
+
+def validate_jwt_token(token: str, cache: VerifiedTokens | None = None) -> Token:
+    if cache is None:
+        return _verify(token)[1]
+    digest = cache.digest(token)
+    claims = cache.get(digest)
+    if claims is None:
+        exp, claims = _verify(token)
+        cache.add(digest, exp, claims)
+    return claims
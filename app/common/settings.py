@@ -24,6 +24,17 @@ if not os.getenv("STAGE"):
     raise Exception("STAGE is not defined")
 
 
+class ExecutorEnum(str, enum.Enum):
+    THREAD = "thread"
+    PROCESS = "process"
+
+
+class ArchiveEnum(str, enum.Enum):
+    NONE = "none"
+    TABLE = "table"
+    FILE = "file"
+
+
 class DBSettings(BaseSettings):
     server: str = "localhost"
     user: str = "jason"
@@ -70,14 +81,146 @@ class JWTSettings(BaseSettings):
     refresh_expiration_delta = timedelta(days=15)
     allow_refresh = True
     access_toke_expire_minutes = 60 * 24 * 8
+    verified_cache_size: int = 10000  # tokens whose claims decode_token keeps after checking them once, 0 keeps none
 
     @property
     def secret_key(self):
         return SecretStr(b64encode(self.raw_secret.get_secret_value().encode()).decode())
 
 
+class HashingSettings(BaseSettings):
+    executor: ExecutorEnum = ExecutorEnum.THREAD
+    max_workers: int = 4
+    max_queue: int = 64
+
+    class Config:
+        env_prefix = "hashing_"
+        env_file = ".env"
+
+
+class LoginThrottleSettings(BaseSettings):
+    enabled: bool = True
+    ip_burst: int = 20  # attempts a client can make at once
+    ip_per_second: float = 1.0  # and keep making after that
+    email_burst: int = 5
+    email_per_second: float = 0.1
+    max_keys: int = 100000  # buckets kept per process, least recently used ones are dropped past that
+
+    class Config:
+        env_prefix = "login_throttle_"
+        env_file = ".env"
+
+
+class VoteSettings(BaseSettings):
+    buffer_window: float = 0.0  # seconds, 0 applies every vote to vote_count in its own transaction
+
+    class Config:
+        env_prefix = "votes_"
+        env_file = ".env"
+
+
+class CommandRetrySettings(BaseSettings):
+    max_attempts: int = 3  # runs of an idempotent command that keeps losing optimistic locking races
+    backoff_base: float = 0.01  # seconds, doubled every attempt and jittered
+    backoff_max: float = 0.2
+
+    class Config:
+        env_prefix = "command_retry_"
+        env_file = ".env"
+
+
+class ReadCacheSettings(BaseSettings):
+    enabled: bool = True
+    max_size: int = 10000  # entries per process
+    ttl: float = 30.0  # seconds, how stale a process that didn't dispatch the change can be
+
+    class Config:
+        env_prefix = "read_cache_"
+        env_file = ".env"
+
+
+class RevocationSettings(BaseSettings):
+    enabled: bool = True
+    poll_interval: float = 2.0  # seconds before a worker sees a token another worker revoked
+    rebuild_interval: float = 3600.0
+    capacity: int = 100000  # revoked tokens the bloom filter is sized for, it grows on rebuild past that
+    error_rate: float = 0.001
+
+    class Config:
+        env_prefix = "revocations_"
+        env_file = ".env"
+
+
+class OutboxSettings(BaseSettings):
+    enabled: bool = True
+    workers: int = 1
+    batch_size: int = 100
+    poll_interval: float = 0.5  # seconds to wait when there was nothing to dispatch
+    max_attempts: int = 10
+    backoff_base: float = 1.0
+    backoff_max: float = 300.0
+
+    class Config:
+        env_prefix = "outbox_"
+        env_file = ".env"
+
+
+class ProjectionSettings(BaseSettings):
+    enabled: bool = True
+    batch_size: int = 500
+    poll_interval: float = 0.5
+
+    class Config:
+        env_prefix = "projections_"
+        env_file = ".env"
+
+
+class SnapshotSettings(BaseSettings):
+    every: int = 100  # events replayed since the last snapshot before a load takes a new one, 0 never does
+
+    class Config:
+        env_prefix = "snapshots_"
+        env_file = ".env"
+
+
+class EventStoreSettings(BaseSettings):
+    group_commit: bool = False  # appends after the request commits, see GroupCommitAppender
+    group_commit_window: float = 0.002  # seconds
+    group_commit_max_batch: int = 1000
+    partitions_ahead: int = 3  # months of partitions make partitions creates past the current one
+
+    class Config:
+        env_prefix = "event_store_"
+        env_file = ".env"
+
+
+class CompactionSettings(BaseSettings):
+    enabled: bool = False
+    idle_days: int = 90  # aggregates without an event for this long get their history folded into one row
+    interval: float = 86400.0  # seconds between runs
+    batch_size: int = 100  # aggregates per transaction
+    batch_events: int = 10000  # and roughly no more events than this
+    archive: ArchiveEnum = ArchiveEnum.NONE  # where the folded away events go, if anywhere
+    archive_dir: str = "archive"
+
+    class Config:
+        env_prefix = "compaction_"
+        env_file = ".env"
+
+
 db_settings = DBSettings()
 jwt_settings = JWTSettings()
+hashing_settings = HashingSettings()
+login_throttle_settings = LoginThrottleSettings()
+vote_settings = VoteSettings()
+command_retry_settings = CommandRetrySettings()
+read_cache_settings = ReadCacheSettings()
+revocation_settings = RevocationSettings()
+outbox_settings = OutboxSettings()
+projection_settings = ProjectionSettings()
+snapshot_settings = SnapshotSettings()
+event_store_settings = EventStoreSettings()
+compaction_settings = CompactionSettings()
 
 
 class Settings(BaseSettings):
@@ -98,6 +241,17 @@ class Settings(BaseSettings):
 
     db_settings: DBSettings = db_settings
     jwt_settings: JWTSettings = jwt_settings
+    hashing_settings: HashingSettings = hashing_settings
+    login_throttle_settings: LoginThrottleSettings = login_throttle_settings
+    vote_settings: VoteSettings = vote_settings
+    command_retry_settings: CommandRetrySettings = command_retry_settings
+    read_cache_settings: ReadCacheSettings = read_cache_settings
+    revocation_settings: RevocationSettings = revocation_settings
+    outbox_settings: OutboxSettings = outbox_settings
+    projection_settings: ProjectionSettings = projection_settings
+    snapshot_settings: SnapshotSettings = snapshot_settings
+    event_store_settings: EventStoreSettings = event_store_settings
+    compaction_settings: CompactionSettings = compaction_settings
 
     class Config:
         env_file = ".env"
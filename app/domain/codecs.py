@@ -0,0 +1,260 @@
+# per event type encoders and decoders, compiled once from the dataclass fields instead of reflected on every call
+import dataclasses
+import enum
+import json
+import struct
+import typing
+from datetime import datetime
+from typing import Any, Callable
+from uuid import UUID
+
+
+class _Unset:
+    def __repr__(self):
+        return "UNSET"
+
+    def __bool__(self):
+        return False
+
+
+# default for the fields of a delta event, a field left UNSET didn't change and is neither stored nor applied
+UNSET: Any = _Unset()
+
+# every Event subclass by name, filled in as the modules defining them are imported
+EVENTS: dict[str, type] = {}
+CODECS: dict[type, "EventCodec"] = {}
+# (event type, model type) -> a function setting the event's fields on the model
+APPLIERS: dict[tuple[type, type], Callable[[Any, Any], Any]] = {}
+
+DOUBLE = struct.Struct("!d")
+
+
+def _kind(hint: Any) -> tuple[str, Any]:
+    args = [arg for arg in typing.get_args(hint) if arg is not type(None)]
+    if typing.get_origin(hint) is list and args == [str]:
+        return "strings", None
+    _type = args[0] if len(args) == 1 and typing.get_origin(hint) is not list else hint
+    if _type is UUID:
+        return "uuid", None
+    if isinstance(_type, type) and issubclass(_type, enum.Enum):
+        return "enum", _type
+    for kind in (datetime, bool, int, float, str):
+        if _type is kind:
+            return kind.__name__, None
+    return "json", None
+
+
+# python expressions for a field's value, anything json handles as it is needs none
+_ENCODE = {
+    "uuid": "{v} if {v} is None else str({v})",
+    "enum": "{v}.value if isinstance({v}, Enum) else {v}",
+    "datetime": "{v}.isoformat() if isinstance({v}, datetime) else {v}",
+}
+_DECODE = {
+    "uuid": "UUID(v) if isinstance(v, str) else v",
+    "enum": "v if v is None else {enum}(v)",
+    "datetime": "datetime.fromisoformat(v) if isinstance(v, str) else v",
+}
+
+
+def _encoder(kind: str, enum_type: Any) -> str:
+    if kind == "enum" and issubclass(enum_type, (str, int)):
+        return "{v}"  # json writes the value of a str or int enum already
+    return _ENCODE.get(kind, "{v}")
+
+
+def _compile(source: str, namespace: dict[str, Any]) -> Callable:
+    exec(source, namespace)
+    return namespace["function"]
+
+
+def _write_varint(out: bytearray, value: int):
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, offset: int) -> tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def _write_str(out: bytearray, value: str):
+    encoded = value.encode()
+    _write_varint(out, len(encoded))
+    out += encoded
+
+
+def _read_str(data: bytes, offset: int) -> tuple[str, int]:
+    length, offset = _read_varint(data, offset)
+    return data[offset : offset + length].decode(), offset + length
+
+
+class EventCodec:
+    # json goes through encode/decode, the binary format is a bitmap of the fields that are set, one of the
+    # fields that are None, then each remaining value in field order with nothing but its length around it
+    def __init__(self, event_type: type):
+        self.event_type = event_type
+        hints = typing.get_type_hints(event_type)
+        self.fields = tuple(f.name for f in dataclasses.fields(event_type))
+        self.kinds = [_kind(hints[name]) for name in self.fields]
+        # members are only ever added at the end of an enum so an index into them stays valid
+        self.members = [tuple(enum_type) if kind == "enum" else () for kind, enum_type in self.kinds]
+        namespace: dict[str, Any] = {"UNSET": UNSET, "UUID": UUID, "Enum": enum.Enum, "datetime": datetime}
+        # fields without an UNSET default are always there and go straight into the dict literal
+        required = []
+        optional = []
+        decode = ["def function(data):", "    kw = {}"]
+        for i, (f, (kind, enum_type)) in enumerate(zip(dataclasses.fields(event_type), self.kinds)):
+            namespace[f"enum_{i}"] = enum_type
+            expression = _encoder(kind, enum_type)
+            if f.default is UNSET:
+                optional += [
+                    f"    v = event.{f.name}",
+                    "    if v is not UNSET:",
+                    f"        out[{f.name!r}] = {expression.format(v='v')}",
+                ]
+            else:
+                required.append(f"{f.name!r}: {expression.format(v=f'event.{f.name}')}")
+            decode += [
+                f"    if {f.name!r} in data:",
+                f"        v = data[{f.name!r}]",
+                f"        kw[{f.name!r}] = {_DECODE.get(kind, 'v').format(enum=f'enum_{i}')}",
+            ]
+        encode = ["def function(event):", f"    out = {{{', '.join(required)}}}", *optional, "    return out"]
+        decode.append("    return cls(**kw)")
+        self.encode: Callable[[Any], dict[str, Any]] = _compile("\n".join(encode), dict(namespace))
+        self.decode: Callable[[typing.Mapping[str, Any]], Any] = _compile(
+            "\n".join(decode), {**namespace, "cls": event_type}
+        )
+
+    def pack(self, event: Any) -> bytes:
+        present = nulls = 0
+        values = []
+        for i, name in enumerate(self.fields):
+            value = getattr(event, name)
+            if value is UNSET:
+                continue
+            present |= 1 << i
+            if value is None:
+                nulls |= 1 << i
+            else:
+                values.append((i, value))
+        out = bytearray()
+        _write_varint(out, present)
+        _write_varint(out, nulls)
+        for i, value in values:
+            kind, enum_type = self.kinds[i]
+            if kind == "uuid":
+                out += (value if isinstance(value, UUID) else UUID(value)).bytes
+            elif kind == "enum":
+                _write_varint(out, self.members[i].index(enum_type(value)))
+            elif kind == "bool":
+                out.append(value)
+            elif kind == "int":
+                _write_varint(out, value << 1 if value >= 0 else (-value << 1) - 1)
+            elif kind == "float":
+                out += DOUBLE.pack(value)
+            elif kind == "strings":
+                _write_varint(out, len(value))
+                for item in value:
+                    _write_str(out, item)
+            elif kind == "datetime":
+                _write_str(out, value.isoformat())
+            elif kind == "str":
+                _write_str(out, value)
+            else:
+                _write_str(out, json.dumps(value, separators=(",", ":")))
+        return bytes(out)
+
+    def unpack(self, data: bytes) -> Any:
+        present, offset = _read_varint(data, 0)
+        nulls, offset = _read_varint(data, offset)
+        kw: dict[str, Any] = {}
+        for i, name in enumerate(self.fields):
+            if not present >> i & 1:
+                continue
+            if nulls >> i & 1:
+                kw[name] = None
+                continue
+            kind = self.kinds[i][0]
+            value: Any
+            if kind == "uuid":
+                value, offset = UUID(bytes=data[offset : offset + 16]), offset + 16
+            elif kind == "enum":
+                index, offset = _read_varint(data, offset)
+                value = self.members[i][index]
+            elif kind == "bool":
+                value, offset = bool(data[offset]), offset + 1
+            elif kind == "int":
+                value, offset = _read_varint(data, offset)
+                value = value >> 1 if not value & 1 else -((value + 1) >> 1)
+            elif kind == "float":
+                (value,), offset = DOUBLE.unpack_from(data, offset), offset + DOUBLE.size
+            elif kind == "strings":
+                count, offset = _read_varint(data, offset)
+                value = []
+                for _ in range(count):
+                    item, offset = _read_str(data, offset)
+                    value.append(item)
+            else:
+                value, offset = _read_str(data, offset)
+                if kind == "datetime":
+                    value = datetime.fromisoformat(value)
+                elif kind == "json":
+                    value = json.loads(value)
+            kw[name] = value
+        return self.event_type(**kw)
+
+
+def register(event_type: type):
+    EVENTS[event_type.__name__] = event_type
+
+
+def codec(event_type: type) -> EventCodec:
+    # compiled on first use, the dataclass decorator only runs after the class is registered
+    try:
+        return CODECS[event_type]
+    except KeyError:
+        return CODECS.setdefault(event_type, EventCodec(event_type))
+
+
+def _reflected_apply(event: Any, model: Any) -> Any:
+    for key in codec(type(event)).fields:
+        if hasattr(model, key):
+            value = getattr(event, key)
+            if value is not UNSET:
+                setattr(model, key, value)
+    return model
+
+
+def applier(event_type: type, model: Any) -> Callable[[Any, Any], Any]:
+    # sets the event fields the model has on it, compiled once per event and model type
+    try:
+        return APPLIERS[(event_type, type(model))]
+    except KeyError:
+        pass
+    if not dataclasses.is_dataclass(model):
+        return _reflected_apply
+    model_fields = {f.name for f in dataclasses.fields(model)}
+    source = ["def function(event, model):"]
+    for name in codec(event_type).fields:
+        if name in model_fields:
+            source += [f"    v = event.{name}", "    if v is not UNSET:", f"        model.{name} = v"]
+    source.append("    return model")
+    return APPLIERS.setdefault((event_type, type(model)), _compile("\n".join(source), {"UNSET": UNSET}))
+
+
+def pack(event: Any) -> bytes:
+    return codec(type(event)).pack(event)
+
+
+def unpack(event_name: str, data: bytes) -> Any:
+    return codec(EVENTS[event_name]).unpack(data)
@@ -1,5 +1,9 @@
+from typing import ClassVar
+
 from pydantic import BaseModel
 
 
 class Command(BaseModel):
-    pass
+    # running it again from scratch after a ConcurrencyException does what running it once would have,
+    # see MessageBus.handle_command
+    idempotent: ClassVar[bool] = False
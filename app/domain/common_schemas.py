@@ -4,7 +4,7 @@ from pydantic import BaseModel
 class Token(BaseModel):
     email: str | None
     user_type: str | None
-    admin: str | None
+    admin: bool | None
     exp: str
     sub: str
     iat: str
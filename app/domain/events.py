@@ -1,22 +1,42 @@
-from typing import Any
-from uuid import UUID
+from dataclasses import dataclass, field
+from typing import Any, Mapping
 
+from app.domain import codecs
+from app.domain.codecs import UNSET  # noqa: F401, the event modules take it from here
 
+
+# every subclass is registered by name, see app.domain.codecs for how they are encoded and applied
+# subclasses are frozen slotted dataclasses, an aggregate can be holding thousands of them
 class Event:
+    __slots__ = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        codecs.register(cls)
+
     def apply(self, model: Any):
-        for key in self.__dict__.keys():
-            if hasattr(model, key):
-                val = getattr(self, key)
-                setattr(model, key, val)
-        return model
-
-    def dict(self):
-        out = {}
-        for key, value in self.__dict__.items():
-            if isinstance(value, UUID):
-                value = str(value)
-            out[key] = value
-        return out
-
-    def name(self):
-        return self.__repr__().replace("()", "")
+        return codecs.applier(type(self), model)(self, model)
+
+    def dict(self) -> dict[str, Any]:
+        try:
+            return codecs.CODECS[type(self)].encode(self)
+        except KeyError:
+            return codecs.codec(type(self)).encode(self)
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]):
+        # inverse of dict(), keys the event no longer has are dropped
+        return codecs.codec(cls).decode(data)
+
+    def name(self) -> str:
+        return type(self).__name__
+
+
+# an aggregate's whole history folded into its first event store row, see app.service.event_store.compaction
+# version is how many events it stands for and updated_dt the time of the last update or soft delete in them
+@dataclass(frozen=True, slots=True)
+class AggregateCompacted(Event):
+    aggregate: str = field(repr=False)
+    state: dict[str, Any] = field(repr=False)
+    version: int = field(repr=False)
+    updated_dt: str | None = field(default_factory=lambda: None, repr=False)
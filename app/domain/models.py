@@ -1,8 +1,13 @@
 import abc
+import dataclasses
+import enum
+import functools
+import typing
 from collections import deque
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from datetime import datetime
-from typing import Any, Optional
+from operator import attrgetter
+from typing import Any, ClassVar, Iterable, Optional
 from uuid import UUID, uuid4
 
 from argon2 import PasswordHasher
@@ -23,11 +28,41 @@ from app.service.bugs.events import (
 from app.service.users.events import UserCreated, UserSoftDeleted, UserUpdated
 
 
+def _to_json(value: Any) -> Any:
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+
+def _from_json(hint: Any, value: Any) -> Any:
+    if value is None:
+        return None
+    for _type in typing.get_args(hint) or (hint,):
+        if _type is UUID:
+            return UUID(value)
+        if _type is datetime:
+            return datetime.fromisoformat(value)
+        if isinstance(_type, type) and issubclass(_type, enum.Enum):
+            return _type(value)
+    return value
+
+
+@functools.cache
+def _type_hints(cls: type) -> dict[str, Any]:
+    return typing.get_type_hints(cls)
+
+
 @dataclass(repr=True, eq=False)
 class Base(abc.ABC):
     id: UUID = field(default_factory=lambda: uuid4())
     create_dt: datetime = field(init=False, repr=True)
     update_dt: datetime = field(init=False, repr=True)
+    # relationships and in memory bits that a snapshot leaves out
+    not_snapshotted: ClassVar[tuple[str, ...]] = ("events",)
 
     def __eq__(self, other):
         if not isinstance(other, Base):
@@ -54,18 +89,32 @@ class Base(abc.ABC):
                 setattr(self, k, v)
         return self
 
-    def generate_event_store(self):
-        if hasattr(self, "events"):
-            events = getattr(self, "events")
-            latest: Event = events[-1]
-            event_store = EventStore(
-                id=uuid4(),
-                aggregate_id=self.id,
-                event_name=latest.name(),
-                event_data=latest.dict(),
-            )
-            return event_store
-        return None
+    # what update(data) would actually change, update events only carry this
+    def changes(self, data: dict[str, Any]) -> dict[str, Any]:
+        return {k: v for k, v in data.items() if k != "id" and hasattr(self, k) and getattr(self, k) != v}
+
+    @classmethod
+    def from_events(cls, events: Iterable[Event], model: Any = None):
+        model = cls() if model is None else model
+        for event in events:
+            event.apply(model)
+        return model
+
+    # json friendly state, from_snapshot(snapshot()) gives back an equal model
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            f.name: _to_json(getattr(self, f.name, None))
+            for f in dataclasses.fields(self)
+            if f.name not in self.not_snapshotted
+        }
+
+    @classmethod
+    def from_snapshot(cls, state: dict[str, Any]):
+        hints = _type_hints(cls)
+        model = cls()
+        for key, value in state.items():
+            setattr(model, key, _from_json(hints[key], value))
+        return model
 
 
 @dataclass(repr=True, eq=False)
@@ -78,10 +127,12 @@ class Users(Base):
     is_admin: bool = field(default_factory=lambda: False)
     security_question: str = field(default_factory=lambda: "")
     security_question_answer: str = field(default_factory=lambda: "")
+    version: int = field(default_factory=lambda: 1)  # bumped by the mapper on every update, not by events
     comments: list["Comments"] = field(default_factory=list)
     raised_bugs: list["Bugs"] = field(default_factory=list)
     assigned_bugs: list["Bugs"] = field(default_factory=list)
     events: deque[Event] = field(default_factory=deque)
+    not_snapshotted: ClassVar[tuple[str, ...]] = ("events", "version", "comments", "raised_bugs", "assigned_bugs")
 
     @property
     def is_active(self) -> bool:
@@ -101,29 +152,32 @@ class Users(Base):
         except VerifyMismatchError:
             return False
 
+    # without a hasher the password and security question answer in data must already be hashed
     @classmethod
-    def create_user(cls, data: dict[str, Any], hasher: PasswordHasher):
+    def create_user(cls, data: dict[str, Any], hasher: PasswordHasher | None = None):
         password = data.get("password")
         if not password:
             raise ValueError  # TODO: custom exception
-        security_question_answer = data.get("security_question_answer")
-        if security_question_answer:
-            data["security_question_answer"] = hasher.hash(security_question_answer)
-        data["password"] = hasher.hash(password)
+        if hasher is not None:
+            security_question_answer = data.get("security_question_answer")
+            if security_question_answer:
+                data["security_question_answer"] = hasher.hash(security_question_answer)
+            data["password"] = hasher.hash(password)
         user = cls.create(data)
         user.events.append(UserCreated(id=user.id, **data))
         return user
 
-    def update_user(self, data: dict[str, Any], hasher: PasswordHasher):
-        password = data.get("password")
-        if password is not None:
-            data["password"] = hasher.hash(password)
-        security_question_answer = data.get("security_question_answer")
-        if security_question_answer is not None:
-            data["security_question_answer"] = hasher.hash(security_question_answer)
+    def update_user(self, data: dict[str, Any], hasher: PasswordHasher | None = None):
+        if hasher is not None:
+            password = data.get("password")
+            if password is not None:
+                data["password"] = hasher.hash(password)
+            security_question_answer = data.get("security_question_answer")
+            if security_question_answer is not None:
+                data["security_question_answer"] = hasher.hash(security_question_answer)
+        changes = self.changes(data)
         self.update(data)
-        event = UserUpdated(**data)
-        self.events.append(event)
+        self.events.append(UserUpdated(id=self.id, **changes))
         return self
 
     def delete_user(self):
@@ -131,8 +185,8 @@ class Users(Base):
         self.events.append(UserSoftDeleted(id=self.id))
         return self
 
-    def set_password(self, password: str, hasher: PasswordHasher):
-        self.password = hasher.hash(password)
+    def set_password(self, password: str, hasher: PasswordHasher | None = None):
+        self.password = hasher.hash(password) if hasher is not None else password
 
 
 @dataclass(repr=True, eq=False)
@@ -144,6 +198,7 @@ class Comments(Base):
     text: str = field(default_factory=lambda: "")
     vote_count: int = field(default_factory=lambda: 0)
     edited: bool = field(default_factory=lambda: False)
+    not_snapshotted: ClassVar[tuple[str, ...]] = ("bug", "author")
 
     def upvote(self):
         self.vote_count += 1
@@ -177,6 +232,32 @@ class Bugs(Base):
     images: list[str] = field(default_factory=list)  # TODO: add image upload thing
     comments: list[Comments] = field(default_factory=list)
     events: deque[Event] = field(default_factory=deque)
+    # comment id -> (position in comments when it was indexed, comment), built on the first lookup
+    # and kept up to date by the comment methods, the orm can swap or grow comments behind its back
+    # so it's rebuilt when comments isn't the list it was built from or their lengths differ
+    _comment_index: dict[UUID, tuple[int, Comments]] | None = field(default=None, init=False, repr=False)
+    _indexed_comments: list[Comments] | None = field(default=None, init=False, repr=False)
+    _removed_comments: int = field(default=0, init=False, repr=False)  # since the index was built
+    not_snapshotted: ClassVar[tuple[str, ...]] = (
+        "events",
+        "author",
+        "assignee",
+        "comments",
+        "_comment_index",
+        "_indexed_comments",
+        "_removed_comments",
+    )
+
+    def snapshot(self) -> dict[str, Any]:
+        return {**super().snapshot(), "comments": [comment.snapshot() for comment in self.comments]}
+
+    @classmethod
+    def from_snapshot(cls, state: dict[str, Any]):
+        state = dict(state)
+        comments = state.pop("comments", [])
+        bug = super().from_snapshot(state)
+        bug.comments = [Comments.from_snapshot(comment) for comment in comments]
+        return bug
 
     def set_urgency(self, urgency: UrgencyEnum):
         self.urgency = urgency
@@ -194,12 +275,11 @@ class Bugs(Base):
         return bug
 
     def update_bug(self, data: dict[str, Any]):
-        data["version"] = self.version + 1  # find a db way to do this
+        data["version"] = self.version + 1  # the UPDATE only matches the row still at self.version
+        data["edited"] = True
+        changes = self.changes(data)
         self.update(data)
-        self.set_edited()
-        event = BugUpdated(**data)
-        event.edited = True
-        self.events.append(event)
+        self.events.append(BugUpdated(id=self.id, **changes))
         return self
 
     def delete_bug(self):
@@ -207,25 +287,50 @@ class Bugs(Base):
         self.record_status = RecordStatusEnum.DELETED
         self.events.append(BugSoftDeleted(id=self.id))
 
-    def add_comment(self, data: dict[str, Any]) -> Comments:
-        comment = Comments.create(data)
+    def _comments_by_id(self) -> dict[UUID, tuple[int, Comments]]:
+        index = self._comment_index
+        if index is None or self._indexed_comments is not self.comments or len(index) != len(self.comments):
+            index = self._comment_index = dict(zip(map(attrgetter("id"), self.comments), enumerate(self.comments)))
+            self._indexed_comments = self.comments
+            self._removed_comments = 0
+        return index
+
+    # append_comment and remove_comment change comments without an event, for replaying the ones that did
+    def append_comment(self, comment: Comments) -> Comments:
+        index = self._comments_by_id()
         self.comments.append(comment)
+        index[comment.id] = (len(self.comments) - 1, comment)
+        return comment
+
+    def remove_comment(self, ident: UUID) -> Comments | None:
+        entry = self._comments_by_id().pop(ident, None)
+        if entry is None:
+            return None
+        position, comment = entry
+        # every removal since it was indexed moved it at most one place to the left
+        try:
+            position = self.comments.index(comment, max(position - self._removed_comments, 0), position + 1)
+        except ValueError:  # moved by something else
+            position = self.comments.index(comment)
+            self._comment_index = None
+        del self.comments[position]
+        self._removed_comments += 1
+        return comment
+
+    def add_comment(self, data: dict[str, Any]) -> Comments:
+        comment = self.append_comment(Comments.create(data))
         self.events.append(CommentCreated(id=comment.id, **data))
         return comment
 
     def find_comment(self, ident: UUID) -> Comments | None:
-        comment = [c for c in self.comments if c.id == ident]
-        if comment:
-            return comment[0]
-        return None
+        entry = self._comments_by_id().get(ident)
+        return entry[1] if entry is not None else None
 
     def update_comment(self, ident: UUID, data: dict[str, Any]) -> Comments | None:
         comment = self.find_comment(ident)
         if comment:
             comment.update_comment(data)
-            event = CommentUpdated(**data)
-            event.edited = True
-            self.events.append(event)
+            self.events.append(replace(CommentUpdated(**data), edited=True))
             return comment
         return None
 
@@ -246,11 +351,10 @@ class Bugs(Base):
         return None
 
     def delete_comment(self, ident: UUID):
-        comment = self.find_comment(ident)
+        comment = self.remove_comment(ident)
         if comment:
-            idx = self.comments.index(comment)
             self.events.append(CommentDeleted(id=comment.id))
-            return self.comments.pop(idx)
+        return comment
 
 
 # TODO: future feature, just get the main stuff done for now
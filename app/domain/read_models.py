@@ -2,7 +2,7 @@ from dataclasses import dataclass, field
 from datetime import datetime
 from uuid import UUID
 
-from app.domain.enums import BugStatusEnum, RecordStatusEnum, UrgencyEnum, UserTypeEnum
+from app.domain.enums import BugStatusEnum, EnvironmentEnum, RecordStatusEnum, UrgencyEnum, UserTypeEnum
 
 
 @dataclass
@@ -22,18 +22,19 @@ class UserReadModel:
     votes_count: int = field(default_factory=lambda: 0)
 
 
-@dataclass
+# a plain slotted value, a page of these is far lighter than the same comments as mapped Comments
+@dataclass(frozen=True, slots=True)
 class CommentReadModel:
     bug_id: UUID
     comment_id: UUID
     comment_create_dt: datetime
-    comment_update_dt: datetime
+    comment_update_dt: datetime | None
     text: str
     vote_count: int
     edited: bool
     user_id: UUID
     user_create_dt: datetime
-    user_update_dt: datetime
+    user_update_dt: datetime | None
     username: str
     email: str
     user_type: UserTypeEnum
@@ -48,21 +49,22 @@ class BugsReadModel:
     bug_updated_dt: datetime
     title: str
     author_id: UUID
-    assigned_user_id: UUID
+    assigned_user_id: UUID | None
     description: str
+    environment: EnvironmentEnum
     urgency: UrgencyEnum
     status: BugStatusEnum
     record_status: RecordStatusEnum
     version: int
     edited: bool
     images: list[str]
-    author_create_dt: datetime
-    author_update_dt: datetime
-    author_username: str
-    author_email: str
-    author_user_type: UserTypeEnum
-    author_user_status: RecordStatusEnum
-    author_is_admin: bool
+    author_create_dt: datetime | None
+    author_update_dt: datetime | None
+    author_username: str | None
+    author_email: str | None
+    author_user_type: UserTypeEnum | None
+    author_user_status: RecordStatusEnum | None
+    author_is_admin: bool | None
     assignee_create_dt: datetime | None
     assignee_update_dt: datetime | None
     assignee_username: str | None
@@ -1,6 +1,7 @@
+import math
 from uuid import UUID
 
-from fastapi import APIRouter, Body, Depends, HTTPException, Path
+from fastapi import APIRouter, Body, Depends, HTTPException, Path, Request
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
@@ -9,7 +10,9 @@ from app.domain.common_schemas import Token
 from app.entrypoints import dependencies as deps
 from app.service import exceptions as service_exc
 from app.service.messagebus import MessageBus
+from app.service.read_cache import ReadCache
 from app.service.users import commands, dto, views
+from app.service.users.throttle import LoginThrottle
 
 router = APIRouter()
 
@@ -20,15 +23,28 @@ router = APIRouter()
     status_code=status.HTTP_200_OK,
 )
 async def login(
+    request: Request,
     messagebus: MessageBus = Depends(deps.get_message_bus),
     req: OAuth2PasswordRequestForm = Depends(),
+    throttle: LoginThrottle | None = Depends(deps.get_login_throttle),
 ):
+    if throttle is not None:
+        # the client's address as the server sees it, behind a proxy that's the proxy's
+        wait = await throttle.attempt(req.username, request.client.host if request.client else None)
+        if wait:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="too many login attempts",
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
     try:
         cmd = commands.Login(
             email=req.username,
             password=req.password,
         )
         res = await messagebus.handle(message=cmd)
+        if throttle is not None:
+            await throttle.succeeded(req.username)
         return res
     except service_exc.Unauthorized as e:
         raise HTTPException(
@@ -40,6 +56,12 @@ async def login(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=str(e),
         )
+    except service_exc.ServiceUnavailable as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"},
+        )
 
 
 @router.post(
@@ -65,6 +87,40 @@ async def refresh(
         )
 
 
+@router.post(
+    "/user/{user_id}/logout",
+    status_code=status.HTTP_200_OK,
+)
+async def logout(
+    token: Token = Depends(deps.decode_token),
+    messagebus: MessageBus = Depends(deps.get_message_bus),
+    user_id: UUID = Path(..., title="user_id"),
+    req: dto.LogoutIn = Body(dto.LogoutIn()),
+):
+    try:
+        cmd = commands.Logout(user_id=user_id, jti=token.jti, exp=int(token.exp), refresh_token=req.refresh_token)
+        await messagebus.handle(message=cmd)
+    except service_exc.Forbidden as e:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=str(e),
+        )
+
+
+# signs the user out everywhere, the token this came with included
+@router.delete(
+    "/user/{user_id}/sessions",
+    status_code=status.HTTP_200_OK,
+)
+async def revoke_sessions(
+    token: Token = Depends(deps.decode_token),
+    messagebus: MessageBus = Depends(deps.get_message_bus),
+    user_id: UUID = Path(..., title="user_id"),
+):
+    cmd = commands.RevokeSessions(user_id=user_id)
+    await messagebus.handle(message=cmd)
+
+
 @router.post(
     "/user",
     status_code=status.HTTP_201_CREATED,
@@ -82,6 +138,12 @@ async def create_user(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
             detail=str(e),
         )
+    except service_exc.ServiceUnavailable as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"},
+        )
 
 
 @router.put(
@@ -93,9 +155,10 @@ async def update_user(
     messagebus: MessageBus = Depends(deps.get_message_bus),
     user_id: UUID = Path(..., title="user_id"),
     req: dto.UserUpdateIn = Body(...),
+    expected_version: int | None = Depends(deps.user_if_match),
 ):
     try:
-        cmd = commands.UpdateUser(id=user_id, **req.dict())
+        cmd = commands.UpdateUser(id=user_id, expected_version=expected_version, **req.dict())
         res = await messagebus.handle(message=cmd)
         return res
     except service_exc.ItemNotFound as e:
@@ -103,6 +166,22 @@ async def update_user(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=str(e),
         )
+    except service_exc.PreconditionFailed as e:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail=str(e),
+        )
+    except service_exc.ConcurrencyException:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="user was modified concurrently, try again",
+        )
+    except service_exc.ServiceUnavailable as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"},
+        )
 
 
 @router.delete(
@@ -113,15 +192,26 @@ async def delete_user(
     token: Token = Depends(deps.decode_token),
     messagebus: MessageBus = Depends(deps.get_message_bus),
     user_id: UUID = Path(..., title="user_id"),
+    expected_version: int | None = Depends(deps.user_if_match),
 ):
     try:
-        cmd = commands.SoftDeleteUser(id=user_id)
+        cmd = commands.SoftDeleteUser(id=user_id, expected_version=expected_version)
         await messagebus.handle(message=cmd)
     except service_exc.ItemNotFound as e:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=str(e),
         )
+    except service_exc.PreconditionFailed as e:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail=str(e),
+        )
+    except service_exc.ConcurrencyException:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="user was modified concurrently, try again",
+        )
 
 
 @router.get(
@@ -133,9 +223,11 @@ async def my_user_page(
     token: Token = Depends(deps.decode_token),
     user_id: UUID = Path(..., title="user_id"),
     session: AsyncSession = Depends(deps.get_reader_session),
+    version: int | None = Depends(deps.user_if_none_match),  # 304s before the query below
+    read_cache: ReadCache | None = Depends(deps.get_read_cache),
 ):
     try:
-        out = await views.get_my_user_page(session, user_id)
+        out = await views.get_my_user_page(session, user_id, read_cache, version)
         return out
     except service_exc.ItemNotFound as e:
         raise HTTPException(
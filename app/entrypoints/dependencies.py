@@ -1,45 +1,250 @@
+from datetime import timedelta
+from typing import AsyncIterator, Awaitable, Callable
 from uuid import UUID
 
 from argon2 import PasswordHasher
-from fastapi import Depends, HTTPException, Path
+from fastapi import Depends, HTTPException, Path, Request, Response
 from fastapi.security import OAuth2PasswordBearer
 from jose import ExpiredSignatureError
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
-from app.common.db import async_autocommit_session_factory
-from app.common.security import validate_jwt_token
+from app.common.cache import MemoryCache
+from app.common.db import async_autocommit_session_factory, async_transactional_session_factory
+from app.common.rate_limit import MemoryRateLimitBackend
+from app.common.security import VerifiedTokens, validate_jwt_token
 from app.common.settings import settings
+from app.service.bugs.votes import CommentVoteBuffer
+from app.service.event_store.compaction import EventStoreCompactor
+from app.service.event_store.writer import GroupCommitAppender
+from app.service.hashing import PasswordHashingService
 from app.service.messagebus import MessageBus, MessageBusFactory
-from app.service.unit_of_work import SqlAlchemyUnitOfWork
+from app.service.outbox import OutboxDispatcher
+from app.service.projections.bugs import BugReadModelProjector
+from app.service.projections.runner import ProjectionRunner
+from app.service.projections.users import UserReadModelProjector
+from app.service.read_cache import ReadCache
+from app.service.unit_of_work import SqlAlchemyUnitOfWork, UnitOfWorkPool
+from app.service.users import views as user_views
+from app.service.users.throttle import LoginThrottle
+from app.service.users.tokens import TokenRevocations
+
+PASSWORD_HASHER = PasswordHashingService(
+    hasher=PasswordHasher(),
+    executor=settings.hashing_settings.executor,
+    max_workers=settings.hashing_settings.max_workers,
+    max_queue=settings.hashing_settings.max_queue,
+)
+
+LOGIN_THROTTLE = (
+    LoginThrottle(
+        backend=MemoryRateLimitBackend(max_keys=settings.login_throttle_settings.max_keys),
+        ip_burst=settings.login_throttle_settings.ip_burst,
+        ip_per_second=settings.login_throttle_settings.ip_per_second,
+        email_burst=settings.login_throttle_settings.email_burst,
+        email_per_second=settings.login_throttle_settings.email_per_second,
+    )
+    if settings.login_throttle_settings.enabled
+    else None
+)
+
+VOTE_BUFFER = (
+    CommentVoteBuffer(uow=SqlAlchemyUnitOfWork(), window=settings.vote_settings.buffer_window)
+    if settings.vote_settings.buffer_window > 0
+    else None
+)
+
+VERIFIED_TOKENS = (
+    VerifiedTokens(max_size=settings.jwt_settings.verified_cache_size)
+    if settings.jwt_settings.verified_cache_size > 0
+    else None
+)
+
+REVOCATIONS = (
+    TokenRevocations(
+        session_factory=async_transactional_session_factory,
+        poll_interval=settings.revocation_settings.poll_interval,
+        rebuild_interval=settings.revocation_settings.rebuild_interval,
+        capacity=settings.revocation_settings.capacity,
+        error_rate=settings.revocation_settings.error_rate,
+    )
+    if settings.revocation_settings.enabled and async_transactional_session_factory is not None
+    else None
+)
+
+READ_CACHE = (
+    ReadCache(MemoryCache(max_size=settings.read_cache_settings.max_size, ttl=settings.read_cache_settings.ttl))
+    if settings.read_cache_settings.enabled
+    else None
+)
+
+EVENT_APPENDER = (
+    GroupCommitAppender(
+        session_factory=async_transactional_session_factory,
+        window=settings.event_store_settings.group_commit_window,
+        max_batch=settings.event_store_settings.group_commit_max_batch,
+    )
+    if settings.event_store_settings.group_commit and async_transactional_session_factory is not None
+    else None
+)
 
 MESSAGEBUS = MessageBusFactory(
-    uow=SqlAlchemyUnitOfWork(),
-    password_hasher=PasswordHasher(),
+    uow_pool=UnitOfWorkPool(lambda: SqlAlchemyUnitOfWork(appender=EVENT_APPENDER)),
+    password_hasher=PASSWORD_HASHER,
+    vote_buffer=VOTE_BUFFER,
+    read_cache=READ_CACHE,
+    revocations=REVOCATIONS,
+    max_attempts=settings.command_retry_settings.max_attempts,
+    backoff_base=settings.command_retry_settings.backoff_base,
+    backoff_max=settings.command_retry_settings.backoff_max,
+)
+
+OUTBOX_DISPATCHER = (
+    OutboxDispatcher(
+        messagebus=MESSAGEBUS,
+        session_factory=async_transactional_session_factory,
+        batch_size=settings.outbox_settings.batch_size,
+        poll_interval=settings.outbox_settings.poll_interval,
+        max_attempts=settings.outbox_settings.max_attempts,
+        backoff_base=settings.outbox_settings.backoff_base,
+        backoff_max=settings.outbox_settings.backoff_max,
+    )
+    if settings.outbox_settings.enabled and async_transactional_session_factory is not None
+    else None
+)
+
+PROJECTION_RUNNER = (
+    ProjectionRunner(
+        projectors=[UserReadModelProjector(), BugReadModelProjector()],
+        session_factory=async_transactional_session_factory,
+        batch_size=settings.projection_settings.batch_size,
+        poll_interval=settings.projection_settings.poll_interval,
+    )
+    if settings.projection_settings.enabled and async_transactional_session_factory is not None
+    else None
+)
+
+EVENT_STORE_COMPACTOR = (
+    EventStoreCompactor(
+        session_factory=async_transactional_session_factory,
+        idle=timedelta(days=settings.compaction_settings.idle_days),
+        batch_size=settings.compaction_settings.batch_size,
+        batch_events=settings.compaction_settings.batch_events,
+        archive=settings.compaction_settings.archive,
+        archive_dir=settings.compaction_settings.archive_dir,
+        interval=settings.compaction_settings.interval,
+    )
+    if settings.compaction_settings.enabled and async_transactional_session_factory is not None
+    else None
 )
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=settings.api_v1_login_url)
 
 
-def get_message_bus() -> MessageBus:
-    return MESSAGEBUS()
+async def get_message_bus() -> AsyncIterator[MessageBus]:
+    async with MESSAGEBUS.request() as messagebus:
+        yield messagebus
+
+
+def get_read_cache() -> ReadCache | None:
+    return READ_CACHE
 
 
-def get_reader_session():
+def get_revocations() -> TokenRevocations | None:
+    return REVOCATIONS
+
+
+def get_login_throttle() -> LoginThrottle | None:
+    return LOGIN_THROTTLE
+
+
+async def get_reader_session() -> AsyncIterator[AsyncSession]:
     assert async_autocommit_session_factory is not None
-    with async_autocommit_session_factory() as session:
+    async with async_autocommit_session_factory() as session:
         yield session
 
 
 async def decode_token(
     token: str = Depends(oauth2_scheme),
     user_id: UUID | None = Path(...),
+    revocations: TokenRevocations | None = Depends(get_revocations),
 ):
     try:
-        decoded_token = validate_jwt_token(token)
+        decoded_token = validate_jwt_token(token, VERIFIED_TOKENS)
         if str(user_id) != decoded_token.sub:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="token and user_id mismatch")
+        # after the verified token cache, a cached token can still be revoked
+        if revocations is not None and revocations.is_revoked(decoded_token):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="token has been revoked")
         return decoded_token
     except ExpiredSignatureError as e:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
+
+
+# conditional requests, an aggregate's etag is its version so checking one only ever reads that column
+VersionLookup = Callable[[AsyncSession, UUID], Awaitable[int | None]]
+
+
+def etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def _etags(header: str | None, weak: bool) -> set[str]:
+    # If-None-Match compares weakly, If-Match only ever matches strong etags
+    tags = {tag.strip() for tag in header.split(",")} if header else set()
+    return {tag.removeprefix("W/") for tag in tags} if weak else tags
+
+
+async def _lookup(lookup: VersionLookup, request: Request, session: AsyncSession, path_param: str) -> int | None:
+    try:
+        ident = UUID(request.path_params[path_param])
+    except ValueError:
+        return None  # the route's own path validation answers
+    return await lookup(session, ident)
+
+
+# for GETs: 304 with no body when the client's copy is current, otherwise the etag goes on the route's response
+# the route reads after the version was, so at worst a fresh body carries an older etag and the next poll refetches
+def if_none_match(lookup: VersionLookup, path_param: str):
+    async def dependency(
+        request: Request,
+        response: Response,
+        session: AsyncSession = Depends(get_reader_session),
+    ) -> int | None:
+        version = await _lookup(lookup, request, session, path_param)
+        if version is None:
+            return None  # the route answers 404
+        tag = etag(version)
+        tags = _etags(request.headers.get("if-none-match"), weak=True)
+        if tag in tags or "*" in tags:
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": tag})
+        response.headers["ETag"] = tag
+        return version
+
+    return dependency
+
+
+# for PUTs and DELETEs: 412 when the client's copy is stale, before the command loads anything
+# returns the version matched, None without an If-Match, the command takes it as its expected_version
+# so a write landing between this check and the command is refused as well
+def if_match(lookup: VersionLookup, path_param: str):
+    async def dependency(
+        request: Request,
+        session: AsyncSession = Depends(get_reader_session),
+    ) -> int | None:
+        header = request.headers.get("if-match")
+        if header is None:
+            return None
+        version = await _lookup(lookup, request, session, path_param)
+        tags = _etags(header, weak=False)
+        if version is None or not ("*" in tags or etag(version) in tags):
+            raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="resource has changed")
+        return version
+
+    return dependency
+
+
+user_if_none_match = if_none_match(user_views.get_user_version, "user_id")
+user_if_match = if_match(user_views.get_user_version, "user_id")
@@ -4,6 +4,7 @@ from starlette import status
 from starlette.middleware.cors import CORSMiddleware
 
 from app.common.settings import settings
+from app.entrypoints import dependencies as deps
 from app.entrypoints.router import api_v1_router
 
 app = FastAPI(
@@ -16,6 +17,37 @@ app = FastAPI(
 app.include_router(api_v1_router, prefix=settings.api_v1_str)
 
 
+@app.on_event("startup")
+def startup():
+    if deps.REVOCATIONS is not None:
+        deps.REVOCATIONS.start()
+    if deps.VOTE_BUFFER is not None:
+        deps.VOTE_BUFFER.start()
+    if deps.OUTBOX_DISPATCHER is not None:
+        deps.OUTBOX_DISPATCHER.start(workers=settings.outbox_settings.workers)
+    if deps.PROJECTION_RUNNER is not None:
+        deps.PROJECTION_RUNNER.start()
+    if deps.EVENT_STORE_COMPACTOR is not None:
+        deps.EVENT_STORE_COMPACTOR.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    if deps.EVENT_STORE_COMPACTOR is not None:
+        await deps.EVENT_STORE_COMPACTOR.stop()
+    if deps.PROJECTION_RUNNER is not None:
+        await deps.PROJECTION_RUNNER.stop()
+    if deps.OUTBOX_DISPATCHER is not None:
+        await deps.OUTBOX_DISPATCHER.stop()
+    if deps.VOTE_BUFFER is not None:
+        await deps.VOTE_BUFFER.stop()
+    if deps.EVENT_APPENDER is not None:
+        await deps.EVENT_APPENDER.stop()
+    if deps.REVOCATIONS is not None:
+        await deps.REVOCATIONS.stop()
+    deps.PASSWORD_HASHER.shutdown()
+
+
 @app.get("/health", status_code=status.HTTP_200_OK)
 def health():
     return "ok"
@@ -19,6 +19,8 @@ class CreateBug(Command):
 
 
 class UpdateBug(Command):
+    idempotent = True
+
     id: UUID
     title: str
     author_id: UUID
@@ -33,6 +35,8 @@ class UpdateBug(Command):
 
 
 class SoftDeleteBug(Command):
+    idempotent = True
+
     id: UUID
     author_id: UUID
 
@@ -45,6 +49,8 @@ class CreateComment(Command):
 
 
 class UpdateComment(Command):
+    idempotent = True
+
     id: UUID
     bug_id: UUID
     author_id: UUID
@@ -53,6 +59,8 @@ class UpdateComment(Command):
 
 
 class DeleteComment(Command):
+    idempotent = True
+
     id: UUID
     bug_id: UUID
     author_id: UUID
@@ -60,7 +68,9 @@ class DeleteComment(Command):
 
 class Upvote(Command):
     id: UUID
+    user_id: UUID
 
 
 class Downvote(Command):
     id: UUID
+    user_id: UUID
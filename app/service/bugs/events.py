@@ -1,11 +1,17 @@
 from dataclasses import dataclass, field
+from typing import Any
 from uuid import UUID
 
 from app.domain.enums import BugStatusEnum, EnvironmentEnum, RecordStatusEnum, UrgencyEnum
-from app.domain.events import Event
+from app.domain.events import UNSET, Event
 
 
-@dataclass
+# comment events work on a Bugs, finding their comment in it, or straight on the Comments like any other event
+def _is_bug(model: Any) -> bool:
+    return hasattr(model, "find_comment")
+
+
+@dataclass(frozen=True, slots=True)
 class BugCreated(Event):
     id: UUID = field(repr=False)
     title: str = field(repr=False)
@@ -21,29 +27,36 @@ class BugCreated(Event):
     images: list[str] = field(repr=False)
 
 
-@dataclass
+# only the fields the update changed, see Base.changes
+@dataclass(frozen=True, slots=True)
 class BugUpdated(Event):
     id: UUID = field(repr=False)
-    title: str = field(repr=False)
-    author_id: UUID = field(repr=False)
-    assignee_id: UUID | None = field(repr=False)
-    description: str = field(repr=False)
-    environment: EnvironmentEnum = field(repr=False)
-    urgency: UrgencyEnum = field(repr=False)
-    status: BugStatusEnum = field(repr=False)
-    record_status: RecordStatusEnum = field(repr=False)
-    version: int = field(repr=False)
-    edited: bool = field(repr=False)
-    images: list[str] = field(repr=False)
-
-
-@dataclass
+    title: str = field(default=UNSET, repr=False)
+    author_id: UUID = field(default=UNSET, repr=False)
+    assignee_id: UUID | None = field(default=UNSET, repr=False)
+    description: str = field(default=UNSET, repr=False)
+    environment: EnvironmentEnum = field(default=UNSET, repr=False)
+    urgency: UrgencyEnum = field(default=UNSET, repr=False)
+    status: BugStatusEnum = field(default=UNSET, repr=False)
+    record_status: RecordStatusEnum = field(default=UNSET, repr=False)
+    version: int = field(default=UNSET, repr=False)
+    edited: bool = field(default=UNSET, repr=False)
+    images: list[str] = field(default=UNSET, repr=False)
+
+
+# Event.apply and not super().apply, slots=True builds a new class that super() without arguments doesn't know
+@dataclass(frozen=True, slots=True)
 class BugSoftDeleted(Event):
     id: UUID = field(repr=False)
     record_status: RecordStatusEnum = field(default_factory=lambda: RecordStatusEnum.DELETED, repr=False)
 
+    def apply(self, model: Any):
+        Event.apply(self, model)
+        model.version += 1  # same as Bugs.delete_bug
+        return model
 
-@dataclass
+
+@dataclass(frozen=True, slots=True)
 class CommentCreated(Event):
     id: UUID = field(repr=False)
     bug_id: UUID = field(repr=False)
@@ -52,10 +65,25 @@ class CommentCreated(Event):
     vote_count: int = field(default_factory=lambda: 0, repr=False)
     edited: bool = field(default_factory=lambda: True, repr=False)
 
-    # TODO: custom event applier to add Comment to Bug
-
-
-@dataclass
+    def apply(self, model: Any):
+        if not _is_bug(model):
+            return Event.apply(self, model)
+        from app.domain.models import Comments
+
+        model.append_comment(
+            Comments(
+                id=self.id,
+                bug_id=self.bug_id,
+                author_id=self.author_id,
+                text=self.text,
+                vote_count=self.vote_count,
+                edited=self.edited,
+            )
+        )
+        return model
+
+
+@dataclass(frozen=True, slots=True)
 class CommentUpdated(Event):
     id: UUID = field(repr=False)
     bug_id: UUID = field(repr=False)
@@ -63,22 +91,53 @@ class CommentUpdated(Event):
     text: str = field(repr=False)
     edited: bool = field(repr=False)
 
-    # TODO: custom event applier to update Comment already in Bug
+    def apply(self, model: Any):
+        if not _is_bug(model):
+            return Event.apply(self, model)
+        comment = model.find_comment(self.id)
+        if comment is not None:
+            comment.text = self.text
+            comment.edited = self.edited
+        return model
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class CommentDeleted(Event):
     id: UUID = field(repr=False)
     record_status: RecordStatusEnum = field(default_factory=lambda: RecordStatusEnum.DELETED, repr=False)
 
-    # TODO: custom event applier to delete Comment already in Bug
+    def apply(self, model: Any):
+        if not _is_bug(model):
+            return Event.apply(self, model)
+        model.remove_comment(self.id)
+        return model
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Upvoted(Event):
     comment_id: UUID = field(repr=False)
+    user_id: UUID | None = field(default_factory=lambda: None, repr=False)
+    weight: int = field(default_factory=lambda: 1, repr=False)  # 2 when a downvote is flipped
+
+    def apply(self, model: Any):
+        if not _is_bug(model):
+            return Event.apply(self, model)
+        comment = model.find_comment(self.comment_id)
+        if comment is not None:
+            comment.vote_count += self.weight
+        return model
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Downvoted(Event):
     comment_id: UUID = field(repr=False)
+    user_id: UUID | None = field(default_factory=lambda: None, repr=False)
+    weight: int = field(default_factory=lambda: 1, repr=False)  # 2 when an upvote is flipped
+
+    def apply(self, model: Any):
+        if not _is_bug(model):
+            return Event.apply(self, model)
+        comment = model.find_comment(self.comment_id)
+        if comment is not None:
+            comment.vote_count -= self.weight
+        return model
@@ -1,8 +1,7 @@
-from sqlalchemy.future import select
-
 from app.domain.models import Bugs, Comments
 from app.service import exceptions as exc
-from app.service.bugs import commands
+from app.service.bugs import commands, events, votes
+from app.service.bugs.votes import CommentVoteBuffer
 from app.service.unit_of_work import AbstractUnitOfWork
 
 
@@ -10,51 +9,47 @@ async def create_bug(cmd: commands.CreateBug, *, uow: AbstractUnitOfWork):
     async with uow:
         new_bug: Bugs = Bugs.create_bug(cmd.dict())
         uow.bugs.add(new_bug)
-        uow.event_store.add(new_bug.generate_event_store())
         await uow.commit()
         return new_bug.id
 
 
 async def update_bug(cmd: commands.UpdateBug, *, uow: AbstractUnitOfWork):
     async with uow:
-        bug: Bugs | None = await uow.bugs.get(cmd.id)
+        bug: Bugs | None = await uow.bugs.get(cmd.id, profile="summary")
         if not bug:
             raise exc.ItemNotFound(f"bug with id {cmd.id} not found")
         if bug.author_id != cmd.author_id:
             raise exc.Forbidden("user is forbidden from editing this report")
         bug.update_bug(cmd.dict(exclude_unset=True))
-        uow.event_store.add(bug.generate_event_store())
         await uow.commit()
         return bug.id
 
 
 async def soft_delete_bug(cmd: commands.SoftDeleteBug, *, uow: AbstractUnitOfWork):
     async with uow:
-        bug: Bugs | None = await uow.bugs.get(cmd.id)
+        bug: Bugs | None = await uow.bugs.get(cmd.id, profile="summary")
         if not bug:
             raise exc.ItemNotFound(f"bug with id {cmd.id} not found")
         if bug.author_id != cmd.author_id:
             raise exc.Forbidden("user is forbidden from editing this report")
         bug.delete_bug()
-        uow.event_store.add(bug.generate_event_store())
         await uow.commit()
         return
 
 
 async def create_comment(cmd: commands.CreateComment, *, uow: AbstractUnitOfWork):
     async with uow:
-        bug: Bugs | None = await uow.bugs.get(cmd.bug_id)
+        bug: Bugs | None = await uow.bugs.get(cmd.bug_id, profile="new_comment")
         if not bug:
             raise exc.ItemNotFound(f"bug with id {cmd.bug_id} not found")
         comment: Comments = bug.add_comment(cmd.dict())
-        uow.event_store.add(bug.generate_event_store())
         await uow.commit()
         return comment.id
 
 
 async def update_comment(cmd: commands.UpdateComment, *, uow: AbstractUnitOfWork):
     async with uow:
-        bug: Bugs | None = await uow.bugs.get(cmd.bug_id)
+        bug: Bugs | None = await uow.bugs.get(cmd.bug_id, profile="comment", comment_id=cmd.id)
         if not bug:
             raise exc.ItemNotFound(f"bug with id {cmd.bug_id} not found")
         comment: Comments | None = bug.find_comment(cmd.id)
@@ -63,14 +58,13 @@ async def update_comment(cmd: commands.UpdateComment, *, uow: AbstractUnitOfWork
         if comment.author_id != cmd.author_id:
             raise exc.Forbidden("user is forbidden from editing")
         bug.update_comment(cmd.id, cmd.dict())
-        uow.event_store.add(bug.generate_event_store())
         await uow.commit()
         return comment.id
 
 
 async def delete_comment(cmd: commands.DeleteComment, *, uow: AbstractUnitOfWork):
     async with uow:
-        bug: Bugs | None = await uow.bugs.get(cmd.bug_id)
+        bug: Bugs | None = await uow.bugs.get(cmd.bug_id, profile="comment", comment_id=cmd.id)
         if not bug:
             raise exc.ItemNotFound(f"bug with id {cmd.bug_id} not found")
         comment: Comments | None = bug.find_comment(cmd.id)
@@ -80,22 +74,32 @@ async def delete_comment(cmd: commands.DeleteComment, *, uow: AbstractUnitOfWork
             raise exc.Forbidden("user is forbidden from editing")
         comment = bug.delete_comment(cmd.id)
         await uow.session.delete(comment)
-        uow.event_store.add(bug.generate_event_store())
         await uow.commit()
         return
 
 
-async def upvote_downvote_comment(cmd: commands.Upvote | commands.Downvote, *, uow: AbstractUnitOfWork):
+async def upvote_downvote_comment(
+    cmd: commands.Upvote | commands.Downvote,
+    *,
+    uow: AbstractUnitOfWork,
+    vote_buffer: CommentVoteBuffer | None = None,
+):
+    value = 1 if isinstance(cmd, commands.Upvote) else -1
     async with uow:
-        query = select(Bugs).join(Comments, Comments.bug_id == Bugs.id).where(Comments.id == cmd.id)
-        execution = await uow.session.execute(query)
-        bug: Bugs | None = execution.scalar_one_or_none()
-        if bug:
-            if isinstance(cmd, commands.Upvote):
-                bug.upvote_comment(cmd.id)
-            elif isinstance(cmd, commands.Downvote):
-                bug.downvote_comment(cmd.id)
-            uow.event_store.add(bug.generate_event_store())
-            await uow.commit()
-            return
-        return None
+        vote = await votes.cast_vote(uow.session, cmd.id, cmd.user_id, value)
+        if vote is None:
+            raise exc.ItemNotFound(f"comment with id {cmd.id} not found")
+        bug_id, delta = vote
+        if delta == 0:
+            return  # same vote again
+        if vote_buffer is None:
+            await votes.increment_vote_counts(uow.session, {cmd.id: delta})
+        event: events.Upvoted | events.Downvoted
+        if delta > 0:
+            event = events.Upvoted(comment_id=cmd.id, user_id=cmd.user_id, weight=delta)
+        else:
+            event = events.Downvoted(comment_id=cmd.id, user_id=cmd.user_id, weight=-delta)
+        uow.publish(bug_id, event)
+        await uow.commit()
+    if vote_buffer is not None:
+        vote_buffer.add(cmd.id, delta)
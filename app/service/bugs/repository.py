@@ -1,18 +1,34 @@
+from sqlalchemy import bindparam
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import joinedload, noload, raiseload, selectinload
 from sqlalchemy.sql.selectable import Select
 
 from app.adapters.repository import SqlAlchemyRepository
-from app.domain.models import Bugs
+from app.domain.models import Bugs, Comments
 
 
 class BugRepository(SqlAlchemyRepository[Bugs]):
     def __init__(self, session: AsyncSession):
         super(BugRepository, self).__init__(session, Bugs)
-        self.query: Select = (
-            select(Bugs)
-            .options(selectinload(Bugs.comments))
-            .options(selectinload(Bugs.author))
-            .options(selectinload(Bugs.assignee))
-        )
+        self.profiles: dict[str, Select] = {
+            # every column, relationships raise instead of lazy loading
+            "summary": select(Bugs).options(raiseload("*")),
+            # the aggregate plus all of its comments
+            "comments": select(Bugs).options(selectinload(Bugs.comments), raiseload("*")),
+            # comments start out empty without a query, a comment appended to them is still flushed
+            "new_comment": select(Bugs).options(noload(Bugs.comments), raiseload("*")),
+            # comments hold only the one with the comment_id param, joined in so it's a single query,
+            # empty when the bug has no such comment
+            "comment": select(Bugs).options(
+                joinedload(Bugs.comments.and_(Comments.id == bindparam("comment_id"))),  # type: ignore
+                raiseload("*"),
+            ),
+            "full": (
+                select(Bugs)
+                .options(selectinload(Bugs.comments))
+                .options(selectinload(Bugs.author))
+                .options(selectinload(Bugs.assignee))
+            ),
+        }
+        self.query: Select = self.profiles["full"]
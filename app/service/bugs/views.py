@@ -0,0 +1,95 @@
+from uuid import UUID
+
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.adapters.orm import comments, users
+from app.domain import enums
+from app.domain.read_models import BugsReadModel, CommentReadModel
+from app.utils.helpers import Page, build_keyset_page, set_keyset_pagination
+
+# search_query key -> read model column it filters on with equality
+EXACT_FILTERS = {
+    "status": "status",
+    "urgency": "urgency",
+    "environment": "environment",
+    "assignee": "assigned_user_id",
+    "author": "author_id",
+}
+
+# CommentReadModel's fields in order
+COMMENT_COLUMNS = [
+    comments.c.bug_id,
+    comments.c.id.label("comment_id"),
+    comments.c.create_dt.label("comment_create_dt"),
+    comments.c.update_dt.label("comment_update_dt"),
+    comments.c.text,
+    comments.c.vote_count,
+    comments.c.edited,
+    users.c.id.label("user_id"),
+    users.c.create_dt.label("user_create_dt"),
+    users.c.update_dt.label("user_update_dt"),
+    users.c.username,
+    users.c.email,
+    users.c.user_type,
+    users.c.user_status,
+    users.c.is_admin,
+]
+
+
+# everything comes off bug_tracker_bugs_read_model, see BugReadModelProjector
+# an exact filter plus newest first ordering is a range of one of its (column, bug_created_dt, bug_id) indexes
+async def get_bugs_list(
+    session: AsyncSession,
+    search_query: dict | None,
+    cursor: str | None,
+    count_per_page: int = 20,
+) -> Page:
+    query = select(BugsReadModel).where(BugsReadModel.record_status == enums.RecordStatusEnum.ACTIVE)  # type: ignore
+    filters = []
+    for key, value in (search_query or {}).items():
+        if key in EXACT_FILTERS:
+            filters.append(getattr(BugsReadModel, EXACT_FILTERS[key]) == value)
+        elif key == "title":
+            filters.append(BugsReadModel.title.ilike(f"%{value}%"))  # type: ignore
+    query = query.where(*filters)
+    sort_columns = [BugsReadModel.bug_created_dt, BugsReadModel.bug_id]
+    query = set_keyset_pagination(query, sort_columns, cursor, count_per_page, descending=True)
+    execution = await session.execute(query)
+    bugs = execution.scalars().all()
+    return build_keyset_page(bugs, sort_columns, cursor, count_per_page)
+
+
+# open bugs per status and urgency, for everyone or for one assignee
+async def get_bugs_dashboard(session: AsyncSession, assignee_id: UUID | None = None) -> dict[str, dict[str, int]]:
+    query = (
+        select(BugsReadModel.status, BugsReadModel.urgency, sa.func.count())
+        .where(BugsReadModel.record_status == enums.RecordStatusEnum.ACTIVE)  # type: ignore
+        .group_by(BugsReadModel.status, BugsReadModel.urgency)
+    )
+    if assignee_id is not None:
+        query = query.where(BugsReadModel.assigned_user_id == assignee_id)  # type: ignore
+    execution = await session.execute(query)
+    dashboard: dict[str, dict[str, int]] = {}
+    for status, urgency, count in execution.all():
+        dashboard.setdefault(status, {})[urgency] = count
+    return dashboard
+
+
+# a bug's comments oldest first with their authors, a range of the (bug_id, create_dt, id) index per page
+# rows come back as CommentReadModel values, nothing is mapped or tracked by the session
+async def get_bug_comments(
+    session: AsyncSession,
+    bug_id: UUID,
+    cursor: str | None,
+    count_per_page: int = 50,
+) -> Page:
+    query = (
+        sa.select(*COMMENT_COLUMNS).join(users, users.c.id == comments.c.author_id).where(comments.c.bug_id == bug_id)
+    )
+    sort_columns = [COMMENT_COLUMNS[2], COMMENT_COLUMNS[1]]
+    query = set_keyset_pagination(query, sort_columns, cursor, count_per_page)
+    execution = await session.execute(query)
+    rows = [CommentReadModel(*row) for row in execution.all()]
+    return build_keyset_page(rows, sort_columns, cursor, count_per_page)
@@ -0,0 +1,117 @@
+import asyncio
+import contextlib
+import logging
+from collections import defaultdict
+from uuid import UUID
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.adapters.orm import comments, votes
+from app.service.unit_of_work import AbstractUnitOfWork
+
+logger = logging.getLogger(__name__)
+
+
+# votes never load the bug aggregate, the votes table makes them idempotent per user
+# and vote_count is only ever changed with a server side increment so concurrent voters can't lose updates
+async def cast_vote(session: AsyncSession, comment_id: UUID, user_id: UUID, value: int) -> tuple[UUID, int] | None:
+    # returns the comment's bug id and how much vote_count has to change, None if the comment does not exist
+    execution = await session.execute(sa.select(comments.c.bug_id).where(comments.c.id == comment_id))
+    bug_id: UUID | None = execution.scalar_one_or_none()
+    if bug_id is None:
+        return None
+
+    inserted = await session.execute(
+        postgresql.insert(votes)
+        .values(comment_id=comment_id, user_id=user_id, value=value)
+        .on_conflict_do_nothing(index_elements=[votes.c.comment_id, votes.c.user_id])
+        .returning(votes.c.id)
+    )
+    if inserted.first() is not None:
+        return bug_id, value
+
+    # the user already voted, lock their vote so two flips from the same user can't race
+    same_vote = (votes.c.comment_id == comment_id) & (votes.c.user_id == user_id)
+    execution = await session.execute(sa.select(votes.c.value).where(same_vote).with_for_update())
+    previous: int = execution.scalar_one()
+    if previous == value:
+        return bug_id, 0
+    await session.execute(sa.update(votes).where(same_vote).values(value=value))
+    return bug_id, value - previous
+
+
+async def increment_vote_counts(session: AsyncSession, deltas: dict[UUID, int]):
+    # one UPDATE for any number of comments, ordered by id so concurrent flushes lock rows in the same order
+    if not deltas:
+        return
+    rows = sa.values(
+        sa.column("id", postgresql.UUID(as_uuid=True)),
+        sa.column("delta", sa.Integer),
+        name="deltas",
+    ).data(sorted(deltas.items()))
+    await session.execute(
+        sa.update(comments).where(comments.c.id == rows.c.id).values(vote_count=comments.c.vote_count + rows.c.delta)
+    )
+
+
+# write behind buffer for vote storms, deltas are summed per comment and flushed every window
+# the votes rows are still written in the request so a crash only loses count increments,
+# recount_votes rebuilds them from the votes table
+class CommentVoteBuffer:
+    def __init__(self, uow: AbstractUnitOfWork, window: float = 0.05):
+        self.uow = uow  # only used by the flushes, never shared with request handlers
+        self.window = window
+        self.pending: defaultdict[UUID, int] = defaultdict(int)
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    def add(self, comment_id: UUID, delta: int):
+        self.pending[comment_id] += delta
+
+    async def flush(self) -> int:
+        async with self._lock:
+            deltas = {comment_id: delta for comment_id, delta in self.pending.items() if delta}
+            self.pending = defaultdict(int)
+            if not deltas:
+                return 0
+            try:
+                async with self.uow:
+                    await increment_vote_counts(self.uow.session, deltas)
+                    await self.uow.commit()
+            except Exception:
+                for comment_id, delta in deltas.items():
+                    self.pending[comment_id] += delta
+                raise
+            return len(deltas)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.window)
+            try:
+                await self.flush()
+            except Exception:
+                # the deltas are kept for the next flush
+                logger.exception("flushing buffered votes for %d comments failed", len(self.pending))
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self.flush()
+
+
+async def recount_votes(session: AsyncSession, comment_ids: list[UUID]):
+    total = (
+        sa.select(sa.func.coalesce(sa.func.sum(votes.c.value), 0))
+        .where(votes.c.comment_id == comments.c.id)
+        .scalar_subquery()
+    )
+    await session.execute(sa.update(comments).where(comments.c.id.in_(comment_ids)).values(vote_count=total))
@@ -0,0 +1,310 @@
+# folds the history of aggregates nobody touched for a while into a single AggregateCompacted row
+# usage: make compact ARGS="--idle-days 90 --archive file"
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import struct
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, BinaryIO, Iterator, Sequence, Type
+from uuid import UUID
+
+import sqlalchemy as sa
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.adapters.orm import event_archive, event_store, projection_checkpoints, snapshots
+from app.common.settings import ArchiveEnum
+from app.domain.events import AggregateCompacted
+from app.domain.models import Base, Bugs, Users
+from app.service.event_store.deltas import DELETED_EVENTS, UPDATED_EVENTS
+from app.service.event_store.repository import COMPACTED_EVENT, fold_events
+
+logger = logging.getLogger(__name__)
+LOCK_NOT_AVAILABLE = "55P03"  # sqlstate of a lock_timeout running out
+
+AGGREGATE_TYPES: dict[str, Type[Base]] = {"Bugs": Bugs, "Users": Users}
+CREATED_EVENTS: dict[str, Type[Base]] = {"BugCreated": Bugs, "UserCreated": Users}
+# an archive file is a run of these, each followed by `length` bytes of archive payload
+ARCHIVE_RECORD = struct.Struct("!16sI")  # aggregate id, length
+ROW_SIZE = sa.func.pg_column_size(sa.literal_column(f"{event_store.name}.*"))
+
+
+@dataclass
+class CompactionReport:
+    aggregates: int = 0
+    events: int = 0  # rows deleted, the rewritten first rows aren't counted
+    bytes_removed: int = 0  # every row of the compacted aggregates as they were
+    bytes_written: int = 0  # the AggregateCompacted rows that replace them
+    bytes_archived: int = 0
+
+    # space autovacuum can hand back to the event store, the archive table has its own
+    @property
+    def bytes_reclaimed(self) -> int:
+        return self.bytes_removed - self.bytes_written
+
+    def __str__(self):
+        return (
+            f"{self.aggregates} aggregates compacted, {self.events} events removed, "
+            f"{self.bytes_reclaimed} bytes reclaimed, {self.bytes_archived} bytes archived"
+        )
+
+
+def pack_events(rows: Sequence[Any]) -> bytes:
+    return zlib.compress(
+        json.dumps(
+            [[row.seq, row.create_dt.isoformat(), row.event_name, row.event_data] for row in rows],
+            separators=(",", ":"),
+        ).encode()
+    )
+
+
+def unpack_events(payload: bytes) -> list[dict[str, Any]]:
+    return [
+        {"seq": seq, "create_dt": datetime.fromisoformat(create_dt), "event_name": name, "event_data": data}
+        for seq, create_dt, name, data in json.loads(zlib.decompress(payload))
+    ]
+
+
+def write_archive_record(file: BinaryIO, aggregate_id: UUID, payload: bytes) -> int:
+    file.write(ARCHIVE_RECORD.pack(aggregate_id.bytes, len(payload)))
+    file.write(payload)
+    return ARCHIVE_RECORD.size + len(payload)
+
+
+def read_archive_file(path: str) -> Iterator[tuple[UUID, list[dict[str, Any]]]]:
+    with open(path, "rb") as file:
+        while header := file.read(ARCHIVE_RECORD.size):
+            aggregate_id, length = ARCHIVE_RECORD.unpack(header)
+            yield UUID(bytes=aggregate_id), unpack_events(file.read(length))
+
+
+def compact(rows: Sequence[Any]) -> AggregateCompacted | None:
+    # one aggregate's rows in seq order, None when the first one isn't where its history starts
+    first = rows[0]
+    if first.event_name == COMPACTED_EVENT:
+        aggregate_type = AGGREGATE_TYPES[first.event_data["aggregate"]]
+    elif first.event_name in CREATED_EVENTS:
+        aggregate_type = CREATED_EVENTS[first.event_name]
+    else:
+        return None
+    aggregate, version, _ = fold_events(aggregate_type, ((row.event_name, row.event_data) for row in rows))
+    updated_dt = first.event_data.get("updated_dt") if first.event_name == COMPACTED_EVENT else None
+    for row in rows:
+        if row.event_name in UPDATED_EVENTS or row.event_name in DELETED_EVENTS:
+            updated_dt = row.create_dt.isoformat()
+    return AggregateCompacted(
+        aggregate=aggregate_type.__name__,
+        state=aggregate.snapshot(),
+        version=version,
+        updated_dt=updated_dt,
+    )
+
+
+# every batch is its own short transaction over aggregates that are idle by definition,
+# so it only ever row locks events nobody is writing to and gives up rather than wait on anyone else's locks
+# an aggregate's first row is rewritten in place so it keeps its seq, txid and create_dt,
+# anything appended while a batch runs still sorts after it and projections never see the row again
+class EventStoreCompactor:
+    def __init__(
+        self,
+        session_factory: sessionmaker,
+        idle: timedelta = timedelta(days=90),
+        batch_size: int = 100,
+        batch_events: int = 10000,
+        archive: ArchiveEnum = ArchiveEnum.NONE,
+        archive_dir: str = "archive",
+        interval: float = 86400.0,
+    ):
+        self.session_factory = session_factory
+        self.idle = idle
+        self.batch_size = batch_size
+        self.batch_events = batch_events
+        self.archive = archive
+        self.archive_dir = archive_dir
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+
+    async def _candidates(self, session: AsyncSession, after: UUID | None, cutoff: datetime) -> list[UUID]:
+        # only what every projection has already read, a lagging one would miss the folded away events
+        # with no projections at all anything that finished before this transaction started will do
+        checkpoint = sa.func.coalesce(
+            sa.select(sa.func.min(projection_checkpoints.c.txid)).scalar_subquery(),
+            sa.func.txid_snapshot_xmin(sa.func.txid_current_snapshot()),
+        )
+        query = (
+            sa.select(event_store.c.aggregate_id, sa.func.count().label("events"))
+            .where(event_store.c.aggregate_id.isnot(None))
+            .group_by(event_store.c.aggregate_id)
+            .having(
+                sa.and_(
+                    sa.func.count() > 1,
+                    sa.func.max(event_store.c.create_dt) < cutoff,
+                    sa.func.max(event_store.c.txid) < checkpoint,
+                )
+            )
+            .order_by(event_store.c.aggregate_id)
+            .limit(self.batch_size)
+        )
+        if after is not None:
+            query = query.where(event_store.c.aggregate_id > after)
+        execution = await session.execute(query)
+        aggregate_ids: list[UUID] = []
+        events = 0
+        for aggregate_id, count in execution.all():
+            if aggregate_ids and events + count > self.batch_events:
+                break
+            aggregate_ids.append(aggregate_id)
+            events += count
+        return aggregate_ids
+
+    async def compact_batch(
+        self, after: UUID | None, cutoff: datetime, report: CompactionReport, archive_file: BinaryIO | None = None
+    ) -> UUID | None:
+        # the next batch of idle aggregates after `after`, returns the last one or None when there are none left
+        async with self.session_factory() as session:
+            async with session.begin():
+                await session.execute(sa.text("SET LOCAL lock_timeout = '1s'"))
+                aggregate_ids = await self._candidates(session, after, cutoff)
+                if not aggregate_ids:
+                    return None
+                execution = await session.execute(
+                    sa.select(
+                        event_store.c.aggregate_id,
+                        event_store.c.id,
+                        event_store.c.create_dt,
+                        event_store.c.seq,
+                        event_store.c.event_name,
+                        event_store.c.event_data,
+                        ROW_SIZE.label("size"),
+                    )
+                    .where(event_store.c.aggregate_id.in_(aggregate_ids))
+                    .order_by(event_store.c.aggregate_id, event_store.c.seq)
+                    .with_for_update()
+                )
+                streams: dict[UUID, list[Any]] = {}
+                for row in execution.all():
+                    streams.setdefault(row.aggregate_id, []).append(row)
+
+                compacted_ids: list[UUID] = []
+                archived: list[dict[str, Any]] = []
+                deleted: list[UUID] = []
+                for aggregate_id, rows in streams.items():
+                    compacted = compact(rows)
+                    if compacted is None:
+                        continue
+                    first = rows[0]
+                    # create_dt keeps the update to the partition the row is in
+                    execution = await session.execute(
+                        sa.update(event_store)
+                        .where(event_store.c.id == first.id, event_store.c.create_dt == first.create_dt)
+                        .values(event_name=compacted.name(), event_data=compacted.dict())
+                        .returning(ROW_SIZE)
+                    )
+                    report.bytes_written += execution.scalar_one()
+                    report.bytes_removed += sum(row.size for row in rows)
+                    report.events += len(rows) - 1
+                    report.aggregates += 1
+                    compacted_ids.append(aggregate_id)
+                    deleted.extend(row.id for row in rows[1:])
+
+                    if self.archive != ArchiveEnum.NONE:
+                        payload = pack_events(rows)
+                        if archive_file is not None:
+                            report.bytes_archived += write_archive_record(archive_file, aggregate_id, payload)
+                        else:
+                            report.bytes_archived += len(payload)
+                            archived.append(
+                                {
+                                    "aggregate_id": aggregate_id,
+                                    "first_seq": first.seq,
+                                    "last_seq": rows[-1].seq,
+                                    "event_count": len(rows),
+                                    "payload": payload,
+                                }
+                            )
+
+                if deleted:
+                    await session.execute(sa.delete(event_store).where(event_store.c.id.in_(deleted)))
+                if archived:
+                    await session.execute(sa.insert(event_archive), archived)
+                if compacted_ids:
+                    # they point at seqs that are gone
+                    await session.execute(sa.delete(snapshots).where(snapshots.c.aggregate_id.in_(compacted_ids)))
+                if archive_file is not None:
+                    # on disk before the events are gone, a failed commit only leaves a duplicate behind
+                    archive_file.flush()
+                    os.fsync(archive_file.fileno())
+                return aggregate_ids[-1]
+
+    # a run over the whole event store, running it again straight after finds nothing left to do
+    async def run_once(self, now: datetime | None = None) -> CompactionReport:
+        now = now or datetime.now(timezone.utc)
+        report = CompactionReport()
+        after: UUID | None = None
+        with contextlib.ExitStack() as stack:
+            archive_file = None
+            if self.archive == ArchiveEnum.FILE:
+                os.makedirs(self.archive_dir, exist_ok=True)
+                path = os.path.join(self.archive_dir, f"events-{now:%Y%m%dT%H%M%S}.bin")
+                archive_file = stack.enter_context(open(path, "ab"))
+            while after := await self.compact_batch(after, now - self.idle, report, archive_file):
+                pass
+        return report
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except DBAPIError as e:
+                # a batch waits at most lock_timeout on aggregates that are being written, losing that is expected
+                if getattr(e.orig.__cause__, "sqlstate", None) == LOCK_NOT_AVAILABLE:
+                    logger.warning("compaction gave up on a locked batch, next run in %ss", self.interval)
+                else:
+                    logger.exception("compaction failed")
+            except Exception:
+                logger.exception("compaction failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+
+async def main(idle_days: int, batch_size: int, archive: ArchiveEnum, archive_dir: str):
+    from app.common.db import async_transactional_session_factory, engine
+
+    assert async_transactional_session_factory is not None and engine is not None
+    compactor = EventStoreCompactor(
+        async_transactional_session_factory,
+        idle=timedelta(days=idle_days),
+        batch_size=batch_size,
+        archive=archive,
+        archive_dir=archive_dir,
+    )
+    print(await compactor.run_once())
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    from app.common.settings import settings
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--idle-days", type=int, default=settings.compaction_settings.idle_days)
+    parser.add_argument("--batch-size", type=int, default=settings.compaction_settings.batch_size)
+    parser.add_argument("--archive", type=ArchiveEnum, default=settings.compaction_settings.archive)
+    parser.add_argument("--archive-dir", default=settings.compaction_settings.archive_dir)
+    args = parser.parse_args()
+    asyncio.run(main(args.idle_days, args.batch_size, args.archive, args.archive_dir))
@@ -0,0 +1,136 @@
+# rewrites BugUpdated and UserUpdated rows from before update events became deltas down to the fields they changed
+# usage: make deltas ARGS="--batch-size 500"
+import argparse
+import asyncio
+import json
+from dataclasses import dataclass
+from typing import Any, Iterable
+from uuid import UUID
+
+import sqlalchemy as sa
+from sqlalchemy.orm import sessionmaker
+
+from app.adapters.orm import event_store
+
+CREATED_EVENTS = ("BugCreated", "UserCreated")
+UPDATED_EVENTS = ("BugUpdated", "UserUpdated")
+DELETED_EVENTS = ("BugSoftDeleted", "UserSoftDeleted")
+
+
+@dataclass
+class DeltaReport:
+    aggregates: int = 0
+    rewritten: int = 0
+    bytes_before: int = 0
+    bytes_after: int = 0
+
+    def __str__(self):
+        return (
+            f"{self.rewritten} update events of {self.aggregates} aggregates rewritten, "
+            f"{self.bytes_before} -> {self.bytes_after} bytes of event_data"
+        )
+
+
+def delta(state: dict[str, Any], data: dict[str, Any]) -> dict[str, Any]:
+    # keys the state has never seen are kept, an aggregate whose created event is gone keeps its updates whole
+    return {key: value for key, value in data.items() if key == "id" or key not in state or state[key] != value}
+
+
+def fold_deltas(events: Iterable[tuple[str, dict[str, Any]]]) -> Iterable[tuple[int, dict[str, Any]]]:
+    # one aggregate's (event_name, event_data) in seq order, yields (index, delta) of the update events to rewrite
+    state: dict[str, Any] = {}
+    for index, (name, data) in enumerate(events):
+        if name in CREATED_EVENTS:
+            state = dict(data)
+        elif name == "AggregateCompacted":
+            state = dict(data["state"])
+        elif name in UPDATED_EVENTS:
+            changed = delta(state, data)
+            if len(changed) < len(data):
+                yield index, changed
+            state.update(data)
+        elif name in DELETED_EVENTS:
+            state.update(data)
+            if "version" in state and name == "BugSoftDeleted":
+                state["version"] += 1  # same as BugSoftDeleted.apply
+
+
+async def compact_batch(session_factory: sessionmaker, after: UUID | None, batch_size: int, report: DeltaReport):
+    # the next batch_size aggregates with update events, returns the last one or None when there are none left
+    async with session_factory() as session:
+        async with session.begin():
+            query = (
+                sa.select(event_store.c.aggregate_id)
+                .where(event_store.c.event_name.in_(UPDATED_EVENTS))
+                .group_by(event_store.c.aggregate_id)
+                .order_by(event_store.c.aggregate_id)
+                .limit(batch_size)
+            )
+            if after is not None:
+                query = query.where(event_store.c.aggregate_id > after)
+            execution = await session.execute(query)
+            aggregate_ids: list[UUID] = execution.scalars().all()
+            if not aggregate_ids:
+                return None
+
+            execution = await session.execute(
+                sa.select(
+                    event_store.c.aggregate_id,
+                    event_store.c.id,
+                    event_store.c.create_dt,
+                    event_store.c.event_name,
+                    event_store.c.event_data,
+                )
+                .where(event_store.c.aggregate_id.in_(aggregate_ids))
+                .order_by(event_store.c.aggregate_id, event_store.c.seq)
+            )
+            streams: dict[UUID, list[Any]] = {}
+            for row in execution.all():
+                streams.setdefault(row.aggregate_id, []).append(row)
+
+            rewrites = []
+            for rows in streams.values():
+                for index, changed in fold_deltas((row.event_name, row.event_data) for row in rows):
+                    row = rows[index]
+                    rewrites.append({"_id": row.id, "_create_dt": row.create_dt, "event_data": changed})
+                    report.bytes_before += len(json.dumps(row.event_data))
+                    report.bytes_after += len(json.dumps(changed))
+            if rewrites:
+                # create_dt keeps each update to the one partition the row is in
+                await session.execute(
+                    sa.update(event_store)
+                    .where(
+                        event_store.c.id == sa.bindparam("_id"),
+                        event_store.c.create_dt == sa.bindparam("_create_dt"),
+                    )
+                    .values(event_data=sa.bindparam("event_data")),
+                    rewrites,
+                )
+            report.aggregates += len(aggregate_ids)
+            report.rewritten += len(rewrites)
+            return aggregate_ids[-1]
+
+
+# every batch commits on its own, running it again just finds nothing left to shrink
+async def compact_update_events(session_factory: sessionmaker, batch_size: int = 500) -> DeltaReport:
+    report = DeltaReport()
+    after: UUID | None = None
+    while True:
+        after = await compact_batch(session_factory, after, batch_size, report)
+        if after is None:
+            return report
+
+
+async def main(batch_size: int):
+    from app.common.db import async_transactional_session_factory, engine
+
+    assert async_transactional_session_factory is not None and engine is not None
+    print(await compact_update_events(async_transactional_session_factory, batch_size))
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=500, help="aggregates per transaction")
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size))
@@ -0,0 +1,112 @@
+# monthly partitions of the event store, run ahead of time so new events never land in the default partition
+# usage: make partitions ARGS="--ahead 3 --detach-before 2025-01"
+import argparse
+import asyncio
+import re
+from datetime import datetime, timezone
+
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.adapters.orm import event_store
+from app.common.settings import settings
+
+DEFAULT_PARTITION = f"{event_store.name}_default"
+PARTITION_NAME = re.compile(rf"^{event_store.name}_y(\d{{4}})m(\d{{2}})$")
+
+
+def month_start(dt: datetime) -> datetime:
+    dt = dt.astimezone(timezone.utc) if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+    return dt.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"{event_store.name}_y{month.year:04d}m{month.month:02d}"
+
+
+async def list_partitions(session: AsyncSession) -> dict[str, datetime]:
+    # monthly partitions by name with the month they start at, the default partition is left out
+    execution = await session.execute(
+        sa.text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:table AS regclass)"
+        ),
+        {"table": event_store.name},
+    )
+    partitions = {}
+    for (name,) in execution.all():
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions[name] = datetime(int(match[1]), int(match[2]), 1, tzinfo=timezone.utc)
+    return partitions
+
+
+async def create_partition(session: AsyncSession, month: datetime) -> str | None:
+    # built next to the table and attached, anything of that month already sitting in the default partition
+    # moves over first or the attach would refuse
+    month = month_start(month)
+    name = partition_name(month)
+    if name in await list_partitions(session):
+        return None
+    lower, upper = month.isoformat(), add_months(month, 1).isoformat()
+    in_month = f"create_dt >= '{lower}' AND create_dt < '{upper}'"
+    await session.execute(sa.text(f"CREATE TABLE {name} (LIKE {event_store.name} INCLUDING DEFAULTS)"))
+    await session.execute(sa.text(f"INSERT INTO {name} SELECT * FROM {DEFAULT_PARTITION} WHERE {in_month}"))
+    await session.execute(sa.text(f"DELETE FROM {DEFAULT_PARTITION} WHERE {in_month}"))
+    await session.execute(
+        sa.text(f"ALTER TABLE {event_store.name} ATTACH PARTITION {name} FOR VALUES FROM ('{lower}') TO ('{upper}')")
+    )
+    return name
+
+
+async def ensure_partitions(session: AsyncSession, ahead: int = 3, now: datetime | None = None) -> list[str]:
+    # this month and the next `ahead` ones
+    month = month_start(now or datetime.now(timezone.utc))
+    created = []
+    for offset in range(ahead + 1):
+        name = await create_partition(session, add_months(month, offset))
+        if name is not None:
+            created.append(name)
+    return created
+
+
+async def detach_partitions(session: AsyncSession, before: datetime) -> list[str]:
+    # partitions that end on or before `before` leave the event store but stay around as plain tables to archive
+    # and drop, a projection replay after that only sees what's left
+    detached = []
+    for name, month in sorted((await list_partitions(session)).items()):
+        if add_months(month, 1) <= month_start(before):
+            await session.execute(sa.text(f"ALTER TABLE {event_store.name} DETACH PARTITION {name}"))
+            detached.append(name)
+    return detached
+
+
+async def main(ahead: int, detach_before: datetime | None):
+    from app.common.db import async_transactional_session_factory, engine
+
+    assert async_transactional_session_factory is not None and engine is not None
+    async with async_transactional_session_factory() as session:
+        async with session.begin():
+            for name in await ensure_partitions(session, ahead):
+                print(f"created {name}")
+            if detach_before is not None:
+                for name in await detach_partitions(session, detach_before):
+                    print(f"detached {name}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ahead", type=int, default=settings.event_store_settings.partitions_ahead)
+    parser.add_argument(
+        "--detach-before",
+        type=lambda value: datetime.strptime(value, "%Y-%m").replace(tzinfo=timezone.utc),
+        help="YYYY-MM, detaches every month before it",
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.ahead, args.detach_before))
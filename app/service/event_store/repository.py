@@ -1,17 +1,129 @@
+from datetime import datetime
+from typing import Any, Iterable, Type, TypeVar
 from uuid import UUID
 
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.adapters.orm import event_store, snapshots
 from app.adapters.repository import SqlAlchemyRepository
-from app.domain.models import EventStore
+from app.common.settings import settings
+from app.domain import codecs
+from app.domain.events import AggregateCompacted, Event
+from app.domain.models import Base, EventStore
+from app.service.bugs import events as bug_events  # noqa: F401
+from app.service.users import events as user_events  # noqa: F401
+from app.utils.helpers import Page, build_keyset_page, set_keyset_pagination
+
+AggregateType = TypeVar("AggregateType", bound=Base)
+
+# registered as the event modules above are imported
+EVENT_TYPES: dict[str, Type[Event]] = codecs.EVENTS
+COMPACTED_EVENT = AggregateCompacted.__name__
+
+
+def fold_events(
+    aggregate_type: Type[AggregateType],
+    events: Iterable[tuple[str, dict[str, Any]]],
+    base: AggregateType | None = None,
+    version: int = 0,
+) -> tuple[AggregateType, int, int]:
+    # (event_name, event_data) in seq order onto base, gives back the aggregate, its version and the events replayed
+    # a compacted row is only ever an aggregate's first and starts over from the state it carries
+    aggregate = aggregate_type() if base is None else base
+    replayed = 0
+    for name, data in events:
+        if name == COMPACTED_EVENT:
+            aggregate, version = aggregate_type.from_snapshot(data["state"]), data["version"]
+        else:
+            EVENT_TYPES[name].from_dict(data).apply(aggregate)
+            version += 1
+        replayed += 1
+    return aggregate, version, replayed
 
 
 class EventStoreRepository(SqlAlchemyRepository[EventStore]):
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, snapshot_every: int = settings.snapshot_settings.every):
         super(EventStoreRepository, self).__init__(session, EventStore)
+        self.snapshot_every = snapshot_every
 
-    async def _get(self, ident: UUID):
-        _query = self.query.where(self.model.aggregate_id == ident)  # type: ignore
+    async def _get(self, ident: UUID, profile: str | None = None, **params: Any):
+        # seq and not create_dt, every event of a transaction shares its create_dt
+        _query = self.query.where(self.model.aggregate_id == ident).order_by(self.model.seq)  # type: ignore
         res = await self.session.execute(_query)
         models: list[EventStore] = res.scalars().all()
         return models
+
+    # the latest snapshot and only the events after it
+    # a load that had to replay snapshot_every or more events leaves a new snapshot for the caller's commit
+    async def load(self, aggregate_type: Type[AggregateType], ident: UUID) -> AggregateType | None:
+        execution = await self.session.execute(
+            sa.select(snapshots.c.version, snapshots.c.last_seq, snapshots.c.state)
+            .where(snapshots.c.aggregate_id == ident)
+            .order_by(snapshots.c.version.desc())
+            .limit(1)
+        )
+        snapshot = execution.one_or_none()
+        query = (
+            sa.select(event_store.c.event_name, event_store.c.event_data, event_store.c.seq)
+            .where(event_store.c.aggregate_id == ident)
+            .order_by(event_store.c.seq)
+        )
+        if snapshot is not None:
+            query = query.where(event_store.c.seq > snapshot.last_seq)
+        execution = await self.session.execute(query)
+        rows = execution.all()
+        if snapshot is None and not rows:
+            return None
+
+        aggregate, version, replayed = fold_events(
+            aggregate_type,
+            ((row.event_name, row.event_data) for row in rows),
+            aggregate_type.from_snapshot(snapshot.state) if snapshot is not None else None,
+            snapshot.version if snapshot is not None else 0,
+        )
+        if self.snapshot_every and replayed >= self.snapshot_every:
+            await self.save_snapshot(ident, aggregate, version, rows[-1].seq)
+        return aggregate
+
+    async def save_snapshot(self, ident: UUID, aggregate: Base, version: int, last_seq: int):
+        # only the latest one is ever read
+        await self.session.execute(
+            postgresql.insert(snapshots)
+            .values(aggregate_id=ident, version=version, last_seq=last_seq, state=aggregate.snapshot())
+            .on_conflict_do_nothing(index_elements=[snapshots.c.aggregate_id, snapshots.c.version])
+        )
+        await self.session.execute(
+            sa.delete(snapshots).where(snapshots.c.aggregate_id == ident, snapshots.c.version < version)
+        )
+
+    # audit queries, since/until keep the scan to the partitions of the months they cover
+    # and payload matches with @> so the gin index on event_data does the filtering
+    async def search(
+        self,
+        event_names: list[str] | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        payload: dict[str, Any] | None = None,
+        aggregate_id: UUID | None = None,
+        cursor: str | None = None,
+        count_per_page: int = 100,
+    ) -> Page:
+        _query = self.query
+        if event_names:
+            _query = _query.where(self.model.event_name.in_(event_names))  # type: ignore
+        if since is not None:
+            _query = _query.where(self.model.create_dt >= since)  # type: ignore
+        if until is not None:
+            _query = _query.where(self.model.create_dt < until)  # type: ignore
+        if payload:
+            # stored the way Event.dict() writes them
+            payload = {key: str(value) if isinstance(value, UUID) else value for key, value in payload.items()}
+            _query = _query.where(self.model.event_data.contains(payload))  # type: ignore
+        if aggregate_id is not None:
+            _query = _query.where(self.model.aggregate_id == aggregate_id)  # type: ignore
+        sort_columns = [self.model.create_dt, self.model.seq]  # type: ignore
+        _query = set_keyset_pagination(_query, sort_columns, cursor, count_per_page)
+        execution = await self.session.execute(_query)
+        return build_keyset_page(execution.scalars().all(), sort_columns, cursor, count_per_page)
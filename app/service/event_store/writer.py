@@ -0,0 +1,79 @@
+import asyncio
+import contextlib
+from typing import Any, Iterable
+from uuid import UUID, uuid4
+
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.adapters.orm import event_store
+from app.domain.events import Event
+
+
+def event_rows(pending: Iterable[tuple[UUID, Event]]) -> list[dict[str, Any]]:
+    return [
+        {"id": uuid4(), "aggregate_id": aggregate_id, "event_name": event.name(), "event_data": event.dict()}
+        for aggregate_id, event in pending
+    ]
+
+
+async def append_events(session: AsyncSession, rows: list[dict[str, Any]]):
+    # one multi row INSERT, seq is handed out in the order of rows so an aggregate's events keep their order
+    if rows:
+        await session.execute(sa.insert(event_store).values(rows))
+
+
+# group commit for the event store, appends from concurrent requests that land within window seconds of each other
+# go out in one INSERT and one commit on the appender's own connection
+# the rows are appended after the request's transaction committed, so a crash in between loses its events,
+# that's the price of not holding every request's connection open for the window
+class GroupCommitAppender:
+    def __init__(self, session_factory: sessionmaker, window: float = 0.002, max_batch: int = 1000):
+        self.session_factory = session_factory
+        self.window = window
+        self.max_batch = max_batch  # rows that flush right away instead of waiting out the window
+        self.pending: list[tuple[list[dict[str, Any]], asyncio.Future]] = []
+        self.pending_rows = 0
+        self._full = asyncio.Event()
+        self._flushes: set[asyncio.Task] = set()
+        self._task: asyncio.Task | None = None
+
+    async def append(self, rows: list[dict[str, Any]]):
+        # returns once the rows are committed, raises whatever the flush raised
+        if not rows:
+            return
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((rows, future))
+        self.pending_rows += len(rows)
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_after_window())
+            self._flushes.add(self._task)
+            self._task.add_done_callback(self._flushes.discard)
+        if self.pending_rows >= self.max_batch:
+            self._full.set()
+        await future
+
+    async def _flush_after_window(self):
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._full.wait(), self.window)
+        # later appends start the next group while this one is being written
+        batch, self.pending, self.pending_rows, self._task = self.pending, [], 0, None
+        self._full.clear()
+        try:
+            async with self.session_factory() as session:
+                await append_events(session, [row for rows, _ in batch for row in rows])
+                await session.commit()
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for _, future in batch:
+            if not future.done():
+                future.set_result(None)
+
+    async def stop(self):
+        if self._flushes:
+            self._full.set()
+            await asyncio.gather(*self._flushes, return_exceptions=True)
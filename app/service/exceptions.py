@@ -16,3 +16,11 @@ class DuplicateRecord(Exception):
 
 class ConcurrencyException(Exception):
     ...
+
+
+class PreconditionFailed(Exception):
+    ...
+
+
+class ServiceUnavailable(Exception):
+    ...
@@ -0,0 +1,76 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable
+
+from argon2 import PasswordHasher
+from argon2.exceptions import VerifyMismatchError
+
+from app.common.settings import ExecutorEnum
+from app.service import exceptions
+
+
+# module level so they can be pickled for the process pool
+def _hash(hasher: PasswordHasher, password: str) -> str:
+    return hasher.hash(password)
+
+
+def _verify(hasher: PasswordHasher, hashed: str, password: str) -> bool:
+    try:
+        return hasher.verify(hashed, password)
+    except VerifyMismatchError:
+        return False
+
+
+# runs argon2 off the event loop on a bounded pool
+# max_workers calls run at once and max_queue more may wait, anything beyond that is rejected
+class PasswordHashingService:
+    def __init__(
+        self,
+        hasher: PasswordHasher,
+        executor: ExecutorEnum = ExecutorEnum.THREAD,
+        max_workers: int = 4,
+        max_queue: int = 64,
+    ):
+        self.hasher = hasher
+        self.executor_type = executor
+        self.max_workers = max_workers
+        self.max_pending = max_workers + max_queue
+        self.pending = 0
+        self._executor: Executor | None = None
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == ExecutorEnum.PROCESS:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="password-hasher",
+                )
+        return self._executor
+
+    async def _submit(self, fn: Callable[..., Any], *args: Any):
+        if self.pending >= self.max_pending:
+            raise exceptions.ServiceUnavailable("too many password operations in progress, try again later")
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, fn, self.hasher, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(_hash, password)
+
+    async def verify(self, hashed: str, password: str) -> bool:
+        return await self._submit(_verify, hashed, password)
+
+    def check_needs_rehash(self, hashed: str) -> bool:
+        # only parses the parameters out of the hash, cheap enough to stay inline
+        return self.hasher.check_needs_rehash(hashed)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -1,29 +1,54 @@
+import asyncio
+import contextlib
 import inspect
+import random
 from collections import deque
-from typing import Any, Callable, Type, Union
-
-from argon2 import PasswordHasher
+from typing import Any, AsyncIterator, Callable, Type, Union
 
 from app.domain.commands import Command
 from app.domain.events import Event
-from app.service.unit_of_work import AbstractUnitOfWork
+from app.service import exceptions
+from app.service.bugs import commands as bug_commands
+from app.service.bugs import events as bug_events
+from app.service.bugs import handlers as bug_handlers
+from app.service.bugs.votes import CommentVoteBuffer
+from app.service.hashing import PasswordHashingService
+from app.service.read_cache import ReadCache, evict_aggregate, evict_bug
+from app.service.unit_of_work import AbstractUnitOfWork, UnitOfWorkPool
 from app.service.users import commands as user_commands
 from app.service.users import events as user_events
 from app.service.users import handlers as user_handlers
+from app.service.users.tokens import TokenRevocations
 
 Message = Union[Command, Event]
 
 
+# a handler paired with the names of the dependencies it takes, worked out once by the factory
+CompiledHandler = tuple[Callable, tuple[str, ...]]
+
+
 class MessageBus:
     def __init__(
         self,
         uow: AbstractUnitOfWork,
-        event_handlers: dict[Type[Event], list[Callable]],
-        command_handlers: dict[Type[Command], Callable],
+        dependencies: dict[str, Any],
+        event_handlers: dict[Type[Event], list[CompiledHandler]],
+        command_handlers: dict[Type[Command], CompiledHandler],
+        max_attempts: int = 3,
+        backoff_base: float = 0.01,
+        backoff_max: float = 0.2,
     ):
         self.uow = uow
+        self.dependencies: dict[str, Any] = {**dependencies, "uow": uow}
         self.event_handlers = event_handlers
         self.command_handlers = command_handlers
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def _call(self, compiled: CompiledHandler, message: Message):
+        handler, names = compiled
+        return handler(message, **{name: self.dependencies[name] for name in names})
 
     async def handle(self, message: Message):
         self.queue = deque([message])
@@ -37,44 +62,56 @@ class MessageBus:
                 results.append(res)
             else:
                 raise Exception(f"{message} was not a Command or Event")
-        return results[0]
+        return results[0] if results else None
 
+    # called by the outbox dispatcher, a failing handler fails the event so it gets retried
+    # handlers have to be idempotent since the ones that already succeeded run again
     async def handle_event(self, event: Event):
-        for handler in self.event_handlers[type(event)]:
+        for handler in self.event_handlers.get(type(event), []):
+            task = self._call(handler, event)
+            if inspect.isawaitable(task):
+                await task
+
+    # full jitter so the writers that collided don't collide again on the retry
+    def backoff(self, attempts: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1)))
+
+    # an idempotent command that lost an optimistic locking race is run again against what won it,
+    # everything else gets the ConcurrencyException
+    async def handle_command(self, command: Command):
+        attempts = 0
+        while True:
+            attempts += 1
             try:
-                task = handler(event)
+                task = self._call(self.command_handlers[type(command)], command)
                 if inspect.isawaitable(task):
-                    await task
+                    res = await task
                 else:
-                    pass
-                self.queue.extend(self.uow.collect_new_events())
-            except Exception:
-                continue  # TODO: add logging when exception is raised
-
-    async def handle_command(self, command: Command):
-        try:
-            handler = self.command_handlers[type(command)]
-            task = handler(command)
-            if inspect.isawaitable(task):
-                res = await task
-            else:
-                res = task
-            self.queue.extend(self.uow.collect_new_events())
-            return res
-        except Exception:
-            raise
+                    res = task
+                read_cache = self.dependencies.get("read_cache")
+                if read_cache is not None:
+                    await read_cache.evict_seen(self.uow)
+                return res
+            except exceptions.ConcurrencyException:
+                if not command.idempotent or attempts >= self.max_attempts:
+                    raise
+            await asyncio.sleep(self.backoff(attempts))
 
 
-def inject_dependencies(handler: Callable, dependencies: dict[str, Any]):
+def compile_handler(handler: Callable, dependency_names: set[str]) -> CompiledHandler:
     params = inspect.signature(handler).parameters
-    deps = {name: dependency for name, dependency in dependencies.items() if name in params}
-    return lambda message: handler(message, **deps)
+    return handler, tuple(name for name in dependency_names if name in params)
 
 
 EVENT_HANDLERS: dict[Type[Event], list[Callable]] = {
-    user_events.UserCreated: [],  # [user_handlers.insert_into_user_read_model],
-    user_events.UserUpdated: [],  # [user_handlers.update_user_read_model],
-    user_events.UserSoftDeleted: [],  # [user_handlers.soft_delete_user_read_model],
+    # the user read model is kept by app.service.projections.users.UserReadModelProjector
+    user_events.UserCreated: [],
+    user_events.UserUpdated: [evict_aggregate],
+    user_events.UserSoftDeleted: [evict_aggregate],
+    bug_events.BugUpdated: [evict_aggregate],
+    bug_events.BugSoftDeleted: [evict_aggregate],
+    bug_events.CommentCreated: [evict_bug],
+    bug_events.CommentUpdated: [evict_bug],
 }
 COMMAND_HANDLERS: dict[Type[Command], Callable] = {
     user_commands.CreateUser: user_handlers.create_user,
@@ -82,33 +119,67 @@ COMMAND_HANDLERS: dict[Type[Command], Callable] = {
     user_commands.SoftDeleteUser: user_handlers.soft_delete_user,
     user_commands.Login: user_handlers.login,
     user_commands.Refresh: user_handlers.refresh,
+    user_commands.Logout: user_handlers.logout,
+    user_commands.RevokeSessions: user_handlers.revoke_sessions,
+    bug_commands.CreateBug: bug_handlers.create_bug,
+    bug_commands.UpdateBug: bug_handlers.update_bug,
+    bug_commands.SoftDeleteBug: bug_handlers.soft_delete_bug,
+    bug_commands.CreateComment: bug_handlers.create_comment,
+    bug_commands.UpdateComment: bug_handlers.update_comment,
+    bug_commands.DeleteComment: bug_handlers.delete_comment,
+    bug_commands.Upvote: bug_handlers.upvote_downvote_comment,
+    bug_commands.Downvote: bug_handlers.upvote_downvote_comment,
 }
 
 
+# the dispatch tables are compiled once, a bus per request only binds that request's uow
 class MessageBusFactory:
     def __init__(
         self,
-        uow: AbstractUnitOfWork,
-        password_hasher: PasswordHasher,
+        uow_pool: UnitOfWorkPool,
+        password_hasher: PasswordHashingService,
+        vote_buffer: CommentVoteBuffer | None = None,
+        read_cache: ReadCache | None = None,
+        revocations: TokenRevocations | None = None,
+        max_attempts: int = 3,
+        backoff_base: float = 0.01,
+        backoff_max: float = 0.2,
     ):
-        self.uow = uow
-        self.password_hasher = password_hasher
-
-    def __call__(self) -> MessageBus:
-        dependencies = {
-            "uow": self.uow,
-            "hasher": self.password_hasher,
+        self.uow_pool = uow_pool
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.dependencies: dict[str, Any] = {
+            "hasher": password_hasher,
+            "vote_buffer": vote_buffer,
+            "read_cache": read_cache,
+            "revocations": revocations,
         }
-        injected_event_handlers: dict[Type[Event], list[Callable]] = {
-            event_type: [inject_dependencies(handler, dependencies) for handler in handlers]
+        dependency_names = {"uow", *self.dependencies}
+        self.event_handlers: dict[Type[Event], list[CompiledHandler]] = {
+            event_type: [compile_handler(handler, dependency_names) for handler in handlers]
             for event_type, handlers in EVENT_HANDLERS.items()
         }
-        injected_command_handlers: dict[Type[Command], Callable] = {
-            command_type: inject_dependencies(handler, dependencies)
+        self.command_handlers: dict[Type[Command], CompiledHandler] = {
+            command_type: compile_handler(handler, dependency_names)
             for command_type, handler in COMMAND_HANDLERS.items()
         }
+
+    def __call__(self, uow: AbstractUnitOfWork) -> MessageBus:
         return MessageBus(
-            uow=self.uow,
-            event_handlers=injected_event_handlers,
-            command_handlers=injected_command_handlers,
+            uow=uow,
+            dependencies=self.dependencies,
+            event_handlers=self.event_handlers,
+            command_handlers=self.command_handlers,
+            max_attempts=self.max_attempts,
+            backoff_base=self.backoff_base,
+            backoff_max=self.backoff_max,
         )
+
+    @contextlib.asynccontextmanager
+    async def request(self) -> AsyncIterator[MessageBus]:
+        uow = self.uow_pool.acquire()
+        try:
+            yield self(uow)
+        finally:
+            self.uow_pool.release(uow)
@@ -0,0 +1,115 @@
+import asyncio
+import contextlib
+import logging
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+import sqlalchemy as sa
+from sqlalchemy.orm import sessionmaker
+
+from app.adapters.orm import outbox
+from app.service.messagebus import MessageBusFactory
+
+logger = logging.getLogger(__name__)
+
+
+# runs EVENT_HANDLERS for outbox rows in the background, several workers (tasks or processes) can share the table
+# only the oldest pending row of each aggregate can be claimed so an aggregate's events are handled in order,
+# which also means a row that gave up blocks the rest of its aggregate until someone looks at it
+class OutboxDispatcher:
+    def __init__(
+        self,
+        messagebus: MessageBusFactory,
+        session_factory: sessionmaker,
+        batch_size: int = 100,
+        poll_interval: float = 0.5,
+        max_attempts: int = 10,
+        backoff_base: float = 1.0,
+        backoff_max: float = 300.0,
+    ):
+        self.messagebus = messagebus
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.event_types = {event_type.__name__: event_type for event_type in messagebus.event_handlers}
+        self._tasks: list[asyncio.Task] = []
+
+        earlier = outbox.alias("earlier")
+        self.claim_query = (
+            sa.select(outbox.c.id, outbox.c.event_name, outbox.c.event_data, outbox.c.attempts)
+            .where(
+                outbox.c.failed_at.is_(None),
+                outbox.c.available_at <= sa.func.now(),
+                ~sa.exists().where(
+                    sa.and_(earlier.c.aggregate_id == outbox.c.aggregate_id, earlier.c.id < outbox.c.id)
+                ),
+            )
+            .order_by(outbox.c.id)
+            .limit(batch_size)
+            .with_for_update(of=outbox, skip_locked=True)
+        )
+
+    def backoff(self, attempts: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _dispatch(self, event_name: str, event_data: dict[str, Any]):
+        event_type = self.event_types.get(event_name)
+        if event_type is None:
+            return  # nothing listens for it
+        async with self.messagebus.request() as messagebus:
+            await messagebus.handle_event(event_type.from_dict(event_data))
+
+    async def dispatch_batch(self) -> int:
+        # the claimed rows stay locked until the batch commits, a crashed worker just releases them
+        async with self.session_factory() as session:
+            async with session.begin():
+                execution = await session.execute(self.claim_query)
+                rows = execution.all()
+                done = []
+                for row in rows:
+                    try:
+                        await self._dispatch(row.event_name, row.event_data)
+                        done.append(row.id)
+                    except Exception as e:
+                        attempts = row.attempts + 1
+                        await session.execute(
+                            sa.update(outbox)
+                            .where(outbox.c.id == row.id)
+                            .values(
+                                attempts=attempts,
+                                available_at=datetime.now(timezone.utc) + timedelta(seconds=self.backoff(attempts)),
+                                last_error=f"{type(e).__name__}: {e}",
+                                failed_at=sa.func.now() if attempts >= self.max_attempts else None,
+                            )
+                        )
+                if done:
+                    await session.execute(sa.delete(outbox).where(outbox.c.id.in_(done)))
+        return len(rows)
+
+    async def _run(self):
+        while True:
+            try:
+                claimed = await self.dispatch_batch()
+            except Exception:
+                # rows stay in the outbox, a dispatcher that keeps failing here says so on every poll
+                logger.exception("claiming outbox rows failed")
+                claimed = 0
+            if not claimed:
+                await asyncio.sleep(self.poll_interval)
+
+    def start(self, workers: int = 1):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._run()) for _ in range(workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self._tasks = []
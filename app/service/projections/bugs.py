@@ -0,0 +1,151 @@
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Iterable, Sequence
+from uuid import UUID
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.adapters.orm import bugs_read_model, users
+from app.service.projections.runner import AggregateEvents, Projector, to_uuid, update_many
+
+# event field -> read model column
+BUG_COLUMNS = {
+    "title": "title",
+    "author_id": "author_id",
+    "assignee_id": "assigned_user_id",
+    "description": "description",
+    "environment": "environment",
+    "urgency": "urgency",
+    "status": "status",
+    "record_status": "record_status",
+    "version": "version",
+    "edited": "edited",
+    "images": "images",
+}
+USER_COLUMNS = ("create_dt", "update_dt", "username", "email", "user_type", "user_status", "is_admin")
+USER_EVENTS = ("UserCreated", "UserUpdated", "UserSoftDeleted")
+
+
+def _bug_columns(data: dict[str, Any]) -> dict[str, Any]:
+    columns = {column: data[key] for key, column in BUG_COLUMNS.items() if key in data}
+    for column in ("author_id", "assigned_user_id"):
+        if column in columns:
+            columns[column] = to_uuid(columns[column])
+    if "assigned_user_id" in columns and columns["assigned_user_id"] is None:
+        columns.update({f"assignee_{column}": None for column in USER_COLUMNS})
+    return columns
+
+
+@dataclass
+class _Fold:
+    created: dict[UUID, dict[str, Any]] = field(default_factory=dict)
+    patches: dict[UUID, dict[str, Any]] = field(default_factory=dict)
+    # soft deletes bump a version the event doesn't carry
+    version_bumps: defaultdict[UUID, int] = field(default_factory=lambda: defaultdict(int))
+    user_ids: set[UUID] = field(default_factory=set)
+
+    def apply(self, ident: UUID, name: str, data: dict[str, Any], create_dt: datetime):
+        if name == "AggregateCompacted":
+            # the compacted row keeps the created event's create_dt
+            if data["aggregate"] == "Bugs":
+                self.apply(ident, "BugCreated", data["state"], create_dt)
+                if data["updated_dt"] is not None:
+                    self.created[ident]["bug_updated_dt"] = datetime.fromisoformat(data["updated_dt"])
+            else:
+                self.user_ids.add(ident)
+        elif name == "BugCreated":
+            self.created[ident] = {
+                **{column: None for column in bugs_read_model.c.keys()},
+                **_bug_columns(data),
+                "bug_id": ident,
+                "bug_created_dt": create_dt,
+                "bug_updated_dt": create_dt,
+            }
+            self.patches.pop(ident, None)
+        elif name in ("BugUpdated", "BugSoftDeleted"):
+            row = self.created[ident] if ident in self.created else self.patches.setdefault(ident, {})
+            row.update(_bug_columns(data), bug_updated_dt=create_dt)
+            if name == "BugSoftDeleted":
+                if "version" in row:
+                    row["version"] += 1
+                else:
+                    self.version_bumps[ident] += 1
+        elif name in USER_EVENTS:
+            self.user_ids.add(ident)
+
+    def fold(self, events: Iterable[tuple[UUID, str, dict[str, Any], datetime]]):
+        for event in events:
+            self.apply(*event)
+        return self
+
+
+# copies the author's and assignee's columns over from bug_tracker_users, for all rows when no ids are given
+async def refresh_users(
+    session: AsyncSession,
+    table: sa.Table = bugs_read_model,
+    bug_ids: list[UUID] | None = None,
+    user_ids: list[UUID] | None = None,
+):
+    everything = bug_ids is None and user_ids is None
+    for side, key in (("author", table.c.author_id), ("assignee", table.c.assigned_user_id)):
+        stmt = (
+            sa.update(table)
+            .where(users.c.id == key)
+            .values({f"{side}_{column}": users.c[column] for column in USER_COLUMNS})
+        )
+        if not everything:
+            conditions = []
+            if bug_ids:
+                conditions.append(table.c.bug_id.in_(bug_ids))
+            if user_ids:
+                conditions.append(key.in_(user_ids))
+            if not conditions:
+                continue
+            stmt = stmt.where(sa.or_(*conditions))
+        await session.execute(stmt)
+
+
+def fold_bugs_read_model(aggregates: list[AggregateEvents]) -> dict[str, list[dict[str, Any]]]:
+    folded = _Fold().fold(
+        (ident, name, data, create_dt) for ident, events in aggregates for name, data, create_dt in events
+    )
+    return {bugs_read_model.name: list(folded.created.values())}
+
+
+# keeps bug_tracker_bugs_read_model current from bug events, user events only refresh the flattened user columns
+class BugReadModelProjector(Projector):
+    name = "bugs_read_model"
+    tables = (bugs_read_model,)
+    fold = staticmethod(fold_bugs_read_model)
+
+    async def apply(self, session: AsyncSession, events: Sequence[Any]):
+        folded = _Fold().fold(
+            (event.aggregate_id, event.event_name, event.event_data, event.create_dt) for event in events
+        )
+
+        if folded.created:
+            insert = postgresql.insert(bugs_read_model).values(list(folded.created.values()))
+            await session.execute(
+                insert.on_conflict_do_update(
+                    index_elements=[bugs_read_model.c.bug_id],
+                    set_={column: insert.excluded[column] for column in bugs_read_model.c.keys() if column != "bug_id"},
+                )
+            )
+        await update_many(session, bugs_read_model, "bug_id", folded.patches)
+        if folded.version_bumps:
+            await session.execute(
+                sa.update(bugs_read_model)
+                .where(bugs_read_model.c.bug_id == sa.bindparam("_bug_id"))
+                .values(version=bugs_read_model.c.version + sa.bindparam("_bump")),
+                [{"_bug_id": ident, "_bump": bump} for ident, bump in folded.version_bumps.items()],
+            )
+
+        bug_ids = [*folded.created, *folded.patches]
+        if bug_ids or folded.user_ids:
+            await refresh_users(session, bug_ids=bug_ids, user_ids=list(folded.user_ids))
+
+    async def finish(self, session: AsyncSession, tables: dict[str, sa.Table]):
+        await refresh_users(session, tables[bugs_read_model.name])
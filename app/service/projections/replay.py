@@ -0,0 +1,284 @@
+# rebuilds a projection from the whole event store into shadow tables and swaps them in
+# usage: make replay ARGS="--projection user_read_model --workers 4"
+import argparse
+import asyncio
+import re
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable
+from uuid import UUID
+
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.adapters.orm import event_store, projection_checkpoints, replay_progress
+from app.service.projections.bugs import BugReadModelProjector
+from app.service.projections.runner import AggregateEvents, Projector, lock_checkpoint
+from app.service.projections.users import UserReadModelProjector
+
+PROJECTORS: dict[str, Callable[[], Projector]] = {
+    UserReadModelProjector.name: UserReadModelProjector,
+    BugReadModelProjector.name: BugReadModelProjector,
+}
+SHADOW_SUFFIX = "_replay"
+MAX_SEQ = 2**63 - 1
+
+
+@dataclass
+class ReplayReport:
+    events: int = 0
+    aggregates: int = 0
+    seconds: float = 0.0
+
+    @property
+    def events_per_second(self) -> float:
+        return self.events / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (
+            f"{self.events} events from {self.aggregates} aggregates in {self.seconds:.1f}s "
+            f"({self.events_per_second:.0f} events/s)"
+        )
+
+
+def _merge(into: dict[str, list[dict[str, Any]]], rows: dict[str, list[dict[str, Any]]]):
+    for table_name, table_rows in rows.items():
+        into.setdefault(table_name, []).extend(table_rows)
+
+
+# streams the event store ordered by aggregate so every aggregate arrives whole, hands chunks of aggregates to a
+# process pool split by aggregate_id, and COPYs what comes back into shadow copies of the projector's tables
+# progress is committed with every chunk, so a replay that dies picks up after the last aggregate it loaded
+# the swap drops the live tables and renames the shadows in one transaction, with the checkpoint moved to the
+# replay's bound so the ProjectionRunner carries on from exactly the events the replay left out
+class Replayer:
+    def __init__(
+        self,
+        projector: Projector,
+        session_factory: sessionmaker,
+        workers: int = 4,
+        chunk_size: int = 50_000,
+        executor: Executor | None = None,
+        progress: Callable[[ReplayReport], None] | None = None,
+    ):
+        if not projector.tables:
+            raise ValueError(f"projection {projector.name} can't be replayed")
+        self.projector = projector
+        self.session_factory = session_factory
+        self.workers = workers  # 0 folds inline
+        self.chunk_size = chunk_size
+        self.executor = executor
+        self.progress = progress
+        metadata = sa.MetaData()
+        self.shadows = {
+            table.name: table.to_metadata(metadata, name=f"{table.name}{SHADOW_SUFFIX}") for table in projector.tables
+        }
+
+    async def _prepare(self, restart: bool) -> tuple[int, UUID | None]:
+        name = self.projector.name
+        async with self.session_factory() as session:
+            async with session.begin():
+                if restart:
+                    await session.execute(sa.delete(replay_progress).where(replay_progress.c.name == name))
+                execution = await session.execute(
+                    sa.select(replay_progress.c.bound_txid, replay_progress.c.last_aggregate_id)
+                    .where(replay_progress.c.name == name)
+                    .with_for_update()
+                )
+                row = execution.one_or_none()
+                if row is not None:
+                    return row.bound_txid, row.last_aggregate_id
+
+                # everything below the oldest running transaction is committed and stays put
+                execution = await session.execute(
+                    sa.select(sa.func.txid_snapshot_xmin(sa.func.txid_current_snapshot()))
+                )
+                bound: int = execution.scalar_one()
+                for table in self.projector.tables:
+                    shadow = self.shadows[table.name].name
+                    await session.execute(sa.text(f"DROP TABLE IF EXISTS {shadow}"))
+                    # no keys or indexes while loading, _finish adds them
+                    await session.execute(sa.text(f"CREATE TABLE {shadow} (LIKE {table.name} INCLUDING DEFAULTS)"))
+                await session.execute(sa.insert(replay_progress).values(name=name, bound_txid=bound, events=0))
+                return bound, None
+
+    async def _fold(self, chunk: list[AggregateEvents]) -> dict[str, list[dict[str, Any]]]:
+        if self.workers == 0 or self.executor is None:
+            return self.projector.fold(chunk)
+        partitions: list[list[AggregateEvents]] = [[] for _ in range(self.workers)]
+        for aggregate in chunk:
+            partitions[aggregate[0].int % self.workers].append(aggregate)
+        loop = asyncio.get_running_loop()
+        folded = await asyncio.gather(
+            *[
+                loop.run_in_executor(self.executor, self.projector.fold, partition)
+                for partition in partitions
+                if partition
+            ]
+        )
+        rows: dict[str, list[dict[str, Any]]] = {}
+        for partition_rows in folded:
+            _merge(rows, partition_rows)
+        return rows
+
+    async def _load(self, rows: dict[str, list[dict[str, Any]]], last_aggregate_id: UUID, events: int):
+        async with self.session_factory() as session:
+            async with session.begin():
+                # goes first so the COPYs run inside the transaction it opens
+                await session.execute(
+                    sa.update(replay_progress)
+                    .where(replay_progress.c.name == self.projector.name)
+                    .values(last_aggregate_id=last_aggregate_id, events=replay_progress.c.events + events)
+                )
+                connection = await session.connection()
+                raw = await connection.get_raw_connection()
+                driver: Any = raw.driver_connection
+                for table_name, table_rows in rows.items():
+                    if not table_rows:
+                        continue
+                    columns = list(table_rows[0])
+                    await driver.copy_records_to_table(
+                        self.shadows[table_name].name,
+                        records=[tuple(row[column] for column in columns) for row in table_rows],
+                        columns=columns,
+                    )
+
+    async def _index_shadow(self, session: AsyncSession, table: sa.Table):
+        # the live table's keys and indexes under temporary names, renamed back by the swap
+        shadow = self.shadows[table.name].name
+        execution = await session.execute(
+            sa.text(
+                "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+                "WHERE conrelid = CAST(:table AS regclass) AND contype IN ('p', 'u')"
+            ),
+            {"table": table.name},
+        )
+        constraints = execution.all()
+        for constraint, definition in constraints:
+            await session.execute(
+                sa.text(f"ALTER TABLE {shadow} ADD CONSTRAINT {constraint}{SHADOW_SUFFIX} {definition}")
+            )
+        execution = await session.execute(
+            sa.text(
+                "SELECT i.relname, pg_get_indexdef(i.oid) FROM pg_index x JOIN pg_class i ON i.oid = x.indexrelid "
+                "WHERE x.indrelid = CAST(:table AS regclass) "
+                "AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = x.indexrelid)"
+            ),
+            {"table": table.name},
+        )
+        indexes = execution.all()
+        for index, definition in indexes:
+            definition = definition.replace(f" INDEX {index} ON ", f" INDEX {index}{SHADOW_SUFFIX} ON ", 1)
+            definition = re.sub(rf" ON (\S+\.)?{table.name} ", rf" ON \g<1>{shadow} ", definition, count=1)
+            await session.execute(sa.text(definition))
+        return [constraint for constraint, _ in constraints], [index for index, _ in indexes]
+
+    async def _finish(self, bound: int):
+        async with self.session_factory() as session:
+            async with session.begin():
+                renames = {}
+                for table in self.projector.tables:
+                    renames[table.name] = await self._index_shadow(session, table)
+                await self.projector.finish(session, self.shadows)
+
+                # the runner takes the checkpoint before touching the live tables, so it waits here rather than
+                # writing into a table that is about to go away
+                await lock_checkpoint(session, self.projector.name)
+                for table in self.projector.tables:
+                    constraints, indexes = renames[table.name]
+                    shadow = self.shadows[table.name].name
+                    await session.execute(sa.text(f"DROP TABLE {table.name}"))
+                    await session.execute(sa.text(f"ALTER TABLE {shadow} RENAME TO {table.name}"))
+                    for constraint in constraints:
+                        rename = f"RENAME CONSTRAINT {constraint}{SHADOW_SUFFIX} TO {constraint}"
+                        await session.execute(sa.text(f"ALTER TABLE {table.name} {rename}"))
+                    for index in indexes:
+                        await session.execute(sa.text(f"ALTER INDEX {index}{SHADOW_SUFFIX} RENAME TO {index}"))
+                # (txid, seq) > (bound - 1, MAX_SEQ) is exactly txid >= bound
+                await session.execute(
+                    sa.update(projection_checkpoints)
+                    .where(projection_checkpoints.c.name == self.projector.name)
+                    .values(txid=bound - 1, seq=MAX_SEQ)
+                )
+                await session.execute(sa.delete(replay_progress).where(replay_progress.c.name == self.projector.name))
+
+    async def run(self, restart: bool = False) -> ReplayReport:
+        report = ReplayReport()
+        started = time.perf_counter()
+        bound, last_aggregate_id = await self._prepare(restart)
+
+        stmt = (
+            sa.select(
+                event_store.c.aggregate_id, event_store.c.event_name, event_store.c.event_data, event_store.c.create_dt
+            )
+            .where(event_store.c.txid < bound, event_store.c.aggregate_id.is_not(None))
+            .order_by(event_store.c.aggregate_id, event_store.c.txid, event_store.c.seq)
+        )
+        if last_aggregate_id is not None:
+            stmt = stmt.where(event_store.c.aggregate_id > last_aggregate_id)
+
+        owns_executor = self.workers > 0 and self.executor is None
+        if owns_executor:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        try:
+            chunk: list[AggregateEvents] = []
+            chunk_events = 0
+
+            async def flush():
+                nonlocal chunk, chunk_events
+                rows = await self._fold(chunk)
+                await self._load(rows, chunk[-1][0], chunk_events)
+                report.events += chunk_events
+                report.aggregates += len(chunk)
+                report.seconds = time.perf_counter() - started
+                if self.progress is not None:
+                    self.progress(report)
+                chunk, chunk_events = [], 0
+
+            async with self.session_factory() as session:
+                # a server side cursor, the store is never held in memory at once
+                result = await session.stream(stmt.execution_options(yield_per=self.chunk_size))
+                async for aggregate_id, event_name, event_data, create_dt in result:
+                    if not chunk or chunk[-1][0] != aggregate_id:
+                        # chunks only ever end on an aggregate boundary
+                        if chunk_events >= self.chunk_size:
+                            await flush()
+                        chunk.append((aggregate_id, []))
+                    chunk[-1][1].append((event_name, event_data, create_dt))
+                    chunk_events += 1
+            if chunk:
+                await flush()
+            await self._finish(bound)
+        finally:
+            if owns_executor and self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
+        report.seconds = time.perf_counter() - started
+        return report
+
+
+async def main(projection: str, workers: int, chunk_size: int, restart: bool):
+    from app.common.db import async_transactional_session_factory, engine
+
+    assert async_transactional_session_factory is not None and engine is not None
+    replayer = Replayer(
+        PROJECTORS[projection](),
+        async_transactional_session_factory,
+        workers=workers,
+        chunk_size=chunk_size,
+        progress=lambda report: print(f"... {report}"),
+    )
+    print(f"replayed {projection}: {await replayer.run(restart=restart)}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--projection", choices=sorted(PROJECTORS), default=UserReadModelProjector.name)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    parser.add_argument("--restart", action="store_true", help="throw away an unfinished replay and start over")
+    args = parser.parse_args()
+    asyncio.run(main(args.projection, args.workers, args.chunk_size, args.restart))
@@ -0,0 +1,153 @@
+import abc
+import asyncio
+import contextlib
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Sequence
+from uuid import UUID
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.adapters.orm import event_store, projection_checkpoints
+
+logger = logging.getLogger(__name__)
+
+# an aggregate's (event_name, event_data, create_dt) in the order they were stored
+AggregateEvents = tuple[UUID, list[tuple[str, dict[str, Any], datetime]]]
+
+
+class Projector(abc.ABC):
+    name: str
+    # the tables a replay rebuilds from scratch, see app.service.projections.replay
+    tables: tuple[sa.Table, ...] = ()
+
+    # rows are event store rows in commit order, applied in the same transaction that moves the checkpoint
+    @abc.abstractmethod
+    async def apply(self, session: AsyncSession, events: Sequence[Any]):
+        raise NotImplementedError
+
+    # folds whole aggregates into rows for each of the tables, keyed by table name
+    # runs in a worker process during a replay so it has to be a picklable module level function
+    @staticmethod
+    def fold(aggregates: list[AggregateEvents]) -> dict[str, list[dict[str, Any]]]:
+        raise NotImplementedError
+
+    # anything that needs all the folded rows at once, tables are the replay's copies keyed by the live name
+    async def finish(self, session: AsyncSession, tables: dict[str, sa.Table]):
+        pass
+
+
+async def lock_checkpoint(session: AsyncSession, name: str) -> tuple[int, int]:
+    await session.execute(
+        postgresql.insert(projection_checkpoints)
+        .values(name=name, txid=0, seq=0)
+        .on_conflict_do_nothing(index_elements=[projection_checkpoints.c.name])
+    )
+    execution = await session.execute(
+        sa.select(projection_checkpoints.c.txid, projection_checkpoints.c.seq)
+        .where(projection_checkpoints.c.name == name)
+        .with_for_update()
+    )
+    txid, seq = execution.one()
+    return txid, seq
+
+
+def to_uuid(value: Any) -> UUID | None:
+    # event data went through json
+    if value is None or isinstance(value, UUID):
+        return value
+    return UUID(value)
+
+
+async def update_many(session: AsyncSession, table: sa.Table, key: str, patches: dict[UUID, dict[str, Any]]):
+    # patches touching the same columns go out as one executemany
+    grouped: defaultdict[tuple[str, ...], list[dict[str, Any]]] = defaultdict(list)
+    for ident, patch in patches.items():
+        if patch:
+            grouped[tuple(sorted(patch))].append({"_key": ident, **{f"_{k}": v for k, v in patch.items()}})
+    for columns, params in grouped.items():
+        stmt = (
+            sa.update(table)
+            .where(table.c[key] == sa.bindparam("_key"))
+            .values({column: sa.bindparam(f"_{column}") for column in columns})
+        )
+        await session.execute(stmt, params)
+
+
+# feeds each projector the event store in order from its checkpoint, a batch at a time
+# the checkpoint row is locked while a batch is applied so only one runner at a time moves a projection
+class ProjectionRunner:
+    def __init__(
+        self,
+        projectors: list[Projector],
+        session_factory: sessionmaker,
+        batch_size: int = 500,
+        poll_interval: float = 0.5,
+    ):
+        self.projectors = projectors
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._tasks: list[asyncio.Task] = []
+        self.checkpoints: dict[str, tuple[int, int]] = {}  # projector name -> (txid, seq) of its last batch
+
+    async def run_once(self, projector: Projector) -> int:
+        async with self.session_factory() as session:
+            async with session.begin():
+                txid, seq = await lock_checkpoint(session, projector.name)
+                self.checkpoints[projector.name] = (txid, seq)
+                checkpoint: Any = sa.tuple_(sa.literal(txid, sa.BigInteger), sa.literal(seq, sa.BigInteger))
+                execution = await session.execute(
+                    sa.select(event_store)
+                    .where(
+                        sa.tuple_(event_store.c.txid, event_store.c.seq) > checkpoint,
+                        # anything newer may still sit behind a transaction that hasn't committed
+                        event_store.c.txid < sa.func.txid_snapshot_xmin(sa.func.txid_current_snapshot()),
+                    )
+                    .order_by(event_store.c.txid, event_store.c.seq)
+                    .limit(self.batch_size)
+                )
+                events = execution.all()
+                if events:
+                    await projector.apply(session, events)
+                    await session.execute(
+                        sa.update(projection_checkpoints)
+                        .where(projection_checkpoints.c.name == projector.name)
+                        .values(txid=events[-1].txid, seq=events[-1].seq)
+                    )
+        return len(events)
+
+    async def catch_up(self, projector: Projector) -> int:
+        total = 0
+        while projected := await self.run_once(projector):
+            total += projected
+        return total
+
+    async def _run(self, projector: Projector):
+        while True:
+            try:
+                projected = await self.run_once(projector)
+            except Exception:
+                # the batch rolled back and is retried from the same checkpoint, the read model stays behind until then
+                logger.exception(
+                    "projector %s failed after checkpoint %s", projector.name, self.checkpoints.get(projector.name)
+                )
+                projected = 0
+            if projected < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._run(projector)) for projector in self.projectors]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self._tasks = []
@@ -0,0 +1,264 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Sequence
+from uuid import UUID
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.adapters.orm import projection_bug_state, projection_comment_state, user_read_model
+from app.domain.enums import BugStatusEnum, RecordStatusEnum
+from app.service.projections.runner import AggregateEvents, Projector, to_uuid, update_many
+
+USER_FIELDS = ("username", "email", "user_type", "user_status", "is_admin")
+BUG_FIELDS = ("author_id", "assignee_id", "status", "record_status")
+UUID_FIELDS = ("author_id", "assignee_id")
+
+
+def _bug_fields(data: dict[str, Any]) -> dict[str, Any]:
+    # assignee_id can legitimately go back to None so keys are kept if they are present at all
+    fields = {key: data[key] for key in BUG_FIELDS if key in data}
+    for key in UUID_FIELDS:
+        if key in fields:
+            fields[key] = to_uuid(fields[key])
+    return fields
+
+
+def _new_user(ident: UUID, data: dict[str, Any], create_dt: datetime) -> dict[str, Any]:
+    return {
+        "id": ident,
+        "create_dt": create_dt,
+        "update_dt": None,
+        **{key: data[key] for key in USER_FIELDS},
+        "comment_count": 0,
+        "bugs_raised_count": 0,
+        "bugs_assigned_to_count": 0,
+        "bugs_closed_count": 0,
+        "votes_count": 0,
+    }
+
+
+# the same rules as UserReadModelProjector.apply, but over one whole aggregate at a time
+# users and bugs are their own aggregates and comments and votes live in their bug's stream,
+# so every row comes out final and the counters are left to finish()
+def fold_user_read_model(aggregates: list[AggregateEvents]) -> dict[str, list[dict[str, Any]]]:
+    rows: dict[str, list[dict[str, Any]]] = {
+        user_read_model.name: [],
+        projection_bug_state.name: [],
+        projection_comment_state.name: [],
+    }
+    for ident, events in aggregates:
+        user: dict[str, Any] | None = None
+        bug: dict[str, Any] | None = None
+        comments: dict[UUID, dict[str, Any]] = {}
+        for name, data, create_dt in events:
+            if name == "AggregateCompacted" and data["aggregate"] == "Users":
+                user = _new_user(ident, data["state"], create_dt)
+            elif name == "AggregateCompacted":
+                bug = {"bug_id": ident, **_bug_fields(data["state"])}
+                comments = {
+                    to_uuid(comment["id"]): {  # type: ignore
+                        "comment_id": to_uuid(comment["id"]),
+                        "author_id": to_uuid(comment["author_id"]),
+                        "vote_count": comment["vote_count"],
+                    }
+                    for comment in data["state"]["comments"]
+                }
+            elif name == "UserCreated":
+                user = _new_user(ident, data, create_dt)
+            elif name in ("UserUpdated", "UserSoftDeleted") and user is not None:
+                user.update({key: data[key] for key in USER_FIELDS if data.get(key) is not None})
+            elif name == "BugCreated":
+                bug = {"bug_id": ident, **_bug_fields(data)}
+            elif name in ("BugUpdated", "BugSoftDeleted") and bug is not None:
+                bug.update(_bug_fields(data))
+            elif name == "CommentCreated":
+                comment_id: UUID = to_uuid(data["id"])  # type: ignore
+                comments[comment_id] = {
+                    "comment_id": comment_id,
+                    "author_id": to_uuid(data["author_id"]),
+                    "vote_count": 0,
+                }
+            elif name == "CommentDeleted":
+                comments.pop(to_uuid(data["id"]), None)  # type: ignore
+            elif name in ("Upvoted", "Downvoted"):
+                comment = comments.get(to_uuid(data["comment_id"]))  # type: ignore
+                if comment is not None:
+                    weight = data.get("weight") or 1
+                    comment["vote_count"] += weight if name == "Upvoted" else -weight
+        if user is not None:
+            rows[user_read_model.name].append(user)
+        if bug is not None:
+            rows[projection_bug_state.name].append(bug)
+        rows[projection_comment_state.name].extend(comments.values())
+    return rows
+
+
+async def recount(
+    session: AsyncSession,
+    user_ids: list[UUID] | None = None,
+    users: sa.Table = user_read_model,
+    bugs: sa.Table = projection_bug_state,
+    comments: sa.Table = projection_comment_state,
+):
+    # every user when user_ids is None
+    active_bugs = bugs.c.record_status == RecordStatusEnum.ACTIVE.value
+
+    def count_bugs(*where: Any):
+        return sa.select(sa.func.count()).where(active_bugs, *where).scalar_subquery()
+
+    stmt = sa.update(users).values(
+        bugs_raised_count=count_bugs(bugs.c.author_id == users.c.id),
+        bugs_assigned_to_count=count_bugs(bugs.c.assignee_id == users.c.id),
+        bugs_closed_count=count_bugs(
+            bugs.c.assignee_id == users.c.id,
+            bugs.c.status == BugStatusEnum.RESOLVED.value,
+        ),
+        comment_count=sa.select(sa.func.count()).where(comments.c.author_id == users.c.id).scalar_subquery(),
+        votes_count=sa.select(sa.func.coalesce(sa.func.sum(comments.c.vote_count), 0))
+        .where(comments.c.author_id == users.c.id)
+        .scalar_subquery(),
+    )
+    if user_ids is not None:
+        stmt = stmt.where(users.c.id.in_(user_ids))
+    await session.execute(stmt)
+
+
+# keeps bug_tracker_user_read_model and its counters current
+# a batch is folded in memory first so every table gets a handful of set based statements however big it is,
+# then the counters of every user the batch touched are recounted from the projector's own bug and comment state
+class UserReadModelProjector(Projector):
+    name = "user_read_model"
+    tables = (user_read_model, projection_bug_state, projection_comment_state)
+    fold = staticmethod(fold_user_read_model)
+
+    async def apply(self, session: AsyncSession, events: Sequence[Any]):
+        created_users: dict[UUID, dict[str, Any]] = {}
+        user_patches: dict[UUID, dict[str, Any]] = {}
+        created_bugs: dict[UUID, dict[str, Any]] = {}
+        bug_patches: dict[UUID, dict[str, Any]] = {}
+        created_comments: dict[UUID, UUID] = {}
+        deleted_comments: set[UUID] = set()
+        vote_deltas: defaultdict[UUID, int] = defaultdict(int)
+
+        for event in events:
+            data: dict[str, Any] = event.event_data
+            name: str = event.event_name
+            ident: UUID = event.aggregate_id
+            if name == "UserCreated":
+                created_users[ident] = {key: data[key] for key in USER_FIELDS} | {"create_dt": event.create_dt}
+                user_patches.pop(ident, None)
+            elif name in ("UserUpdated", "UserSoftDeleted"):
+                patch = {key: data[key] for key in USER_FIELDS if data.get(key) is not None}
+                (created_users[ident] if ident in created_users else user_patches.setdefault(ident, {})).update(patch)
+            elif name == "BugCreated":
+                created_bugs[ident] = _bug_fields(data)
+                bug_patches.pop(ident, None)
+            elif name in ("BugUpdated", "BugSoftDeleted"):
+                patch = _bug_fields(data)
+                (created_bugs[ident] if ident in created_bugs else bug_patches.setdefault(ident, {})).update(patch)
+            elif name == "CommentCreated":
+                created_comments[to_uuid(data["id"])] = to_uuid(data["author_id"])  # type: ignore
+            elif name == "CommentDeleted":
+                comment_id: UUID = to_uuid(data["id"])  # type: ignore
+                if created_comments.pop(comment_id, None) is None:
+                    deleted_comments.add(comment_id)
+            elif name in ("Upvoted", "Downvoted"):
+                weight = data.get("weight") or 1
+                vote_deltas[to_uuid(data["comment_id"])] += weight if name == "Upvoted" else -weight  # type: ignore
+
+        touched: set[UUID | None] = set(created_users)
+
+        if created_users:
+            rows = [
+                {
+                    "id": ident,
+                    **fields,
+                    "comment_count": 0,
+                    "bugs_raised_count": 0,
+                    "bugs_assigned_to_count": 0,
+                    "bugs_closed_count": 0,
+                    "votes_count": 0,
+                }
+                for ident, fields in created_users.items()
+            ]
+            insert = postgresql.insert(user_read_model).values(rows)
+            await session.execute(
+                insert.on_conflict_do_update(
+                    index_elements=[user_read_model.c.id],
+                    set_={key: insert.excluded[key] for key in USER_FIELDS},
+                )
+            )
+        await update_many(session, user_read_model, "id", user_patches)
+
+        # previous owners of changed bugs lose the bug from their counts
+        bug_ids = list(created_bugs) + list(bug_patches)
+        if bug_ids:
+            execution = await session.execute(
+                sa.select(projection_bug_state.c.author_id, projection_bug_state.c.assignee_id).where(
+                    projection_bug_state.c.bug_id.in_(bug_ids)
+                )
+            )
+            for author_id, assignee_id in execution.all():
+                touched.update((author_id, assignee_id))
+        for fields in [*created_bugs.values(), *bug_patches.values()]:
+            touched.update(fields.get(key) for key in UUID_FIELDS)
+
+        if created_bugs:
+            insert = postgresql.insert(projection_bug_state).values(
+                [{"bug_id": ident, **fields} for ident, fields in created_bugs.items()]
+            )
+            await session.execute(
+                insert.on_conflict_do_update(
+                    index_elements=[projection_bug_state.c.bug_id],
+                    set_={key: insert.excluded[key] for key in BUG_FIELDS},
+                )
+            )
+        await update_many(session, projection_bug_state, "bug_id", bug_patches)
+
+        if created_comments:
+            await session.execute(
+                postgresql.insert(projection_comment_state)
+                .values(
+                    [
+                        {"comment_id": comment_id, "author_id": author_id, "vote_count": 0}
+                        for comment_id, author_id in created_comments.items()
+                    ]
+                )
+                .on_conflict_do_nothing(index_elements=[projection_comment_state.c.comment_id])
+            )
+            touched.update(created_comments.values())
+        deltas = {comment_id: delta for comment_id, delta in vote_deltas.items() if delta}
+        if deltas:
+            vote_rows = sa.values(
+                sa.column("comment_id", postgresql.UUID(as_uuid=True)),
+                sa.column("delta", sa.Integer),
+                name="deltas",
+            ).data(sorted(deltas.items()))
+            execution = await session.execute(
+                sa.update(projection_comment_state)
+                .where(projection_comment_state.c.comment_id == vote_rows.c.comment_id)
+                .values(vote_count=projection_comment_state.c.vote_count + vote_rows.c.delta)
+                .returning(projection_comment_state.c.author_id)
+            )
+            touched.update(execution.scalars().all())
+        if deleted_comments:
+            execution = await session.execute(
+                sa.delete(projection_comment_state)
+                .where(projection_comment_state.c.comment_id.in_(deleted_comments))
+                .returning(projection_comment_state.c.author_id)
+            )
+            touched.update(execution.scalars().all())
+
+        user_ids = [ident for ident in touched if ident is not None]
+        if user_ids:
+            await recount(session, user_ids)
+
+    async def finish(self, session: AsyncSession, tables: dict[str, sa.Table]):
+        await recount(
+            session,
+            users=tables[user_read_model.name],
+            bugs=tables[projection_bug_state.name],
+            comments=tables[projection_comment_state.name],
+        )
@@ -0,0 +1,95 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+from app.common.cache import MISSING, CacheBackend
+from app.domain.events import Event
+from app.service.unit_of_work import AbstractUnitOfWork
+
+
+# read through cache for views keyed by aggregate id, kept correct by evicting on the aggregate's events
+# the outbox gets every event to one dispatcher, so with several processes and MemoryCache the others
+# only catch up when their entry expires, a shared backend doesn't have that problem
+class ReadCache:
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self.loading: dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0  # misses that waited on a load already running instead of starting their own
+        self.invalidations = 0
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "invalidations": self.invalidations,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+    # single flight: concurrent misses on a key share one load, a stampede on a hot entry is one query
+    async def get_or_load(self, key: Hashable, load: Callable[[], Awaitable[Any]]) -> Any:
+        value = await self.backend.get(key)
+        if value is not MISSING:
+            self.hits += 1
+            return value
+        self.misses += 1
+        while (future := self.loading.get(key)) is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # the request running the load went away, the next one in line runs it
+
+        future = asyncio.get_running_loop().create_future()
+        self.loading[key] = future
+        try:
+            value = await load()
+        except asyncio.CancelledError:
+            self._done(key, future)
+            future.cancel()
+            raise
+        except Exception as e:
+            self._done(key, future)
+            future.set_exception(e)
+            future.exception()  # the waiters raise it, nobody else needs to hear about it
+            raise
+        # invalidated while loading, what was read may predate the change so it isn't kept
+        if self._done(key, future):
+            await self.backend.set(key, value)
+        future.set_result(value)
+        return value
+
+    def _done(self, key: Hashable, future: asyncio.Future) -> bool:
+        if self.loading.get(key) is future:
+            del self.loading[key]
+            return True
+        return False
+
+    async def invalidate(self, *keys: Hashable):
+        for key in keys:
+            self.loading.pop(key, None)
+            await self.backend.delete(key)
+            self.invalidations += 1
+
+    # right after a command commits, so the process that made a change reads it back without waiting on the outbox
+    async def evict_seen(self, uow: AbstractUnitOfWork):
+        for name in ("users", "bugs"):
+            repository = getattr(uow, name, None)
+            if repository is not None and repository.seen:
+                await self.invalidate(*(aggregate.id for aggregate in repository.seen))
+
+
+# event handlers, see EVENT_HANDLERS
+async def evict_aggregate(event: Event, read_cache: ReadCache | None):
+    if read_cache is not None:
+        await read_cache.invalidate(event.id)  # type: ignore
+
+
+# comment events change their bug, the ones carrying its id at least
+async def evict_bug(event: Event, read_cache: ReadCache | None):
+    if read_cache is not None:
+        await read_cache.invalidate(event.bug_id)  # type: ignore
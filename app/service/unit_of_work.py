@@ -1,13 +1,19 @@
 import abc
+from typing import Callable
+from uuid import UUID
 
+import sqlalchemy as sa
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm.exc import StaleDataError
 
+from app.adapters.orm import outbox
 from app.adapters.repository import AbstractRepository, ModelType
 from app.common.db import async_transactional_session_factory
+from app.domain.events import Event
 from app.service import exceptions
 from app.service.bugs.repository import BugRepository
 from app.service.event_store.repository import EventStoreRepository
+from app.service.event_store.writer import GroupCommitAppender, append_events, event_rows
 from app.service.users.repository import UserRepository
 
 DEFAULT_TRANSACTIONAL_FACTORY = async_transactional_session_factory
@@ -19,6 +25,7 @@ class AbstractUnitOfWork(abc.ABC):
         self.bugs: AbstractRepository
         self.users: AbstractRepository
         self.event_store: AbstractRepository
+        self.published: list[tuple[UUID, Event]] = []
         return self
 
     async def __aexit__(self, *args):
@@ -27,12 +34,21 @@ class AbstractUnitOfWork(abc.ABC):
     async def commit(self):
         await self._commit()
 
+    def publish(self, aggregate_id: UUID, event: Event):
+        # for events raised without loading an aggregate, stored and sent out with the aggregates' events on commit
+        self.published.append((aggregate_id, event))
+
     async def rollback(self):
         await self._rollback()
 
     async def refresh(self, object: ModelType):
         await self._refresh(object)
 
+    def reset(self):
+        # drops the last request's session and repositories so an idle pooled uow holds no state
+        for name in ("session", "bugs", "users", "event_store", "published"):
+            self.__dict__.pop(name, None)
+
     @abc.abstractmethod
     async def _commit(self):
         raise NotImplementedError
@@ -51,8 +67,9 @@ class AbstractUnitOfWork(abc.ABC):
 
 
 class SqlAlchemyUnitOfWork(AbstractUnitOfWork):
-    def __init__(self, session_factory=DEFAULT_TRANSACTIONAL_FACTORY):
+    def __init__(self, session_factory=DEFAULT_TRANSACTIONAL_FACTORY, appender: GroupCommitAppender | None = None):
         self.session_factory = session_factory
+        self.appender = appender  # event store rows go through group commit instead of the request's transaction
 
     async def __aenter__(self) -> AbstractUnitOfWork:
         self.session: AsyncSession = self.session_factory()
@@ -65,11 +82,23 @@ class SqlAlchemyUnitOfWork(AbstractUnitOfWork):
         await self.session.close()
 
     async def _commit(self):
+        # every pending event of every seen aggregate goes to the event store in one INSERT
+        # and to the outbox for its handlers, never handled inline, so they commit or roll back with the change
+        events = event_rows(self.collect_new_events())
         try:
+            if events:
+                await self.session.execute(
+                    sa.insert(outbox),
+                    [{key: row[key] for key in ("aggregate_id", "event_name", "event_data")} for row in events],
+                )
+                if self.appender is None:
+                    await append_events(self.session, events)
             await self.session.commit()
         except StaleDataError:
             await self.session.rollback()
             raise exceptions.ConcurrencyException
+        if self.appender is not None:
+            await self.appender.append(events)
 
     async def _rollback(self):
         await self.session.rollback()
@@ -83,4 +112,29 @@ class SqlAlchemyUnitOfWork(AbstractUnitOfWork):
         objs.extend(list(self.users.seen))
         for obj in objs:
             while obj.events:
-                yield obj.events.popleft()
+                yield obj.id, obj.events.popleft()
+        while self.published:
+            yield self.published.pop(0)
+
+
+# hands every request its own uow, released ones are kept for reuse
+# a uow is cheap to set up but sharing one across concurrent requests swaps their sessions under them
+class UnitOfWorkPool:
+    def __init__(
+        self,
+        uow_factory: Callable[[], AbstractUnitOfWork] = SqlAlchemyUnitOfWork,
+        max_idle: int = 64,
+    ):
+        self.uow_factory = uow_factory
+        self.max_idle = max_idle
+        self.idle: list[AbstractUnitOfWork] = []
+
+    def acquire(self) -> AbstractUnitOfWork:
+        if self.idle:
+            return self.idle.pop()
+        return self.uow_factory()
+
+    def release(self, uow: AbstractUnitOfWork):
+        uow.reset()
+        if len(self.idle) < self.max_idle:
+            self.idle.append(uow)
@@ -16,6 +16,8 @@ class CreateUser(Command):
 
 
 class UpdateUser(Command):
+    idempotent = True
+
     id: UUID
     username: str | None
     email: str | None
@@ -25,13 +27,19 @@ class UpdateUser(Command):
     is_admin: bool | None
     security_question: str | None
     security_question_answer: str | None
+    expected_version: int | None = None  # from If-Match, the update is refused at any other version
 
 
 class SoftDeleteUser(Command):
+    idempotent = True
+
     id: UUID
+    expected_version: int | None = None
 
 
 class Login(Command):
+    idempotent = True
+
     email: str
     password: str
 
@@ -39,3 +47,16 @@ class Login(Command):
 class Refresh(Command):
     refresh_token: str
     grant_type: str
+
+
+class Logout(Command):
+    idempotent = True
+
+    user_id: UUID
+    jti: str  # of the access token the request came with
+    exp: int
+    refresh_token: str | None = None
+
+
+class RevokeSessions(Command):
+    user_id: UUID
@@ -23,6 +23,10 @@ class RefreshSuccess(BaseModel):
     token: str
 
 
+class LogoutIn(BaseModel):
+    refresh_token: str | None = None  # revoked along with the access token when given
+
+
 class UserCreateIn(BaseModel):
     password: str
     username: str
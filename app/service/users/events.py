@@ -3,13 +3,13 @@ from typing import TYPE_CHECKING
 from uuid import UUID
 
 from app.domain.enums import RecordStatusEnum, UserTypeEnum
-from app.domain.events import Event
+from app.domain.events import UNSET, Event
 
 if TYPE_CHECKING:
     pass
 
 
-@dataclass(repr=True, eq=False)
+@dataclass(repr=True, eq=False, frozen=True, slots=True)
 class UserCreated(Event):
     id: UUID = field(repr=False)
     username: str = field(repr=False)
@@ -22,20 +22,21 @@ class UserCreated(Event):
     security_question_answer: str = field(repr=False)
 
 
-@dataclass(repr=True, eq=False)
+# only the fields the update changed, see Base.changes
+@dataclass(repr=True, eq=False, frozen=True, slots=True)
 class UserUpdated(Event):
     id: UUID = field(repr=False)
-    username: str = field(repr=False)
-    email: str = field(repr=False)
-    password: str = field(repr=False)
-    user_type: UserTypeEnum = field(repr=False)
-    user_status: RecordStatusEnum = field(repr=False)
-    is_admin: bool = field(repr=False)
-    security_question: str = field(repr=False)
-    security_question_answer: str = field(repr=False)
+    username: str = field(default=UNSET, repr=False)
+    email: str = field(default=UNSET, repr=False)
+    password: str = field(default=UNSET, repr=False)
+    user_type: UserTypeEnum = field(default=UNSET, repr=False)
+    user_status: RecordStatusEnum = field(default=UNSET, repr=False)
+    is_admin: bool = field(default=UNSET, repr=False)
+    security_question: str = field(default=UNSET, repr=False)
+    security_question_answer: str = field(default=UNSET, repr=False)
 
 
-@dataclass(repr=True, eq=False)
+@dataclass(repr=True, eq=False, frozen=True, slots=True)
 class UserSoftDeleted(Event):
     id: UUID = field(repr=False)
     user_status: RecordStatusEnum = field(default_factory=lambda: RecordStatusEnum.DELETED, repr=False)
@@ -1,32 +1,59 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import Any
 from uuid import UUID
 
-from argon2 import PasswordHasher
-from sqlalchemy.future import select
+from sqlalchemy.exc import IntegrityError
 
 from app.common import exceptions as common_exc
 from app.common.security import create_jwt_token, validate_jwt_token
-from app.domain import enums
 from app.domain.models import Users
-from app.domain.read_models import UserReadModel
 from app.service import exceptions as exc
+from app.service.hashing import PasswordHashingService
 from app.service.unit_of_work import AbstractUnitOfWork
-from app.service.users import commands, events
+from app.service.users import commands, tokens
+from app.service.users.tokens import TokenRevocations
 
+CREDENTIAL_FIELDS = ("password", "security_question_answer")
+EMAIL_INDEX = "uq_bug_tracker_users_lower_email_active"
 
-async def login(cmd: commands.Login, *, uow: AbstractUnitOfWork, hasher: PasswordHasher):
+
+async def _hash_credentials(data: dict[str, Any], hasher: PasswordHashingService) -> dict[str, Any]:
+    fields = [field for field in CREDENTIAL_FIELDS if data.get(field)]
+    hashed = await asyncio.gather(*[hasher.hash(data[field]) for field in fields])
+    data.update(zip(fields, hashed))
+    return data
+
+
+# the routes check If-Match before loading anything, this catches a write landing in between,
+# and a retried command finding the version it lost to
+def _check_version(user: Users, expected_version: int | None):
+    if expected_version is not None and user.version != expected_version:
+        raise exc.PreconditionFailed(f"user is at version {user.version}, not {expected_version}")
+
+
+# no lookup before the insert, the unique index on active users' emails fails the flush of a duplicate,
+# which also closes the gap two concurrent sign ups used to slip through between the check and the insert
+async def _flush_unique_email(uow: AbstractUnitOfWork, email: str):
+    try:
+        await uow.session.flush()
+    except IntegrityError as e:
+        if getattr(e.orig.__cause__, "constraint_name", None) != EMAIL_INDEX:
+            raise
+        raise exc.DuplicateRecord(f"user with email {email} exists")
+
+
+async def login(cmd: commands.Login, *, uow: AbstractUnitOfWork, hasher: PasswordHashingService):
     async with uow:
-        users: list[Users] = await uow.users.list(email__eq=cmd.email)
-        if not users:
+        # deleted users aren't found, the same as an unknown email
+        user: Users | None = await uow.users.get_active_by_email(cmd.email)  # type: ignore
+        if not user:
             raise exc.Unauthorized("email or password is incorrect")
-
-        user: Users = users[0]
-        if not user.verify_password(cmd.password, hasher):
+        if not await hasher.verify(user.password, cmd.password):
             raise exc.Unauthorized("email or password is incorrect")
 
-        if user.user_status == enums.RecordStatusEnum.DELETED:
-            raise exc.ItemNotFound("user is deleted")
         if hasher.check_needs_rehash(user.password):
-            user.set_password(cmd.password, hasher)
+            user.set_password(await hasher.hash(cmd.password))
 
         private_claims = {
             "email": user.email,
@@ -50,7 +77,7 @@ async def login(cmd: commands.Login, *, uow: AbstractUnitOfWork, hasher: Passwor
         }
 
 
-async def refresh(cmd: commands.Refresh, *, uow: AbstractUnitOfWork):
+async def refresh(cmd: commands.Refresh, *, uow: AbstractUnitOfWork, revocations: TokenRevocations | None = None):
     async with uow:
         if cmd.grant_type != "refresh_token":
             raise exc.Forbidden("incorrect grant type")
@@ -60,9 +87,11 @@ async def refresh(cmd: commands.Refresh, *, uow: AbstractUnitOfWork):
             raise exc.Forbidden(f"{str(e)}")
         except common_exc.InvalidToken as e:
             raise exc.Forbidden(f"{str(e)}")
+        if revocations is not None and revocations.is_revoked(decoded):
+            raise exc.Forbidden("token has been revoked")
 
         id = UUID(decoded.sub) if isinstance(decoded.sub, str) else decoded.sub
-        user: Users | None = await uow.users.get(id)
+        user: Users | None = await uow.users.get(id, profile="credentials")
         if not user:
             raise exc.Forbidden("user not found")
         private_claims = {
@@ -81,94 +110,101 @@ async def refresh(cmd: commands.Refresh, *, uow: AbstractUnitOfWork):
         }
 
 
-async def create_user(cmd: commands.CreateUser, *, uow: AbstractUnitOfWork, hasher: PasswordHasher):
+async def create_user(cmd: commands.CreateUser, *, uow: AbstractUnitOfWork, hasher: PasswordHashingService):
+    data_in = await _hash_credentials(cmd.dict(), hasher)
     async with uow:
-        users: list[Users] = await uow.users.list(
-            email__eq=cmd.email,
-            user_status__eq=enums.RecordStatusEnum.ACTIVE,
-        )
-        if users:
-            raise exc.DuplicateRecord(f"user with email {cmd.email} exists")
-        data_in = cmd.dict()
-        new_user = Users.create_user(data=data_in, hasher=hasher)
+        new_user = Users.create_user(data=data_in)
         uow.users.add(new_user)
-        uow.event_store.add(new_user.generate_event_store())
+        await _flush_unique_email(uow, cmd.email)
         await uow.commit()
         return new_user.id
 
 
-async def update_user(cmd: commands.UpdateUser, *, uow: AbstractUnitOfWork, hasher: PasswordHasher):
+async def update_user(
+    cmd: commands.UpdateUser,
+    *,
+    uow: AbstractUnitOfWork,
+    hasher: PasswordHashingService,
+    revocations: TokenRevocations | None = None,
+):
+    # argon2 runs before the transaction opens, like create_user, the stored hash is read on its own for it
+    data = cmd.dict(exclude_unset=True, exclude_none=True, exclude={"expected_version"})
+    if data.get("password"):
+        async with uow:
+            current: Users | None = await uow.users.get(cmd.id, profile="credentials")
+            stored = current.password if current else None
+        if stored is not None and await hasher.verify(stored, data["password"]):
+            del data["password"]  # the same password again, nothing to hash or revoke
+    data = await _hash_credentials(data, hasher)
     async with uow:
-        user: Users | None = await uow.users.get(cmd.id)
+        user: Users | None = await uow.users.get(cmd.id, profile="summary")
         if not user:
             raise exc.ItemNotFound(f"user with id {cmd.id} not found")
         if not user.is_active:
             raise exc.ItemNotFound("user is deleted")
-        data = cmd.dict(exclude_unset=True, exclude_none=True)
-        user.update_user(data, hasher)
-        uow.event_store.add(user.generate_event_store())
+        _check_version(user, cmd.expected_version)
+        revoked_at = await tokens.revoke_sessions(uow.session, user.id) if "password" in data else None
+        user.update_user(data)
+        if "email" in data:
+            await _flush_unique_email(uow, data["email"])
         await uow.commit()
-        return user.id
+    # a new password signs the user out everywhere
+    if revoked_at is not None and revocations is not None:
+        revocations.add_sessions(user.id, revoked_at)
+    return user.id
 
 
-async def soft_delete_user(cmd: commands.SoftDeleteUser, *, uow: AbstractUnitOfWork):
+async def soft_delete_user(
+    cmd: commands.SoftDeleteUser,
+    *,
+    uow: AbstractUnitOfWork,
+    revocations: TokenRevocations | None = None,
+):
     async with uow:
-        user: Users | None = await uow.users.get(cmd.id)
+        user: Users | None = await uow.users.get(cmd.id, profile="summary")
         if not user:
             raise exc.ItemNotFound(f"user with id {cmd.id} not found")
         if not user.is_active:
             return
+        _check_version(user, cmd.expected_version)
         user.delete_user()
-        uow.event_store.add(user.generate_event_store())
+        revoked_at = await tokens.revoke_sessions(uow.session, user.id)
         await uow.commit()
-        return
+    if revocations is not None:
+        revocations.add_sessions(user.id, revoked_at)
+    return
 
 
-# event handlers
-async def insert_into_user_read_model(
-    event: events.UserCreated,
-    *,
-    uow: AbstractUnitOfWork,
-):
+async def logout(cmd: commands.Logout, *, uow: AbstractUnitOfWork, revocations: TokenRevocations | None = None):
+    revoked = [(cmd.jti, cmd.exp)]
+    if cmd.refresh_token:
+        try:
+            refresh_token = validate_jwt_token(token=cmd.refresh_token)
+        except common_exc.TokenExpired:
+            refresh_token = None  # nothing left to revoke
+        except common_exc.InvalidToken as e:
+            raise exc.Forbidden(f"{str(e)}")
+        if refresh_token is not None:
+            if refresh_token.sub != str(cmd.user_id):
+                raise exc.Forbidden("refresh token belongs to another user")
+            revoked.append((refresh_token.jti, int(refresh_token.exp)))
     async with uow:
-        new_row = UserReadModel(
-            id=event.id,
-            username=event.username,
-            email=event.email,
-            user_type=event.user_type,
-            user_status=event.user_status,
-            is_admin=event.is_admin,
-        )
-        uow.session.add(new_row)
+        for jti, exp in revoked:
+            await tokens.revoke_token(uow.session, cmd.user_id, jti, datetime.fromtimestamp(exp, timezone.utc))
         await uow.commit()
+    if revocations is not None:
+        for jti, _ in revoked:
+            revocations.add_token(jti)
 
 
-async def update_user_read_model(
-    event: events.UserUpdated,
+async def revoke_sessions(
+    cmd: commands.RevokeSessions,
     *,
     uow: AbstractUnitOfWork,
+    revocations: TokenRevocations | None = None,
 ):
     async with uow:
-        query = select(UserReadModel).where(UserReadModel.id == event.id)
-        execution = await uow.session.execute(query)
-        row: UserReadModel | None = execution.scalars().first()
-        if row:
-            for key in event.__dict__.keys():
-                val = getattr(event, key)
-                if val is not None:
-                    setattr(row, key, val)
-            await uow.commit()
-
-
-async def soft_delete_user_read_model(
-    event: events.UserSoftDeleted,
-    *,
-    uow: AbstractUnitOfWork,
-):
-    async with uow:
-        query = select(UserReadModel).where(UserReadModel.id == event.id)
-        execution = await uow.session.execute(query)
-        row: UserReadModel | None = execution.scalars().first()
-        if row:
-            row.user_status = event.user_status
-            await uow.commit()
+        revoked_at = await tokens.revoke_sessions(uow.session, cmd.user_id)
+        await uow.commit()
+    if revocations is not None:
+        revocations.add_sessions(cmd.user_id, revoked_at)
@@ -1,6 +1,7 @@
+import sqlalchemy as sa
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import load_only, raiseload, selectinload
 from sqlalchemy.sql.selectable import Select
 
 from app.adapters.repository import SqlAlchemyRepository
@@ -10,9 +11,40 @@ from app.domain.models import Users
 class UserRepository(SqlAlchemyRepository[Users]):
     def __init__(self, session: AsyncSession):
         super(UserRepository, self).__init__(session, Users)
-        self.query: Select = (
-            select(Users)
-            .options(selectinload(Users.comments))
-            .options(selectinload(Users.raised_bugs))
-            .options(selectinload(Users.assigned_bugs))
+        self.profiles: dict[str, Select] = {
+            # login and token refresh, just enough to check a password and issue claims
+            "credentials": select(Users).options(
+                load_only(
+                    Users.id,
+                    Users.email,
+                    Users.password,
+                    Users.user_type,
+                    Users.user_status,
+                    Users.is_admin,
+                    Users.version,  # a password rehash on login updates the row
+                ),
+                raiseload("*"),
+            ),
+            # every column, relationships raise instead of lazy loading
+            "summary": select(Users).options(raiseload("*")),
+            "full": (
+                select(Users)
+                .options(selectinload(Users.comments))
+                .options(selectinload(Users.raised_bugs))
+                .options(selectinload(Users.assigned_bugs))
+            ),
+        }
+        self.query: Select = self.profiles["full"]
+
+    async def get_active_by_email(self, email: str, profile: str | None = "credentials") -> Users | None:
+        # matches uq_bug_tracker_users_lower_email_active, the status is a literal and not a bind parameter
+        # so a generic plan of the prepared statement can still prove the index's predicate and use it
+        query = self._query_for(profile).where(
+            sa.func.lower(Users.email) == sa.func.lower(email),
+            Users.user_status == sa.literal_column("'active'"),
         )
+        execution = await self.session.execute(query)
+        user: Users | None = execution.scalar_one_or_none()  # the index allows one at most
+        if user:
+            self.seen.add(user)
+        return user
@@ -0,0 +1,33 @@
+from app.common.rate_limit import RateLimit, RateLimitBackend
+
+
+# checked before the login command runs, so a throttled attempt costs no query and no argon2 verify
+# per ip against one client spraying passwords over many accounts, per email against many clients on one account
+# the per email limit also throttles the account's owner while it is under attack, a login that succeeds
+# refills their bucket so the owner isn't held back by their own typos
+class LoginThrottle:
+    def __init__(
+        self,
+        backend: RateLimitBackend,
+        ip_burst: int = 20,
+        ip_per_second: float = 1.0,
+        email_burst: int = 5,
+        email_per_second: float = 0.1,
+    ):
+        self.per_ip = RateLimit(backend, "login_ip", ip_burst, ip_per_second)
+        self.per_email = RateLimit(backend, "login_email", email_burst, email_per_second)
+
+    @staticmethod
+    def _email(email: str) -> str:
+        return email.strip().lower()
+
+    # seconds the attempt has to wait, 0 when it may go ahead
+    async def attempt(self, email: str, ip: str | None) -> float:
+        if ip is not None:
+            wait = await self.per_ip.take(ip)
+            if wait:
+                return wait
+        return await self.per_email.take(self._email(email))
+
+    async def succeeded(self, email: str):
+        await self.per_email.reset(self._email(email))
@@ -0,0 +1,148 @@
+import asyncio
+import contextlib
+import logging
+import time
+from datetime import datetime, timedelta
+from uuid import UUID
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.adapters.orm import revoked_tokens
+from app.common.settings import settings
+from app.domain.common_schemas import Token
+from app.utils.bloom_filter import BloomFilter
+
+logger = logging.getLogger(__name__)
+
+
+# logout, revoking a token more than once is a no-op
+async def revoke_token(session: AsyncSession, user_id: UUID, jti: str, expires_at: datetime):
+    await session.execute(
+        postgresql.insert(revoked_tokens)
+        .values(user_id=user_id, jti=jti, expires_at=expires_at, create_dt=sa.func.clock_timestamp())
+        .on_conflict_do_nothing(index_elements=[revoked_tokens.c.jti])
+    )
+
+
+# every token the user holds, returns when they were revoked
+# clock_timestamp and not now(), the transaction may have started before the latest token was issued
+async def revoke_sessions(
+    session: AsyncSession,
+    user_id: UUID,
+    lifetime: timedelta = settings.jwt_settings.refresh_expiration_delta,
+) -> datetime:
+    execution = await session.execute(
+        sa.insert(revoked_tokens)
+        .values(user_id=user_id, jti=None, create_dt=sa.func.clock_timestamp(), expires_at=sa.func.now() + lifetime)
+        .returning(revoked_tokens.c.create_dt)
+    )
+    return execution.scalar_one()
+
+
+# the revoked tokens table mirrored in a worker so checking a token never queries it
+# a worker sees its own revocations at once and the others' within poll_interval
+class TokenRevocations:
+    def __init__(
+        self,
+        session_factory: sessionmaker,
+        poll_interval: float = 2.0,
+        rebuild_interval: float = 3600.0,
+        capacity: int = 100000,
+        error_rate: float = 0.001,
+        lookback: float = 60.0,
+    ):
+        self.session_factory = session_factory
+        self.poll_interval = poll_interval
+        self.rebuild_interval = rebuild_interval  # expired rows are purged and the filter sized again this often
+        self.capacity = capacity
+        self.error_rate = error_rate
+        # create_dt is taken before the revoking transaction commits, rows that far back are read again
+        # in case one committed after the last poll with an earlier create_dt
+        self.lookback = timedelta(seconds=lookback)
+        self.filter = BloomFilter(capacity, error_rate)
+        self.jtis: set[str] = set()
+        self.revoked_before: dict[str, float] = {}  # user id -> tokens issued up to this timestamp are revoked
+        self.since: datetime | None = None
+        self._task: asyncio.Task | None = None
+
+    def is_revoked(self, token: Token) -> bool:
+        cutoff = self.revoked_before.get(token.sub)
+        if cutoff is not None and float(token.iat) <= cutoff:
+            return True
+        # the filter says no for almost every token, the exact set settles the false positives
+        return token.jti in self.filter and token.jti in self.jtis
+
+    def add_token(self, jti: str):
+        if jti not in self.jtis:
+            self.jtis.add(jti)
+            self.filter.add(jti)
+
+    def add_sessions(self, user_id: UUID | str, revoked_at: datetime):
+        # tokens carry a sub-second iat, older ones with whole seconds lose the whole second of the revocation
+        cutoff = revoked_at.timestamp()
+        key = str(user_id)
+        if cutoff > self.revoked_before.get(key, 0):
+            self.revoked_before[key] = cutoff
+
+    async def _fetch(self, since: datetime | None) -> list[sa.engine.Row]:
+        query = sa.select(revoked_tokens.c.user_id, revoked_tokens.c.jti, revoked_tokens.c.create_dt).where(
+            revoked_tokens.c.expires_at > sa.func.now()
+        )
+        if since is not None:
+            query = query.where(revoked_tokens.c.create_dt >= since - self.lookback)
+        async with self.session_factory() as session:
+            execution = await session.execute(query)
+            return execution.all()
+
+    def _apply(self, rows: list[sa.engine.Row]):
+        for user_id, jti, create_dt in rows:
+            if jti is None:
+                self.add_sessions(user_id, create_dt)
+            else:
+                self.add_token(jti)
+            if self.since is None or create_dt > self.since:
+                self.since = create_dt
+
+    async def load(self) -> int:
+        rows = await self._fetch(self.since)
+        self._apply(rows)
+        return len(rows)
+
+    async def rebuild(self) -> int:
+        async with self.session_factory() as session:
+            await session.execute(sa.delete(revoked_tokens).where(revoked_tokens.c.expires_at <= sa.func.now()))
+            await session.commit()
+        rows = await self._fetch(None)
+        # nothing awaits between here and the last row applied, a check never sees a half built mirror
+        self.filter = BloomFilter(max(self.capacity, 2 * len(rows)), self.error_rate)
+        self.jtis, self.revoked_before, self.since = set(), {}, None
+        self._apply(rows)
+        return len(rows)
+
+    async def _run(self):
+        rebuilt: float | None = None
+        while True:
+            try:
+                if rebuilt is None or self.filter.full or time.monotonic() - rebuilt >= self.rebuild_interval:
+                    await self.rebuild()
+                    rebuilt = time.monotonic()
+                else:
+                    await self.load()
+            except Exception:
+                # the mirror stays as it was, revocations from other workers wait for the next poll that works
+                logger.exception("polling revoked tokens failed")
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
@@ -6,24 +6,45 @@ from sqlalchemy.orm import selectinload
 
 from app.domain import common_schemas, enums
 from app.domain.models import Bugs, Comments, Users
+from app.domain.read_models import BugsReadModel, UserReadModel
 from app.service import exceptions as exc
+from app.service.read_cache import ReadCache
 from app.service.users.dto import UserOut
-from app.utils.helpers import set_pagination
+from app.utils.helpers import Page, build_keyset_page, set_keyset_pagination
 
 
-async def get_my_user_page(session: AsyncSession, user_id: UUID):
-    query = (
-        select(Users)
-        .options(selectinload(Users.comments))
-        .options(selectinload(Users.raised_bugs))
-        .options(selectinload(Users.assigned_bugs))
-        .where(Users.id == user_id, Users.user_status == enums.RecordStatusEnum.ACTIVE)
-    )
+async def _load_my_user_page(session: AsyncSession, user_id: UUID) -> tuple[int, UserOut]:
+    # UserOut is columns only, nothing related needs loading
+    query = select(Users).where(Users.id == user_id, Users.user_status == enums.RecordStatusEnum.ACTIVE)
     execution = await session.execute(query)
     user = execution.scalar_one_or_none()
     if not user:
-        raise exc.ItemNotFound(f"user with id {id} not found")
-    return UserOut.from_orm(user)
+        raise exc.ItemNotFound(f"user with id {user_id} not found")
+    return user.version, UserOut.from_orm(user)
+
+
+# version is the one the etag was taken from, a cached page older than it was missed by an eviction
+# (another process changed the user) and is reloaded, so a stale body never goes out under a newer etag
+async def get_my_user_page(
+    session: AsyncSession,
+    user_id: UUID,
+    cache: ReadCache | None = None,
+    version: int | None = None,
+) -> UserOut:
+    if cache is None:
+        return (await _load_my_user_page(session, user_id))[1]
+    cached_version, out = await cache.get_or_load(user_id, lambda: _load_my_user_page(session, user_id))
+    if version is not None and cached_version < version:
+        await cache.invalidate(user_id)
+        cached_version, out = await cache.get_or_load(user_id, lambda: _load_my_user_page(session, user_id))
+    return out
+
+
+# what a conditional request compares its etag against, one index lookup and no user loaded
+async def get_user_version(session: AsyncSession, user_id: UUID) -> int | None:
+    query = select(Users.version).where(Users.id == user_id, Users.user_status == enums.RecordStatusEnum.ACTIVE)
+    execution = await session.execute(query)
+    return execution.scalar_one_or_none()
 
 
 async def get_my_comments(
@@ -31,9 +52,9 @@ async def get_my_comments(
     user_id: UUID,
     search_query: dict | None,
     ordering: str | None,
-    page: int | None,
-    count_per_page: int | None,
-):
+    cursor: str | None,
+    count_per_page: int = 20,
+) -> Page:
     query = (
         select(Comments)
         .options(selectinload(Comments.bug))
@@ -42,11 +63,12 @@ async def get_my_comments(
         .join(Bugs, Bugs.id == Comments.bug_id)
     )
     # TODO: add filters
-    query = set_pagination(query, page, count_per_page)
-    # TODO: set ordering
+    # TODO: set ordering, newest first until then
+    sort_columns = [Comments.create_dt, Comments.id]
+    query = set_keyset_pagination(query, sort_columns, cursor, count_per_page, descending=True)
     execution = await session.execute(query)
     comments = execution.scalars().all()
-    return comments
+    return build_keyset_page(comments, sort_columns, cursor, count_per_page)
 
 
 async def get_my_bugs(
@@ -54,44 +76,44 @@ async def get_my_bugs(
     user_id: UUID,
     search_query: dict | None,
     ordering: str | None,
-    page: int | None,
-    count_per_page: int | None,
-):
-    query = (
-        select(Bugs)
-        .options(selectinload(Bugs.comments))
-        .options(selectinload(Bugs.author))
-        .options(selectinload(Bugs.assignee))
-    )
+    cursor: str | None,
+    count_per_page: int = 20,
+) -> Page:
+    # the read model has the author and assignee flattened in, nothing to load alongside it
+    query = select(BugsReadModel)
     # TODO: add more filters
     filters = []
     if search_query:
         for key, value in search_query.items():
             _like_search = f"%{value}%"
             if key == "author":
-                filters.append(Bugs.author_id == user_id)
+                filters.append(BugsReadModel.author_id == user_id)
             elif key == "assignee":
-                filters.append(Bugs.assignee_id == user_id)
+                filters.append(BugsReadModel.assigned_user_id == user_id)
             else:
                 pass
     query = query.where(*filters)
-    query = set_pagination(query, page, count_per_page)
-    # TODO: set ordering
+    # TODO: set ordering, newest first until then
+    sort_columns = [BugsReadModel.bug_created_dt, BugsReadModel.bug_id]
+    query = set_keyset_pagination(query, sort_columns, cursor, count_per_page, descending=True)
     execution = await session.execute(query)
     bugs = execution.scalars().all()
-    return bugs
+    return build_keyset_page(bugs, sort_columns, cursor, count_per_page)
 
 
 # bo = back office
-async def bo_get_users_list(session: AsyncSession, token: common_schemas.Token):
+async def bo_get_users_list(
+    session: AsyncSession,
+    token: common_schemas.Token,
+    cursor: str | None = None,
+    count_per_page: int = 20,
+) -> Page:
     if token.admin is not True:
         raise exc.Forbidden("not an admin user")
-    query = (
-        select(Users)
-        .options(selectinload(Users.comments))
-        .options(selectinload(Users.raised_bugs))
-        .options(selectinload(Users.assigned_bugs))
-    )
+    # one precomputed row per user with its counters, see UserReadModelProjector
+    query = select(UserReadModel)
+    sort_columns = [UserReadModel.create_dt, UserReadModel.id]
+    query = set_keyset_pagination(query, sort_columns, cursor, count_per_page, descending=True)
     execution = await session.execute(query)
     users = execution.scalars().all()
-    return users
+    return build_keyset_page(users, sort_columns, cursor, count_per_page)
@@ -38,12 +38,16 @@ from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_scoped_sessi
 from sqlalchemy.orm import clear_mappers, sessionmaker
 
 from app.adapters.orm import metadata, start_mappers
+from app.common.rate_limit import MemoryRateLimitBackend
 from app.common.settings import settings
 from app.domain import enums
 from app.entrypoints import dependencies as deps
 from app.main import app
+from app.service.hashing import PasswordHashingService
 from app.service.messagebus import MessageBus, MessageBusFactory
-from app.service.unit_of_work import AbstractUnitOfWork, SqlAlchemyUnitOfWork
+from app.service.unit_of_work import AbstractUnitOfWork, SqlAlchemyUnitOfWork, UnitOfWorkPool
+from app.service.users.throttle import LoginThrottle
+from app.service.users.tokens import TokenRevocations
 from app.tests.fakes.unit_of_work import FakeUnitOfWork
 
 
@@ -89,6 +93,13 @@ def password_hasher():
     return PasswordHasher()
 
 
+@pytest.fixture(scope="function")
+def hashing_service(password_hasher: PasswordHasher):
+    service = PasswordHashingService(hasher=password_hasher)
+    yield service
+    service.shutdown()
+
+
 # DB STUFF FROM HERE
 @pytest.fixture(scope="session")
 def event_loop():
@@ -165,37 +176,66 @@ def use_fake_uow() -> bool:
     return False
 
 
+@pytest_asyncio.fixture(scope="function")
+def revocations(session_factory) -> TokenRevocations:
+    return TokenRevocations(session_factory)
+
+
+@pytest.fixture(scope="function")
+def login_throttle() -> LoginThrottle:
+    return LoginThrottle(MemoryRateLimitBackend())
+
+
 @pytest_asyncio.fixture(scope="function")
 def messagebus(
     use_fake_uow: bool,
     uow: AbstractUnitOfWork,
     fake_uow: AbstractUnitOfWork,
+    hashing_service: PasswordHashingService,
+    revocations: TokenRevocations,
 ) -> MessageBus:
+    test_uow = fake_uow if use_fake_uow else uow
     MESSAGEBUS = MessageBusFactory(
-        uow=fake_uow if use_fake_uow else uow,
-        password_hasher=PasswordHasher(),
+        uow_pool=UnitOfWorkPool(lambda: test_uow),
+        password_hasher=hashing_service,
+        read_cache=deps.READ_CACHE,  # what the routes read through
+        revocations=revocations,
     )
-    return MESSAGEBUS()
+    return MESSAGEBUS(test_uow)
 
 
 # TEST CLIENT FROM HERE
 @pytest.fixture(scope="function")
-def client(messagebus: MessageBus, session: AsyncSession):
+def client(
+    messagebus: MessageBus,
+    session: AsyncSession,
+    revocations: TokenRevocations,
+    login_throttle: LoginThrottle,
+):
     from app.main import app
 
     # dependency injection here
     app.dependency_overrides[deps.get_message_bus] = lambda: messagebus
     app.dependency_overrides[deps.get_reader_session] = lambda: session
+    app.dependency_overrides[deps.get_revocations] = lambda: revocations
+    app.dependency_overrides[deps.get_login_throttle] = lambda: login_throttle
 
     with TestClient(app) as c:
         yield c
 
 
 @pytest.fixture(scope="function")
-def test_app(messagebus: MessageBus, session: AsyncSession):
+def test_app(
+    messagebus: MessageBus,
+    session: AsyncSession,
+    revocations: TokenRevocations,
+    login_throttle: LoginThrottle,
+):
     # dependency injection here
     app.dependency_overrides[deps.get_message_bus] = lambda: messagebus
     app.dependency_overrides[deps.get_reader_session] = lambda: session
+    app.dependency_overrides[deps.get_revocations] = lambda: revocations
+    app.dependency_overrides[deps.get_login_throttle] = lambda: login_throttle
 
     yield app
 
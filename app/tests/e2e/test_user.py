@@ -1,12 +1,20 @@
 from http import HTTPStatus
+from uuid import UUID
 
 import httpx
 import pytest
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import sessionmaker
 
 from app.common.settings import settings
+from app.entrypoints import dependencies as deps
 from app.main import app
+from app.service.hashing import PasswordHashingService
+from app.service.unit_of_work import AbstractUnitOfWork
+from app.service.users import commands, handlers
+from app.tests.e2e import conftest as e2e
 from app.tests.e2e.conftest import create_user_and_login
 
 
@@ -145,6 +153,153 @@ async def test_delete_user(
     async with httpx.AsyncClient(app=test_app, base_url=settings.test_url) as ac:
         my_user_page_res = await ac.get(my_user_page_url, headers=enduser_headers)
     my_user_page = my_user_page_res.json()
-    assert my_user_page_res.status_code == HTTPStatus.NOT_FOUND, my_user_page
+    # deleting the user revoked its tokens
+    assert my_user_page_res.status_code == HTTPStatus.UNAUTHORIZED, my_user_page
 
     # TODO: unhappy path test cases
+
+
+@pytest.mark.asyncio
+async def test_update_and_delete_through_the_real_reader_session(
+    test_app: FastAPI,
+    user_data_in: dict,
+    async_engine: AsyncEngine,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    # get_reader_session itself runs, over its own autocommit connection like outside tests
+    del test_app.dependency_overrides[deps.get_reader_session]
+    reader_factory = sessionmaker(
+        async_engine.execution_options(isolation_level="AUTOCOMMIT"), expire_on_commit=False, class_=AsyncSession
+    )
+    monkeypatch.setattr(deps, "async_autocommit_session_factory", reader_factory)
+
+    enduser_headers, new_user_id = await create_user_and_login(app=test_app, user_data_in=user_data_in)
+    update_url = test_app.url_path_for("update_user", user_id=str(new_user_id))
+    delete_url = test_app.url_path_for("delete_user", user_id=str(new_user_id))
+    async with httpx.AsyncClient(app=test_app, base_url=settings.test_url, headers=enduser_headers) as ac:
+        res = await ac.put(update_url, json={**user_data_in, "username": "something else"})
+        assert res.status_code == HTTPStatus.OK
+        res = await ac.put(update_url, json=user_data_in, headers={"If-Match": '"0"'})
+        assert res.status_code == HTTPStatus.PRECONDITION_FAILED
+        res = await ac.delete(delete_url, headers={"If-Match": '"2"'})
+        assert res.status_code == HTTPStatus.OK
+
+
+@pytest.mark.asyncio
+async def test_conditional_requests(
+    test_app: FastAPI,
+    user_data_in: dict,
+):
+    enduser_headers, new_user_id = await create_user_and_login(
+        app=test_app,
+        user_data_in=user_data_in,
+    )
+    my_user_page_url = test_app.url_path_for("my_user_page", user_id=new_user_id)
+    update_url = test_app.url_path_for("update_user", user_id=str(new_user_id))
+    delete_url = test_app.url_path_for("delete_user", user_id=str(new_user_id))
+    async with httpx.AsyncClient(app=test_app, base_url=settings.test_url, headers=enduser_headers) as ac:
+        res = await ac.get(my_user_page_url)
+        assert res.status_code == HTTPStatus.OK
+        first_etag = res.headers["etag"]
+
+        res = await ac.get(my_user_page_url, headers={"If-None-Match": f"W/{first_etag}"})
+        assert res.status_code == HTTPStatus.NOT_MODIFIED
+        assert res.content == b"" and res.headers["etag"] == first_etag
+
+        user_data_in["username"] = "something else"
+        res = await ac.put(update_url, json=user_data_in, headers={"If-Match": '"0"'})
+        assert res.status_code == HTTPStatus.PRECONDITION_FAILED
+        res = await ac.put(update_url, json=user_data_in, headers={"If-Match": first_etag})
+        assert res.status_code == HTTPStatus.OK
+
+        res = await ac.get(my_user_page_url, headers={"If-None-Match": first_etag})
+        assert res.status_code == HTTPStatus.OK
+        assert res.json()["username"] == "something else"
+        second_etag = res.headers["etag"]
+        assert second_etag != first_etag
+
+        res = await ac.delete(delete_url, headers={"If-Match": first_etag})
+        assert res.status_code == HTTPStatus.PRECONDITION_FAILED
+        res = await ac.delete(delete_url, headers={"If-Match": second_etag})
+        assert res.status_code == HTTPStatus.OK
+
+
+@pytest.mark.asyncio
+async def test_cached_page_never_older_than_its_etag(
+    test_app: FastAPI,
+    user_data_in: dict,
+    uow: AbstractUnitOfWork,
+    hashing_service: PasswordHashingService,
+):
+    enduser_headers, new_user_id = await create_user_and_login(app=test_app, user_data_in=user_data_in)
+    my_user_page_url = test_app.url_path_for("my_user_page", user_id=new_user_id)
+    async with httpx.AsyncClient(app=test_app, base_url=settings.test_url, headers=enduser_headers) as ac:
+        res = await ac.get(my_user_page_url)  # primes the cache
+        first_etag = res.headers["etag"]
+
+        # changed as another process would, nothing evicts this process' entry
+        cmd = commands.UpdateUser(id=UUID(new_user_id), username="changed elsewhere")
+        await handlers.update_user(cmd, uow=uow, hasher=hashing_service)
+
+        res = await ac.get(my_user_page_url, headers={"If-None-Match": first_etag})
+        assert res.status_code == HTTPStatus.OK
+        assert res.headers["etag"] != first_etag
+        assert res.json()["username"] == "changed elsewhere"
+
+
+@pytest.mark.asyncio
+async def test_logout_and_revoke_sessions(
+    test_app: FastAPI,
+    user_data_in: dict,
+):
+    user_id = await e2e.create_test_user(app=test_app, user_data_in=user_data_in)
+    my_user_page_url = test_app.url_path_for("my_user_page", user_id=user_id)
+    refresh_url = test_app.url_path_for("refresh")
+
+    async def login() -> tuple[dict, str]:
+        res = await e2e.test_user_login(app=test_app, username=user_data_in["email"], password=user_data_in["password"])
+        return {"Authorization": f"Bearer {res['token']}"}, res["refresh_token"]
+
+    headers, refresh_token = await login()
+    async with httpx.AsyncClient(app=test_app, base_url=settings.test_url) as ac:
+        assert (await ac.get(my_user_page_url, headers=headers)).status_code == HTTPStatus.OK
+        res = await ac.post(
+            test_app.url_path_for("logout", user_id=user_id), json={"refresh_token": refresh_token}, headers=headers
+        )
+        assert res.status_code == HTTPStatus.OK
+        assert (await ac.get(my_user_page_url, headers=headers)).status_code == HTTPStatus.UNAUTHORIZED
+        res = await ac.post(refresh_url, json={"grant_type": "refresh_token", "refresh_token": refresh_token})
+        assert res.status_code == HTTPStatus.UNAUTHORIZED
+
+        headers, refresh_token = await login()
+        res = await ac.delete(test_app.url_path_for("revoke_sessions", user_id=user_id), headers=headers)
+        assert res.status_code == HTTPStatus.OK
+        assert (await ac.get(my_user_page_url, headers=headers)).status_code == HTTPStatus.UNAUTHORIZED
+        res = await ac.post(refresh_url, json={"grant_type": "refresh_token", "refresh_token": refresh_token})
+        assert res.status_code == HTTPStatus.UNAUTHORIZED
+
+        # logging straight back in, within the same second, gets a token that works
+        headers, refresh_token = await login()
+        assert (await ac.get(my_user_page_url, headers=headers)).status_code == HTTPStatus.OK
+
+
+@pytest.mark.asyncio
+async def test_login_throttle(
+    test_app: FastAPI,
+    user_data_in: dict,
+):
+    await e2e.create_test_user(app=test_app, user_data_in=user_data_in)
+    login_url = test_app.url_path_for("login")
+
+    async def login(password: str) -> httpx.Response:
+        async with httpx.AsyncClient(app=test_app, base_url=settings.test_url) as ac:
+            return await ac.post(login_url, data={"username": user_data_in["email"], "password": password})
+
+    # a successful login forgives the typos before it
+    assert [(await login("wrong")).status_code for _ in range(4)] == [HTTPStatus.UNAUTHORIZED] * 4
+    assert (await login(user_data_in["password"])).status_code == HTTPStatus.OK
+
+    assert [(await login("wrong")).status_code for _ in range(5)] == [HTTPStatus.UNAUTHORIZED] * 5
+    res = await login(user_data_in["password"])
+    assert res.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert int(res.headers["retry-after"]) >= 1
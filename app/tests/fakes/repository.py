@@ -2,7 +2,7 @@ from typing import Any, Generic, Type
 from uuid import UUID
 
 from app.adapters.repository import AbstractRepository, ModelType
-from app.domain import models
+from app.domain import enums, models
 
 
 class FakeRepository(Generic[ModelType], AbstractRepository):
@@ -20,7 +20,7 @@ class FakeRepository(Generic[ModelType], AbstractRepository):
             self.session[item.id] = item  # type: ignore
             self.seen.add(item)
 
-    async def _get(self, ident: UUID):
+    async def _get(self, ident: UUID, profile: str | None = None, **params: Any):
         return self.session.get(ident)
 
     async def _remove(self, ident: UUID):
@@ -29,7 +29,7 @@ class FakeRepository(Generic[ModelType], AbstractRepository):
             del self.session[ident]
         return
 
-    async def _list(self, filters: dict[str, Any] | None = None, *args):
+    async def _list(self, *args, **kwargs):
         # customise for each individual repository
         return list(self.session.values())
 
@@ -39,6 +39,7 @@ class FakeUserRepository(FakeRepository[models.Users]):
         super(FakeUserRepository, self).__init__(models.Users)
 
     async def _list(self, *args, **kwargs):
+        kwargs.pop("profile", None)
         everything: list[models.Users] = list(self.session.values())
         if not args and not kwargs:
             return everything
@@ -54,6 +55,13 @@ class FakeUserRepository(FakeRepository[models.Users]):
                     everything = [x for x in everything if getattr(self.model, column) == val]
             return out
 
+    async def get_active_by_email(self, email: str, profile: str | None = "credentials"):
+        for user in self.session.values():
+            if user.email.lower() == email.lower() and user.user_status == enums.RecordStatusEnum.ACTIVE:
+                self.seen.add(user)
+                return user
+        return None
+
 
 class FakeBugRepository(FakeRepository[models.Bugs]):
     def __init__(self):
@@ -64,6 +72,6 @@ class FakeEventStoreRepository(FakeRepository[models.EventStore]):
     def __init__(self):
         super(FakeEventStoreRepository, self).__init__(models.EventStore)
 
-    async def _get(self, ident: UUID):
+    async def _get(self, ident: UUID, profile: str | None = None, **params: Any):
         everything: list[models.EventStore] = list(self.session.values())
         return [x for x in everything if x.aggregate_id == ident]
@@ -34,4 +34,6 @@ class FakeUnitOfWork(AbstractUnitOfWork):
         objs.extend(list(self.users.seen))
         for obj in objs:
             while obj.events:
-                yield obj.events.popleft()
+                yield obj.id, obj.events.popleft()
+        while self.published:
+            yield self.published.pop(0)
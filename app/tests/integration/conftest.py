@@ -3,10 +3,13 @@
 from uuid import UUID
 
 import pytest_asyncio
-from argon2 import PasswordHasher
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
 
+from app.common.settings import settings
 from app.service.bugs import commands as bug_commands
 from app.service.bugs import handlers as bug_handlers
+from app.service.hashing import PasswordHashingService
 from app.service.unit_of_work import AbstractUnitOfWork
 from app.service.users import commands as user_commands
 from app.service.users import handlers as user_handlers
@@ -16,10 +19,10 @@ from app.service.users import handlers as user_handlers
 async def create_user_id(
     uow: AbstractUnitOfWork,
     user_data_in: dict,
-    password_hasher: PasswordHasher,
+    hashing_service: PasswordHashingService,
 ) -> UUID:
     cmd = user_commands.CreateUser(**user_data_in)
-    user_id = await user_handlers.create_user(cmd, uow=uow, hasher=password_hasher)
+    user_id = await user_handlers.create_user(cmd, uow=uow, hasher=hashing_service)
     assert user_id
     return user_id
 
@@ -36,3 +39,11 @@ async def create_bug_id(
     bug_id = await bug_handlers.create_bug(cmd, uow=uow)
     assert bug_id
     return bug_id, create_user_id
+
+
+@pytest_asyncio.fixture
+async def pooled_session_factory():
+    # a connection per session for concurrency tests, session_factory shares one connection for the whole test
+    engine = create_async_engine(settings.db_settings.test_url, future=True, pool_size=20, max_overflow=0)
+    yield sessionmaker(engine, expire_on_commit=False, autoflush=False, class_=AsyncSession)
+    await engine.dispose()
@@ -1,12 +1,11 @@
-from uuid import UUID
+from uuid import UUID, uuid4
 
 import pytest
 
 # from app.domain import enums
 from app.domain.models import Bugs, EventStore
+from app.service import exceptions as service_exc
 from app.service.bugs import commands, handlers
-
-# from app.service import exceptions as service_exc
 from app.service.unit_of_work import AbstractUnitOfWork
 
 
@@ -131,3 +130,42 @@ async def test_delete_comment_handler(
         assert len(found_bugs[0].comments) == 0
         assert found_events, len(found_events) == 3
         assert found_events[2].event_name == "CommentDeleted"
+
+
+@pytest.mark.asyncio
+async def test_comment_handlers_only_touch_their_comment(
+    uow: AbstractUnitOfWork,
+    bug_data_in: dict,
+    create_bug_id: tuple[UUID, UUID],
+):
+    bug_id, user_id = create_bug_id
+    comment_ids = [
+        await handlers.create_comment(commands.CreateComment(bug_id=bug_id, author_id=user_id, text=f"#{i}"), uow=uow)
+        for i in range(3)
+    ]
+    await handlers.update_comment(
+        commands.UpdateComment(id=comment_ids[1], bug_id=bug_id, author_id=user_id, text="edited"), uow=uow
+    )
+    await handlers.delete_comment(commands.DeleteComment(id=comment_ids[0], bug_id=bug_id, author_id=user_id), uow=uow)
+
+    # the comment has to be the bug's and the author's
+    with pytest.raises(service_exc.ItemNotFound):
+        await handlers.update_comment(
+            commands.UpdateComment(id=comment_ids[0], bug_id=bug_id, author_id=user_id, text="gone"), uow=uow
+        )
+    other_bug_id = await handlers.create_bug(commands.CreateBug(**bug_data_in), uow=uow)
+    with pytest.raises(service_exc.ItemNotFound):
+        await handlers.delete_comment(
+            commands.DeleteComment(id=comment_ids[2], bug_id=other_bug_id, author_id=user_id), uow=uow
+        )
+    with pytest.raises(service_exc.Forbidden):
+        await handlers.delete_comment(
+            commands.DeleteComment(id=comment_ids[2], bug_id=bug_id, author_id=uuid4()), uow=uow
+        )
+
+    async with uow:
+        bug: Bugs = await uow.bugs.get(bug_id, profile="comments")
+        assert {(c.id, c.text, c.edited) for c in bug.comments} == {
+            (comment_ids[1], "edited", True),
+            (comment_ids[2], "#2", False),
+        }
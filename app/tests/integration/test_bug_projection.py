@@ -0,0 +1,154 @@
+from typing import Any
+from uuid import UUID
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.adapters.orm import bugs_read_model
+from app.domain.enums import BugStatusEnum, EnvironmentEnum, RecordStatusEnum, UrgencyEnum
+from app.domain.read_models import CommentReadModel
+from app.service.bugs import commands as bug_commands
+from app.service.bugs import handlers as bug_handlers
+from app.service.bugs import views
+from app.service.hashing import PasswordHashingService
+from app.service.projections.bugs import BugReadModelProjector
+from app.service.projections.replay import Replayer
+from app.service.projections.runner import ProjectionRunner
+from app.service.unit_of_work import AbstractUnitOfWork
+from app.service.users import commands as user_commands
+from app.service.users import handlers as user_handlers
+
+
+async def make_bugs(
+    uow: AbstractUnitOfWork,
+    user_id: UUID,
+    user_data_in: dict,
+    bug_data_in: dict,
+    hasher: PasswordHashingService,
+) -> tuple[UUID, list[UUID]]:
+    other = {**user_data_in, "username": "assignee", "email": "assignee@example.com"}
+    assignee_id = await user_handlers.create_user(user_commands.CreateUser(**other), uow=uow, hasher=hasher)
+    bug: dict[str, Any] = {
+        **bug_data_in,
+        "author_id": user_id,
+        "assignee_id": None,
+        "environment": EnvironmentEnum.PROD,
+        "urgency": UrgencyEnum.LOW,
+        "status": BugStatusEnum.NEW,
+        "record_status": RecordStatusEnum.ACTIVE,
+    }
+    bug_ids = []
+    for i, urgency in enumerate([UrgencyEnum.LOW, UrgencyEnum.HIGH, UrgencyEnum.HIGH, UrgencyEnum.LOW]):
+        cmd = bug_commands.CreateBug(**{**bug, "title": f"bug {i}", "urgency": urgency})
+        bug_ids.append(await bug_handlers.create_bug(cmd, uow=uow))
+    await bug_handlers.update_bug(
+        bug_commands.UpdateBug(
+            **{**bug, "id": bug_ids[1], "title": "bug 1", "urgency": UrgencyEnum.HIGH, "assignee_id": assignee_id}
+        ),
+        uow=uow,
+    )
+    await bug_handlers.update_bug(
+        bug_commands.UpdateBug(
+            **{**bug, "id": bug_ids[2], "title": "bug 2", "urgency": UrgencyEnum.HIGH, "status": BugStatusEnum.RESOLVED}
+        ),
+        uow=uow,
+    )
+    await bug_handlers.soft_delete_bug(bug_commands.SoftDeleteBug(id=bug_ids[3], author_id=user_id), uow=uow)
+    await user_handlers.update_user(
+        user_commands.UpdateUser(**{**other, "id": assignee_id, "username": "renamed"}), uow=uow, hasher=hasher
+    )
+    return assignee_id, bug_ids
+
+
+async def read_model(uow: AbstractUnitOfWork) -> dict[UUID, dict]:
+    async with uow:
+        execution = await uow.session.execute(sa.select(bugs_read_model))
+        return {row.bug_id: dict(row._mapping) for row in execution.all()}
+
+
+@pytest.mark.asyncio
+async def test_bug_read_model_projection(
+    uow: AbstractUnitOfWork,
+    create_user_id: UUID,
+    user_data_in: dict,
+    bug_data_in: dict,
+    hashing_service: PasswordHashingService,
+    pooled_session_factory,
+):
+    assignee_id, bug_ids = await make_bugs(uow, create_user_id, user_data_in, bug_data_in, hashing_service)
+    runner = ProjectionRunner([BugReadModelProjector()], pooled_session_factory)
+    await runner.catch_up(runner.projectors[0])
+
+    rows = await read_model(uow)
+    assert set(rows) == set(bug_ids)
+    assert {row["author_username"] for row in rows.values()} == {user_data_in["username"]}
+    assert rows[bug_ids[1]]["assigned_user_id"] == assignee_id
+    assert rows[bug_ids[1]]["assignee_username"] == "renamed"
+    assert rows[bug_ids[0]]["assignee_username"] is None
+    assert rows[bug_ids[2]]["status"] == BugStatusEnum.RESOLVED.value
+    assert rows[bug_ids[3]]["record_status"] == RecordStatusEnum.DELETED.value
+    assert rows[bug_ids[3]]["version"] == 2
+
+    # a replay ends up with exactly the same rows
+    await Replayer(BugReadModelProjector(), pooled_session_factory, workers=0).run()
+    assert await read_model(uow) == rows
+
+
+@pytest.mark.asyncio
+async def test_bug_views_read_one_table(
+    uow: AbstractUnitOfWork,
+    async_engine: AsyncEngine,
+    create_user_id: UUID,
+    user_data_in: dict,
+    bug_data_in: dict,
+    hashing_service: PasswordHashingService,
+    pooled_session_factory,
+):
+    assignee_id, bug_ids = await make_bugs(uow, create_user_id, user_data_in, bug_data_in, hashing_service)
+    runner = ProjectionRunner([BugReadModelProjector()], pooled_session_factory)
+    await runner.catch_up(runner.projectors[0])
+
+    statements: list[str] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        async with uow:
+            first = await views.get_bugs_list(uow.session, {"urgency": UrgencyEnum.HIGH}, None, count_per_page=1)
+            second = await views.get_bugs_list(uow.session, {"urgency": UrgencyEnum.HIGH}, first.next, count_per_page=1)
+            assigned = await views.get_bugs_list(uow.session, {"assignee": assignee_id}, None)
+            searched = await views.get_bugs_list(uow.session, {"title": "BUG 0"}, None)
+            dashboard = await views.get_bugs_dashboard(uow.session)
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", capture)
+
+    assert [bug.bug_id for bug in first.items + second.items] == [bug_ids[2], bug_ids[1]]
+    assert second.next is None
+    assert [bug.assignee_username for bug in assigned.items] == ["renamed"]
+    assert [bug.bug_id for bug in searched.items] == [bug_ids[0]]
+    assert dashboard == {"new": {"low": 1, "high": 1}, "resolved": {"high": 1}}
+    selects = [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+    assert len(selects) == 5
+    assert not any("JOIN" in s.upper() for s in selects)
+
+
+@pytest.mark.asyncio
+async def test_bug_comments_page(uow: AbstractUnitOfWork, create_bug_id: tuple[UUID, UUID], user_data_in: dict):
+    bug_id, user_id = create_bug_id
+    comment_ids = []
+    for i in range(3):
+        cmd = bug_commands.CreateComment(bug_id=bug_id, author_id=user_id, text=f"comment {i}")
+        comment_ids.append(await bug_handlers.create_comment(cmd, uow=uow))
+
+    async with uow:
+        first = await views.get_bug_comments(uow.session, bug_id, None, count_per_page=2)
+        second = await views.get_bug_comments(uow.session, bug_id, first.next, count_per_page=2)
+    assert [comment.comment_id for comment in first.items + second.items] == comment_ids
+    assert second.next is None
+    comment = second.items[0]
+    assert isinstance(comment, CommentReadModel) and not hasattr(comment, "__dict__")
+    assert (comment.text, comment.user_id, comment.username) == ("comment 2", user_id, user_data_in["username"])
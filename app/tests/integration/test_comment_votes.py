@@ -0,0 +1,107 @@
+import asyncio
+from uuid import UUID, uuid4
+
+import pytest
+import pytest_asyncio
+import sqlalchemy as sa
+
+from app.adapters.orm import comments, event_store, users, votes
+from app.service import exceptions as service_exc
+from app.service.bugs import commands, handlers
+from app.service.bugs.votes import CommentVoteBuffer
+from app.service.unit_of_work import AbstractUnitOfWork, SqlAlchemyUnitOfWork
+
+
+@pytest_asyncio.fixture
+async def comment_id(uow: AbstractUnitOfWork, create_bug_id: tuple[UUID, UUID]) -> UUID:
+    bug_id, user_id = create_bug_id
+    cmd = commands.CreateComment(bug_id=bug_id, author_id=user_id, text="vote on me")
+    return await handlers.create_comment(cmd, uow=uow)
+
+
+async def create_voters(uow: AbstractUnitOfWork, count: int) -> list[UUID]:
+    ids = [uuid4() for _ in range(count)]
+    async with uow:
+        await uow.session.execute(
+            sa.insert(users),
+            [
+                {
+                    "id": ident,
+                    "username": f"voter{i}",
+                    "email": f"voter{i}@example.com",
+                    "password": "not a real hash",
+                    "user_type": "backend",
+                    "user_status": "active",
+                    "is_admin": False,
+                    "security_question": "?",
+                    "security_question_answer": "!",
+                }
+                for i, ident in enumerate(ids)
+            ],
+        )
+        await uow.commit()
+    return ids
+
+
+async def read_vote_count(uow: AbstractUnitOfWork, comment_id: UUID) -> int:
+    async with uow:
+        execution = await uow.session.execute(sa.select(comments.c.vote_count).where(comments.c.id == comment_id))
+        return execution.scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_votes_are_not_lost(uow: AbstractUnitOfWork, comment_id: UUID, pooled_session_factory):
+    voters = await create_voters(uow, 200)
+    upvoters, downvoters = voters[:150], voters[150:]
+    cmds: list[commands.Upvote | commands.Downvote] = [
+        *[commands.Upvote(id=comment_id, user_id=ident) for ident in upvoters],
+        *[commands.Downvote(id=comment_id, user_id=ident) for ident in downvoters],
+        *[commands.Upvote(id=comment_id, user_id=ident) for ident in upvoters[:20]],  # repeats don't count
+    ]
+
+    await asyncio.gather(
+        *[handlers.upvote_downvote_comment(cmd, uow=SqlAlchemyUnitOfWork(pooled_session_factory)) for cmd in cmds]
+    )
+
+    assert await read_vote_count(uow, comment_id) == 100
+    async with uow:
+        vote_rows = await uow.session.execute(sa.select(sa.func.count()).select_from(votes))
+        assert vote_rows.scalar_one() == 200
+        vote_events = await uow.session.execute(
+            sa.select(sa.func.count())
+            .select_from(event_store)
+            .where(event_store.c.event_name.in_(["Upvoted", "Downvoted"]))
+        )
+        assert vote_events.scalar_one() == 200
+
+
+@pytest.mark.asyncio
+async def test_flipping_a_vote(uow: AbstractUnitOfWork, comment_id: UUID):
+    (voter,) = await create_voters(uow, 1)
+    await handlers.upvote_downvote_comment(commands.Upvote(id=comment_id, user_id=voter), uow=uow)
+    assert await read_vote_count(uow, comment_id) == 1
+    await handlers.upvote_downvote_comment(commands.Downvote(id=comment_id, user_id=voter), uow=uow)
+    assert await read_vote_count(uow, comment_id) == -1
+
+    with pytest.raises(service_exc.ItemNotFound):
+        await handlers.upvote_downvote_comment(commands.Upvote(id=uuid4(), user_id=voter), uow=uow)
+
+
+@pytest.mark.asyncio
+async def test_vote_buffer_coalesces_votes(uow: AbstractUnitOfWork, comment_id: UUID, pooled_session_factory):
+    voters = await create_voters(uow, 50)
+    buffer = CommentVoteBuffer(uow=SqlAlchemyUnitOfWork(pooled_session_factory))
+    await asyncio.gather(
+        *[
+            handlers.upvote_downvote_comment(
+                commands.Upvote(id=comment_id, user_id=ident),
+                uow=SqlAlchemyUnitOfWork(pooled_session_factory),
+                vote_buffer=buffer,
+            )
+            for ident in voters
+        ]
+    )
+    assert await read_vote_count(uow, comment_id) == 0  # nothing applied until the flush
+    assert buffer.pending[comment_id] == 50
+    assert await buffer.flush() == 1
+    assert await read_vote_count(uow, comment_id) == 50
@@ -0,0 +1,77 @@
+from uuid import UUID, uuid4
+
+import pytest
+import sqlalchemy as sa
+
+from app.adapters.orm import event_store
+from app.domain.enums import BugStatusEnum, UrgencyEnum
+from app.domain.models import Bugs
+from app.service.bugs import commands, handlers
+from app.service.event_store.deltas import compact_update_events
+from app.service.unit_of_work import AbstractUnitOfWork
+
+
+async def load(uow: AbstractUnitOfWork, ident: UUID) -> dict:
+    async with uow:
+        uow.event_store.snapshot_every = 0  # type: ignore
+        bug: Bugs = await uow.event_store.load(Bugs, ident)  # type: ignore
+        return bug.snapshot()
+
+
+async def updates(uow: AbstractUnitOfWork, ident: UUID) -> list[dict]:
+    async with uow:
+        execution = await uow.session.execute(
+            sa.select(event_store.c.event_data)
+            .where(event_store.c.aggregate_id == ident, event_store.c.event_name == "BugUpdated")
+            .order_by(event_store.c.seq)
+        )
+        return execution.scalars().all()
+
+
+@pytest.mark.asyncio
+async def test_updates_store_changes_and_old_rows_compact(
+    uow: AbstractUnitOfWork,
+    create_bug_id: tuple[UUID, UUID],
+    bug_data_in: dict,
+    pooled_session_factory,
+):
+    bug_id, _ = create_bug_id
+    update = {**bug_data_in, "id": bug_id, "status": BugStatusEnum.IN_PROGRESS}
+    other_urgency = UrgencyEnum.LOW if bug_data_in["urgency"] == UrgencyEnum.HIGH else UrgencyEnum.HIGH
+    await handlers.update_bug(commands.UpdateBug(**update), uow=uow)
+    assert await updates(uow, bug_id) == [{"id": str(bug_id), "status": "in_progress", "version": 2, "edited": True}]
+
+    # the way updates were written before, every field every time
+    full: dict = {**commands.UpdateBug(**update).dict(), "id": str(bug_id), "author_id": str(bug_data_in["author_id"])}
+    full["edited"] = True
+    async with uow:
+        await uow.session.execute(
+            sa.insert(event_store),
+            [
+                {
+                    "id": uuid4(),
+                    "aggregate_id": bug_id,
+                    "event_name": "BugUpdated",
+                    "event_data": {**full, "urgency": other_urgency, "version": 3},
+                },
+                {
+                    "id": uuid4(),
+                    "aggregate_id": bug_id,
+                    "event_name": "BugUpdated",
+                    "event_data": {**full, "urgency": other_urgency, "title": "renamed", "version": 4},
+                },
+            ],
+        )
+        await uow.commit()
+    before = await load(uow, bug_id)
+
+    report = await compact_update_events(pooled_session_factory, batch_size=1)
+    assert report.rewritten == 2 and report.bytes_after < report.bytes_before / 2
+    assert await updates(uow, bug_id) == [
+        {"id": str(bug_id), "status": "in_progress", "version": 2, "edited": True},
+        {"id": str(bug_id), "urgency": other_urgency.value, "version": 3},
+        {"id": str(bug_id), "title": "renamed", "version": 4},
+    ]
+    assert await load(uow, bug_id) == before
+
+    assert (await compact_update_events(pooled_session_factory)).rewritten == 0
@@ -0,0 +1,136 @@
+import os
+from datetime import timedelta
+from pathlib import Path
+from typing import Any
+from uuid import UUID
+
+import pytest
+import sqlalchemy as sa
+
+from app.adapters.orm import (
+    bugs_read_model,
+    event_archive,
+    event_store,
+    projection_bug_state,
+    projection_comment_state,
+    user_read_model,
+)
+from app.common.settings import ArchiveEnum
+from app.domain.enums import BugStatusEnum
+from app.domain.models import Bugs, Users
+from app.service.bugs import commands as bug_commands
+from app.service.bugs import handlers as bug_handlers
+from app.service.event_store.compaction import EventStoreCompactor, read_archive_file, unpack_events
+from app.service.hashing import PasswordHashingService
+from app.service.projections.bugs import BugReadModelProjector
+from app.service.projections.replay import Replayer
+from app.service.projections.runner import ProjectionRunner
+from app.service.projections.users import UserReadModelProjector
+from app.service.unit_of_work import AbstractUnitOfWork
+from app.service.users import commands as user_commands
+from app.service.users import handlers as user_handlers
+
+READ_MODELS = (bugs_read_model, user_read_model, projection_bug_state, projection_comment_state)
+
+
+async def stream(uow: AbstractUnitOfWork, ident: UUID) -> list[str]:
+    async with uow:
+        execution = await uow.session.execute(
+            sa.select(event_store.c.event_name).where(event_store.c.aggregate_id == ident).order_by(event_store.c.seq)
+        )
+        return execution.scalars().all()
+
+
+async def load(uow: AbstractUnitOfWork, aggregate_type: type, ident: UUID) -> dict:
+    async with uow:
+        uow.event_store.snapshot_every = 0  # type: ignore
+        aggregate = await uow.event_store.load(aggregate_type, ident)  # type: ignore
+        return aggregate.snapshot()
+
+
+async def project(uow: AbstractUnitOfWork, pooled_session_factory, user_data_in: dict, hasher, suffix: str):
+    runner = ProjectionRunner([UserReadModelProjector(), BugReadModelProjector()], pooled_session_factory)
+    for projector in runner.projectors:
+        await runner.catch_up(projector)
+    # only events every projection has moved past get compacted, so one more for them to move past
+    other = {**user_data_in, "username": f"bystander{suffix}", "email": f"bystander{suffix}@example.com"}
+    await user_handlers.create_user(user_commands.CreateUser(**other), uow=uow, hasher=hasher)
+    for projector in runner.projectors:
+        await runner.catch_up(projector)
+
+
+async def replayed(uow: AbstractUnitOfWork, pooled_session_factory) -> dict[str, list[dict[str, Any]]]:
+    for projector in (UserReadModelProjector(), BugReadModelProjector()):
+        await Replayer(projector, pooled_session_factory, workers=0).run()
+    async with uow:
+        rows = {}
+        for table in READ_MODELS:
+            execution = await uow.session.execute(sa.select(table).order_by(*table.primary_key.columns))
+            # update_dt is when the replay recounted
+            rows[table.name] = [{k: v for k, v in row._mapping.items() if k != "update_dt"} for row in execution.all()]
+        return rows
+
+
+@pytest.mark.asyncio
+async def test_idle_aggregates_compact_into_one_row(
+    uow: AbstractUnitOfWork,
+    create_bug_id: tuple[UUID, UUID],
+    bug_data_in: dict,
+    user_data_in: dict,
+    hashing_service: PasswordHashingService,
+    pooled_session_factory,
+    tmp_path: Path,
+):
+    bug_id, user_id = create_bug_id
+    await bug_handlers.update_bug(
+        bug_commands.UpdateBug(**{**bug_data_in, "id": bug_id, "status": BugStatusEnum.IN_PROGRESS}), uow=uow
+    )
+    comment_id = await bug_handlers.create_comment(
+        bug_commands.CreateComment(bug_id=bug_id, author_id=user_id, text="seen it too"), uow=uow
+    )
+    await bug_handlers.upvote_downvote_comment(bug_commands.Upvote(id=comment_id, user_id=user_id), uow=uow)
+    await user_handlers.update_user(
+        user_commands.UpdateUser(**{**user_data_in, "id": user_id, "username": "renamed"}),
+        uow=uow,
+        hasher=hashing_service,
+    )
+    await project(uow, pooled_session_factory, user_data_in, hashing_service, "1")
+    bug_events, user_events = await stream(uow, bug_id), await stream(uow, user_id)
+    bug, user = await load(uow, Bugs, bug_id), await load(uow, Users, user_id)
+    read_models = await replayed(uow, pooled_session_factory)
+
+    # nothing is idle for a day yet
+    assert (await EventStoreCompactor(pooled_session_factory, idle=timedelta(days=1)).run_once()).aggregates == 0
+
+    compactor = EventStoreCompactor(
+        pooled_session_factory, idle=timedelta(0), archive=ArchiveEnum.FILE, archive_dir=str(tmp_path)
+    )
+    report = await compactor.run_once()
+    assert (report.aggregates, report.events) == (2, len(bug_events) + len(user_events) - 2)
+    assert report.bytes_reclaimed > 0 and report.bytes_archived > 0
+    assert await stream(uow, bug_id) == await stream(uow, user_id) == ["AggregateCompacted"]
+    assert await load(uow, Bugs, bug_id) == bug
+    assert await load(uow, Users, user_id) == user
+    assert await replayed(uow, pooled_session_factory) == read_models
+
+    [path] = os.listdir(tmp_path)
+    archived = dict(read_archive_file(str(tmp_path / path)))
+    assert [event["event_name"] for event in archived[bug_id]] == bug_events
+    assert [event["event_name"] for event in archived[user_id]] == user_events
+    assert (await compactor.run_once()).aggregates == 0
+
+    # a compacted aggregate carries on and compacts again
+    await bug_handlers.update_bug(
+        bug_commands.UpdateBug(**{**bug_data_in, "id": bug_id, "status": BugStatusEnum.RESOLVED}), uow=uow
+    )
+    await project(uow, pooled_session_factory, user_data_in, hashing_service, "2")
+    bug = await load(uow, Bugs, bug_id)
+    assert bug["version"] == 3 and bug["status"] == BugStatusEnum.RESOLVED.value
+    report = await EventStoreCompactor(pooled_session_factory, idle=timedelta(0), archive=ArchiveEnum.TABLE).run_once()
+    assert (report.aggregates, report.events) == (1, 1)
+    assert await load(uow, Bugs, bug_id) == bug
+    async with uow:
+        execution = await uow.session.execute(sa.select(event_archive).where(event_archive.c.aggregate_id == bug_id))
+        row = execution.one()
+    assert row.event_count == 2
+    assert [event["event_name"] for event in unpack_events(row.payload)] == ["AggregateCompacted", "BugUpdated"]
@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta, timezone
+from uuid import UUID, uuid4
+
+import pytest
+import sqlalchemy as sa
+
+from app.adapters.orm import event_store
+from app.service.bugs import commands, handlers
+from app.service.event_store import partitions
+from app.service.unit_of_work import AbstractUnitOfWork
+
+NOW = datetime.now(timezone.utc)
+LAST_YEAR = partitions.add_months(partitions.month_start(NOW), -12)
+
+
+async def partition_of(uow: AbstractUnitOfWork, event_name: str) -> list[str]:
+    execution = await uow.session.execute(
+        sa.select(sa.literal_column("tableoid::regclass::text"))
+        .select_from(event_store)
+        .where(event_store.c.event_name == event_name)
+    )
+    return execution.scalars().all()
+
+
+@pytest.mark.asyncio
+async def test_partitions_and_search(
+    uow: AbstractUnitOfWork,
+    bug_data_in: dict,
+    create_bug_id: tuple[UUID, UUID],
+):
+    bug_id, user_id = create_bug_id
+    assignee_id = user_id
+    await handlers.update_bug(
+        commands.UpdateBug(**{**bug_data_in, "id": bug_id, "title": "reassigned", "assignee_id": assignee_id}),
+        uow=uow,
+    )
+    async with uow:
+        # an old event nobody made a partition for
+        await uow.session.execute(
+            sa.insert(event_store).values(
+                id=uuid4(),
+                create_dt=LAST_YEAR + timedelta(days=3),
+                aggregate_id=bug_id,
+                event_name="BugSoftDeleted",
+                event_data={"id": str(bug_id)},
+            )
+        )
+        await uow.commit()
+
+    async with uow:
+        assert set(await partition_of(uow, "BugCreated")) == {partitions.DEFAULT_PARTITION}
+        created = await partitions.ensure_partitions(uow.session, ahead=1)
+        assert created == [
+            partitions.partition_name(partitions.month_start(NOW)),
+            partitions.partition_name(partitions.add_months(partitions.month_start(NOW), 1)),
+        ]
+        assert await partitions.ensure_partitions(uow.session, ahead=1) == []
+        await partitions.create_partition(uow.session, LAST_YEAR)
+        await uow.commit()
+
+    async with uow:
+        # rows that were sitting in the default partition moved into their month's
+        assert await partition_of(uow, "BugCreated") == [created[0]]
+        assert await partition_of(uow, "BugSoftDeleted") == [partitions.partition_name(LAST_YEAR)]
+
+        page = await uow.event_store.search(  # type: ignore
+            event_names=["BugUpdated"], since=partitions.month_start(NOW), payload={"assignee_id": assignee_id}
+        )
+        assert [(event.aggregate_id, event.event_name) for event in page.items] == [(bug_id, "BugUpdated")]
+        assert (await uow.event_store.search(payload={"assignee_id": uuid4()})).items == []  # type: ignore
+
+        # a month's range only scans that month's partition
+        execution = await uow.session.execute(
+            sa.text(
+                f"EXPLAIN SELECT * FROM {event_store.name} "
+                "WHERE create_dt >= :since AND create_dt < :until AND event_data @> :payload"
+            ),
+            {
+                "since": LAST_YEAR,
+                "until": partitions.add_months(LAST_YEAR, 1),
+                "payload": f'{{"id": "{bug_id}"}}',
+            },
+        )
+        plan = "\n".join(execution.scalars().all())
+        assert partitions.partition_name(LAST_YEAR) in plan
+        assert created[0] not in plan and partitions.DEFAULT_PARTITION not in plan
+
+        page = await uow.event_store.search(aggregate_id=bug_id, count_per_page=2)  # type: ignore
+        assert [event.event_name for event in page.items] == ["BugSoftDeleted", "BugCreated"]
+        rest = await uow.event_store.search(aggregate_id=bug_id, cursor=page.next)  # type: ignore
+        assert [event.event_name for event in rest.items] == ["BugUpdated"]
+
+        detached = await partitions.detach_partitions(uow.session, before=partitions.month_start(NOW))
+        assert detached == [partitions.partition_name(LAST_YEAR)]
+        assert (await uow.event_store.search(event_names=["BugSoftDeleted"])).items == []  # type: ignore
+        await uow.session.execute(sa.text(f"DROP TABLE {detached[0]}"))
+        await uow.commit()
@@ -0,0 +1,80 @@
+import asyncio
+from uuid import UUID, uuid4
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.adapters.orm import event_store
+from app.domain.models import Bugs
+from app.service.bugs import events
+from app.service.event_store.writer import GroupCommitAppender, event_rows
+from app.service.unit_of_work import AbstractUnitOfWork
+
+
+@pytest.mark.asyncio
+async def test_every_pending_event_in_one_insert(
+    uow: AbstractUnitOfWork,
+    async_engine: AsyncEngine,
+    create_bug_id: tuple[UUID, UUID],
+):
+    bug_id, user_id = create_bug_id
+    statements: list[str] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        async with uow:
+            bug: Bugs = await uow.bugs.get(bug_id, profile="comments")
+            bug.delete_bug()
+            bug.add_comment({"bug_id": bug_id, "author_id": user_id, "text": "first"})
+            bug.add_comment({"bug_id": bug_id, "author_id": user_id, "text": "second"})
+            await uow.commit()
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", capture)
+
+    inserts = [s for s in statements if s.lstrip().upper().startswith(f"INSERT INTO {event_store.name.upper()}")]
+    assert len(inserts) == 1
+    async with uow:
+        execution = await uow.session.execute(
+            sa.select(event_store.c.event_name).where(event_store.c.aggregate_id == bug_id).order_by(event_store.c.seq)
+        )
+        assert execution.scalars().all() == ["BugCreated", "BugSoftDeleted", "CommentCreated", "CommentCreated"]
+
+
+@pytest.mark.asyncio
+async def test_group_commit_coalesces_concurrent_appends(uow: AbstractUnitOfWork, pooled_session_factory):
+    flushes = 0
+
+    def counting_factory():
+        nonlocal flushes
+        flushes += 1
+        return pooled_session_factory()
+
+    appender = GroupCommitAppender(counting_factory, window=0.05)  # type: ignore
+    aggregate_ids = [uuid4() for _ in range(20)]
+    await asyncio.gather(
+        *[appender.append(event_rows([(ident, events.BugSoftDeleted(id=ident))] * 2)) for ident in aggregate_ids]
+    )
+    await appender.stop()
+    assert flushes == 1
+
+    async with uow:
+        execution = await uow.session.execute(
+            sa.select(event_store.c.aggregate_id, sa.func.count())
+            .where(event_store.c.aggregate_id.in_(aggregate_ids))
+            .group_by(event_store.c.aggregate_id)
+        )
+        assert {ident: count for ident, count in execution.all()} == {ident: 2 for ident in aggregate_ids}
+
+    # a failed flush fails every append in the group
+    broken: list[dict] = [{"id": uuid4(), "aggregate_id": uuid4(), "event_name": None, "event_data": {}}]
+    results = await asyncio.gather(
+        appender.append(broken),
+        appender.append(event_rows([(uuid4(), events.BugSoftDeleted(id=uuid4()))])),
+        return_exceptions=True,
+    )
+    assert all(isinstance(result, sa.exc.IntegrityError) for result in results)
@@ -0,0 +1,108 @@
+from uuid import UUID
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.common.security import create_jwt_token
+from app.service.bugs import commands as bug_commands
+from app.service.bugs import handlers as bug_handlers
+from app.service.hashing import PasswordHashingService
+from app.service.unit_of_work import AbstractUnitOfWork
+from app.service.users import commands as user_commands
+from app.service.users import handlers as user_handlers
+
+
+@pytest.fixture
+def statements(async_engine: AsyncEngine):
+    captured: list[str] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", capture)
+    yield captured
+    event.remove(async_engine.sync_engine, "before_cursor_execute", capture)
+
+
+def selects(captured: list[str]) -> list[str]:
+    return [s for s in captured if s.lstrip().upper().startswith("SELECT")]
+
+
+@pytest.mark.asyncio
+async def test_user_handlers_load_one_row(
+    uow: AbstractUnitOfWork,
+    user_data_in: dict,
+    hashing_service: PasswordHashingService,
+    statements: list[str],
+):
+    cmd = user_commands.CreateUser(**user_data_in)
+    user_id = await user_handlers.create_user(cmd, uow=uow, hasher=hashing_service)
+    assert not selects(statements)  # a duplicate email fails the insert, nothing is looked up first
+
+    statements.clear()
+    login = user_commands.Login(email=user_data_in["email"], password=user_data_in["password"])
+    await user_handlers.login(login, uow=uow, hasher=hashing_service)
+    assert len(selects(statements)) == 1
+    assert "bug_tracker_users.security_question" not in selects(statements)[0]
+
+    statements.clear()
+    token = create_jwt_token(subject=str(user_id), private_claims={}, refresh=True)
+    await user_handlers.refresh(user_commands.Refresh(refresh_token=token, grant_type="refresh_token"), uow=uow)
+    assert len(selects(statements)) == 1
+
+    statements.clear()
+    update = user_commands.UpdateUser(**{**user_data_in, "id": user_id, "username": "renamed"})
+    await user_handlers.update_user(update, uow=uow, hasher=hashing_service)
+    # the stored hash for argon2 outside the transaction, then the user inside it
+    assert len(selects(statements)) == 2
+    assert "bug_tracker_users.security_question" not in selects(statements)[0]
+
+    statements.clear()
+    await user_handlers.soft_delete_user(user_commands.SoftDeleteUser(id=user_id), uow=uow)
+    assert len(selects(statements)) == 1
+
+
+@pytest.mark.asyncio
+async def test_bug_handlers_load_what_they_use(
+    uow: AbstractUnitOfWork,
+    bug_data_in: dict,
+    create_bug_id: tuple[UUID, UUID],
+    statements: list[str],
+):
+    bug_id, user_id = create_bug_id
+
+    statements.clear()
+    comment = bug_commands.CreateComment(bug_id=bug_id, author_id=user_id, text="first")
+    comment_id = await bug_handlers.create_comment(comment, uow=uow)
+    assert len(selects(statements)) == 1  # the bug, none of its comments
+    assert "bug_tracker_comments" not in selects(statements)[0]
+    await bug_handlers.create_comment(comment, uow=uow)
+
+    # the bug and the one comment, however many others it has
+    statements.clear()
+    update_comment = bug_commands.UpdateComment(id=comment_id, bug_id=bug_id, author_id=user_id, text="edited")
+    await bug_handlers.update_comment(update_comment, uow=uow)
+    assert len(selects(statements)) == 1
+
+    statements.clear()
+    delete_comment = bug_commands.DeleteComment(id=comment_id, bug_id=bug_id, author_id=user_id)
+    await bug_handlers.delete_comment(delete_comment, uow=uow)
+    assert len(selects(statements)) == 1
+
+    statements.clear()
+    bug_data_in["id"] = bug_id
+    bug_data_in["author_id"] = user_id
+    await bug_handlers.update_bug(bug_commands.UpdateBug(**bug_data_in), uow=uow)
+    assert len(selects(statements)) == 1
+
+    statements.clear()
+    await bug_handlers.soft_delete_bug(bug_commands.SoftDeleteBug(id=bug_id, author_id=user_id), uow=uow)
+    assert len(selects(statements)) == 1
+
+
+@pytest.mark.asyncio
+async def test_unknown_profile(uow: AbstractUnitOfWork):
+    async with uow:
+        with pytest.raises(ValueError):
+            await uow.users.list(profile="everything")
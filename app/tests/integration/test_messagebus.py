@@ -0,0 +1,62 @@
+import asyncio
+from uuid import UUID
+
+import pytest
+import sqlalchemy as sa
+
+from app.adapters.orm import bugs, event_store
+from app.domain.commands import Command
+from app.service.bugs import commands
+from app.service.hashing import PasswordHashingService
+from app.service.messagebus import MessageBusFactory
+from app.service.unit_of_work import AbstractUnitOfWork, SqlAlchemyUnitOfWork, UnitOfWorkPool
+
+
+@pytest.mark.asyncio
+async def test_concurrent_commands_get_their_own_uow(
+    uow: AbstractUnitOfWork,
+    bug_data_in: dict,
+    create_user_id: UUID,
+    hashing_service: PasswordHashingService,
+    pooled_session_factory,
+):
+    pool = UnitOfWorkPool(lambda: SqlAlchemyUnitOfWork(pooled_session_factory), max_idle=16)
+    factory = MessageBusFactory(uow_pool=pool, password_hasher=hashing_service)
+    in_flight: set[int] = set()
+
+    # what get_message_bus does for every request
+    async def request(cmd: Command):
+        async with factory.request() as messagebus:
+            assert id(messagebus.uow) not in in_flight
+            in_flight.add(id(messagebus.uow))
+            try:
+                return await messagebus.handle(cmd)
+            finally:
+                in_flight.discard(id(messagebus.uow))
+
+    bug_data_in["author_id"] = create_user_id
+    bug_data_in["assignee_id"] = None
+    titles = [f"bug {i}" for i in range(300)]
+    created: list[UUID] = await asyncio.gather(
+        *[request(commands.CreateBug(**{**bug_data_in, "title": title})) for title in titles]
+    )
+    assert len(set(created)) == 300
+
+    updated: list[UUID] = await asyncio.gather(
+        *[
+            request(commands.UpdateBug(**{**bug_data_in, "id": bug_id, "title": f"{title} edited"}))
+            for bug_id, title in zip(created, titles)
+        ]
+    )
+    assert updated == created
+    assert len(pool.idle) == 16
+
+    async with uow:
+        execution = await uow.session.execute(sa.select(bugs.c.id, bugs.c.title))
+        rows = {bug_id: title for bug_id, title in execution.all()}
+        assert rows == {bug_id: f"{title} edited" for bug_id, title in zip(created, titles)}
+        execution = await uow.session.execute(
+            sa.select(event_store.c.aggregate_id, sa.func.count()).group_by(event_store.c.aggregate_id)
+        )
+        event_counts = {aggregate_id: count for aggregate_id, count in execution.all()}
+        assert all(event_counts[bug_id] == 2 for bug_id in created)
@@ -0,0 +1,98 @@
+from typing import Any, Callable
+from uuid import UUID
+
+import pytest
+import sqlalchemy as sa
+
+from app.adapters.orm import bugs
+from app.domain.models import Bugs, Users
+from app.service import exceptions as service_exc
+from app.service.bugs import commands
+from app.service.bugs.repository import BugRepository
+from app.service.hashing import PasswordHashingService
+from app.service.messagebus import MessageBus, MessageBusFactory
+from app.service.unit_of_work import AbstractUnitOfWork, SqlAlchemyUnitOfWork, UnitOfWorkPool
+
+
+class RacedUnitOfWork(SqlAlchemyUnitOfWork):
+    # another writer updates the bug between this uow loading it and committing, the first `races` times
+    def __init__(self, session_factory, races: int):
+        super().__init__(session_factory)
+        self.races = races
+
+    async def _commit(self):
+        if self.races:
+            self.races -= 1
+            [bug] = self.bugs.seen
+            async with self.session_factory() as session:
+                theirs = await BugRepository(session).get(bug.id, profile="summary")
+                theirs.update_bug({"title": f"theirs {self.races}"})
+                await session.commit()
+        await super()._commit()
+
+
+async def race(session_factory, repository: str, ident: UUID, change: Callable[[Any, str], Any]) -> Any:
+    # both load the same version, the first to commit wins
+    async with SqlAlchemyUnitOfWork(session_factory) as first, SqlAlchemyUnitOfWork(session_factory) as second:
+        winner = await getattr(first, repository).get(ident, profile="summary")
+        loser = await getattr(second, repository).get(ident, profile="summary")
+        change(winner, "first")
+        await first.commit()
+        change(loser, "second")
+        with pytest.raises(service_exc.ConcurrencyException):
+            await second.commit()
+        return winner
+
+
+@pytest.mark.asyncio
+async def test_stale_writes_are_refused(create_bug_id: tuple[UUID, UUID], pooled_session_factory):
+    bug_id, user_id = create_bug_id
+    bug: Bugs = await race(pooled_session_factory, "bugs", bug_id, lambda bug, title: bug.update_bug({"title": title}))
+    user: Users = await race(
+        pooled_session_factory, "users", user_id, lambda user, name: user.update_user({"username": name})
+    )
+    assert (bug.title, bug.version, user.username, user.version) == ("first", 2, "first", 2)
+
+    async with SqlAlchemyUnitOfWork(pooled_session_factory) as uow:
+        execution = await uow.session.execute(sa.select(bugs.c.title, bugs.c.version).where(bugs.c.id == bug_id))
+        assert execution.one() == ("first", 2)
+
+
+@pytest.mark.asyncio
+async def test_idempotent_commands_are_retried(
+    bug_data_in: dict,
+    create_bug_id: tuple[UUID, UUID],
+    hashing_service: PasswordHashingService,
+    pooled_session_factory,
+):
+    bug_id, user_id = create_bug_id
+    update = commands.UpdateBug(**{**bug_data_in, "id": bug_id, "author_id": user_id, "title": "ours"})
+
+    def bus(races: int) -> MessageBus:
+        uow = RacedUnitOfWork(pooled_session_factory, races)
+        factory = MessageBusFactory(
+            uow_pool=UnitOfWorkPool(lambda: uow), password_hasher=hashing_service, backoff_base=0.001
+        )
+        return factory(uow)
+
+    # lost twice, applied on top of the winner the third time
+    assert await bus(races=2).handle(update) == bug_id
+    async with SqlAlchemyUnitOfWork(pooled_session_factory) as uow:
+        execution = await uow.session.execute(sa.select(bugs.c.title, bugs.c.version).where(bugs.c.id == bug_id))
+        assert execution.one() == ("ours", 4)
+
+    with pytest.raises(service_exc.ConcurrencyException):
+        await bus(races=3).handle(update)
+
+    # not idempotent, never run twice
+    calls = []
+
+    async def create_comment(cmd: commands.CreateComment, *, uow: AbstractUnitOfWork):
+        calls.append(cmd)
+        raise service_exc.ConcurrencyException
+
+    messagebus = bus(races=0)
+    messagebus.command_handlers = {commands.CreateComment: (create_comment, ("uow",))}
+    with pytest.raises(service_exc.ConcurrencyException):
+        await messagebus.handle(commands.CreateComment(bug_id=bug_id, author_id=user_id, text="once"))
+    assert len(calls) == 1
@@ -0,0 +1,93 @@
+from copy import deepcopy
+from uuid import UUID
+
+import pytest
+import sqlalchemy as sa
+
+from app.adapters.orm import outbox
+from app.service.hashing import PasswordHashingService
+from app.service.messagebus import MessageBusFactory
+from app.service.outbox import OutboxDispatcher
+from app.service.unit_of_work import AbstractUnitOfWork, SqlAlchemyUnitOfWork, UnitOfWorkPool
+from app.service.users import commands, events, handlers
+
+
+@pytest.fixture
+def dispatcher(pooled_session_factory, hashing_service: PasswordHashingService) -> OutboxDispatcher:
+    messagebus = MessageBusFactory(
+        uow_pool=UnitOfWorkPool(lambda: SqlAlchemyUnitOfWork(pooled_session_factory)),
+        password_hasher=hashing_service,
+    )
+    return OutboxDispatcher(messagebus=messagebus, session_factory=pooled_session_factory, max_attempts=2)
+
+
+async def outbox_rows(uow: AbstractUnitOfWork):
+    async with uow:
+        execution = await uow.session.execute(sa.select(outbox).order_by(outbox.c.id))
+        return execution.all()
+
+
+@pytest.mark.asyncio
+async def test_events_are_dispatched_from_the_outbox(
+    uow: AbstractUnitOfWork,
+    create_user_id: UUID,
+    user_data_in: dict,
+    hashing_service: PasswordHashingService,
+    dispatcher: OutboxDispatcher,
+):
+    handled: list[tuple[str, str]] = []
+
+    async def record(event: events.UserCreated | events.UserUpdated):
+        handled.append((type(event).__name__, event.username))
+
+    dispatcher.messagebus.event_handlers[events.UserCreated] = [(record, ())]
+    dispatcher.messagebus.event_handlers[events.UserUpdated] = [(record, ())]
+
+    update = deepcopy(user_data_in)
+    update["id"] = create_user_id
+    update["username"] = "renamed"
+    await handlers.update_user(commands.UpdateUser(**update), uow=uow, hasher=hashing_service)
+
+    # committed with the change, nothing ran inline
+    rows = await outbox_rows(uow)
+    assert [(row.aggregate_id, row.event_name) for row in rows] == [
+        (create_user_id, "UserCreated"),
+        (create_user_id, "UserUpdated"),
+    ]
+    assert handled == []
+
+    # one event per aggregate per batch keeps them in order
+    assert await dispatcher.dispatch_batch() == 1
+    assert handled == [("UserCreated", user_data_in["username"])]
+    assert await dispatcher.dispatch_batch() == 1
+    assert handled == [("UserCreated", user_data_in["username"]), ("UserUpdated", "renamed")]
+    assert await dispatcher.dispatch_batch() == 0
+    assert await outbox_rows(uow) == []
+
+
+@pytest.mark.asyncio
+async def test_failed_events_are_retried_with_backoff(
+    uow: AbstractUnitOfWork,
+    create_user_id: UUID,
+    dispatcher: OutboxDispatcher,
+):
+    async def broken_projection(event: events.UserCreated):
+        raise RuntimeError("projection is down")
+
+    dispatcher.messagebus.event_handlers[events.UserCreated] = [(broken_projection, ())]
+
+    assert await dispatcher.dispatch_batch() == 1
+    (row,) = await outbox_rows(uow)
+    assert row.attempts == 1
+    assert row.last_error == "RuntimeError: projection is down"
+    assert row.failed_at is None
+    assert await dispatcher.dispatch_batch() == 0  # backing off
+
+    async with uow:
+        await uow.session.execute(sa.update(outbox).values(available_at=sa.func.now()))
+        await uow.commit()
+    assert await dispatcher.dispatch_batch() == 1
+    (row,) = await outbox_rows(uow)
+    assert row.attempts == 2
+    assert row.failed_at is not None  # gave up after max_attempts
+    assert await dispatcher.dispatch_batch() == 0
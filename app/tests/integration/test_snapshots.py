@@ -0,0 +1,79 @@
+from uuid import UUID, uuid4
+
+import pytest
+import sqlalchemy as sa
+
+from app.adapters.orm import snapshots
+from app.domain.enums import BugStatusEnum
+from app.domain.models import Bugs, Users
+from app.service.bugs import commands, handlers
+from app.service.unit_of_work import AbstractUnitOfWork
+
+
+async def load(uow: AbstractUnitOfWork, ident: UUID, snapshot_every: int = 0) -> Bugs:
+    async with uow:
+        uow.event_store.snapshot_every = snapshot_every  # type: ignore
+        bug = await uow.event_store.load(Bugs, ident)  # type: ignore
+        await uow.commit()
+        return bug
+
+
+def state(bug: Bugs) -> dict:
+    return {
+        "title": bug.title,
+        "status": bug.status,
+        "version": bug.version,
+        "comments": sorted((c.id, c.text, c.vote_count) for c in bug.comments),
+    }
+
+
+async def stored_state(uow: AbstractUnitOfWork, ident: UUID) -> dict:
+    async with uow:
+        return state(await uow.bugs.get(ident))
+
+
+@pytest.mark.asyncio
+async def test_load_from_snapshot_and_newer_events(
+    uow: AbstractUnitOfWork,
+    create_bug_id: tuple[UUID, UUID],
+    bug_data_in: dict,
+):
+    bug_id, user_id = create_bug_id
+    comment_ids = [
+        await handlers.create_comment(
+            commands.CreateComment(bug_id=bug_id, author_id=user_id, text=f"comment {i}"), uow=uow
+        )
+        for i in range(3)
+    ]
+    await handlers.upvote_downvote_comment(commands.Upvote(id=comment_ids[0], user_id=user_id), uow=uow)
+    await handlers.delete_comment(commands.DeleteComment(id=comment_ids[2], bug_id=bug_id, author_id=user_id), uow=uow)
+
+    # six events so far, replaying them all leaves a snapshot behind
+    assert state(await load(uow, bug_id, snapshot_every=5)) == await stored_state(uow, bug_id)
+    async with uow:
+        execution = await uow.session.execute(sa.select(snapshots.c.version).where(snapshots.c.aggregate_id == bug_id))
+        assert execution.scalars().all() == [6]
+
+    await handlers.update_comment(
+        commands.UpdateComment(id=comment_ids[1], bug_id=bug_id, author_id=user_id, text="edited"), uow=uow
+    )
+    await handlers.upvote_downvote_comment(commands.Downvote(id=comment_ids[0], user_id=user_id), uow=uow)
+    await handlers.update_bug(
+        commands.UpdateBug(**{**bug_data_in, "id": bug_id, "status": BugStatusEnum.RESOLVED}), uow=uow
+    )
+    assert state(await load(uow, bug_id, snapshot_every=5)) == await stored_state(uow, bug_id)
+
+    # the snapshot alone, with the events it covers gone, still gives the state as of that version
+    async with uow:
+        await uow.session.execute(sa.text("DELETE FROM bug_tracker_event_store WHERE event_name = 'CommentCreated'"))
+        await uow.commit()
+    assert state(await load(uow, bug_id)) == await stored_state(uow, bug_id)
+
+
+@pytest.mark.asyncio
+async def test_load_user(uow: AbstractUnitOfWork, create_user_id: UUID, user_data_in: dict):
+    async with uow:
+        user = await uow.event_store.load(Users, create_user_id)  # type: ignore
+        assert user.id == create_user_id
+        assert user.username == user_data_in["username"]
+        assert await uow.event_store.load(Users, uuid4()) is None  # type: ignore
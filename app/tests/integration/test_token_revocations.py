@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta, timezone
+from uuid import UUID, uuid4
+
+import pytest
+import sqlalchemy as sa
+
+from app.adapters.orm import revoked_tokens
+from app.common.security import create_jwt_token, validate_jwt_token
+from app.service.hashing import PasswordHashingService
+from app.service.unit_of_work import AbstractUnitOfWork
+from app.service.users import commands, handlers, tokens
+from app.service.users.tokens import TokenRevocations
+
+
+@pytest.mark.asyncio
+async def test_revocations_reach_every_worker(
+    uow: AbstractUnitOfWork,
+    create_user_id: UUID,
+    user_data_in: dict,
+    hashing_service: PasswordHashingService,
+    session_factory,
+):
+    def issue():
+        return validate_jwt_token(create_jwt_token(subject=str(create_user_id), private_claims={}, refresh=False))
+
+    # the worker that handled the logout knows at once, another one once it polls
+    here, elsewhere = TokenRevocations(session_factory), TokenRevocations(session_factory)
+    logged_out, kept = issue(), issue()
+    logout = commands.Logout(user_id=create_user_id, jti=logged_out.jti, exp=int(logged_out.exp))
+    await handlers.logout(logout, uow=uow, revocations=here)
+    await handlers.logout(logout, uow=uow, revocations=here)  # again is fine
+    assert here.is_revoked(logged_out) and not here.is_revoked(kept)
+    assert not elsewhere.is_revoked(logged_out)
+    assert await elsewhere.load() == 1
+    assert elsewhere.is_revoked(logged_out) and not elsewhere.is_revoked(kept)
+
+    # the same password is not a change, a new one revokes everything issued up to now
+    update = commands.UpdateUser(id=create_user_id, password=user_data_in["password"])
+    await handlers.update_user(update, uow=uow, hasher=hashing_service, revocations=here)
+    assert not here.is_revoked(kept)
+    update = commands.UpdateUser(id=create_user_id, password="something new")
+    await handlers.update_user(update, uow=uow, hasher=hashing_service, revocations=here)
+    await elsewhere.load()
+    assert here.is_revoked(kept) and elsewhere.is_revoked(kept)
+
+    # a token issued after a revocation in the same second is not revoked with it
+    same_second = TokenRevocations(session_factory)
+    revoked_at = datetime(2026, 10, 17, 20, 0, 0, 250000, tzinfo=timezone.utc)
+    same_second.add_sessions(create_user_id, revoked_at)
+    before, after = issue().copy(), issue().copy()
+    before.iat, after.iat = str(revoked_at.timestamp() - 0.1), str(revoked_at.timestamp() + 0.1)
+    assert same_second.is_revoked(before) and not same_second.is_revoked(after)
+
+    # expired rows are purged on rebuild
+    async with uow:
+        await tokens.revoke_token(
+            uow.session, create_user_id, uuid4().hex, datetime.now(timezone.utc) - timedelta(minutes=1)
+        )
+        await uow.commit()
+    assert await elsewhere.rebuild() == 2
+    assert elsewhere.is_revoked(logged_out) and elsewhere.is_revoked(kept)
+    async with uow:
+        execution = await uow.session.execute(sa.select(sa.func.count()).select_from(revoked_tokens))
+        assert execution.scalar_one() == 2
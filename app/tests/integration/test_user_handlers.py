@@ -2,12 +2,12 @@ from copy import deepcopy
 from uuid import uuid4
 
 import pytest
-from argon2 import PasswordHasher
 
 from app.common.security import create_jwt_token
 from app.domain import enums
 from app.domain.models import EventStore, Users
 from app.service import exceptions as service_exc
+from app.service.hashing import PasswordHashingService
 from app.service.unit_of_work import AbstractUnitOfWork
 from app.service.users import commands, handlers
 
@@ -16,10 +16,10 @@ from app.service.users import commands, handlers
 async def test_create_user_handler(
     uow: AbstractUnitOfWork,
     user_data_in: dict,
-    password_hasher: PasswordHasher,
+    hashing_service: PasswordHashingService,
 ):
     cmd = commands.CreateUser(**user_data_in)
-    user_id = await handlers.create_user(cmd, uow=uow, hasher=password_hasher)
+    user_id = await handlers.create_user(cmd, uow=uow, hasher=hashing_service)
     assert user_id
     async with uow:
         found_user: list[Users] = await uow.users.list()
@@ -32,7 +32,7 @@ async def test_create_user_handler(
 
     # unhappy path testcase
     try:
-        await handlers.create_user(cmd, uow=uow, hasher=password_hasher)  # try again
+        await handlers.create_user(cmd, uow=uow, hasher=hashing_service)  # try again
     except service_exc.DuplicateRecord:
         assert True
 
@@ -41,16 +41,16 @@ async def test_create_user_handler(
 async def test_update_user_with_handlers(
     uow: AbstractUnitOfWork,
     user_data_in: dict,
-    password_hasher: PasswordHasher,
+    hashing_service: PasswordHashingService,
 ):
     cmd = commands.CreateUser(**user_data_in)
-    user_id = await handlers.create_user(cmd, uow=uow, hasher=password_hasher)
+    user_id = await handlers.create_user(cmd, uow=uow, hasher=hashing_service)
     update_data = deepcopy(user_data_in)
     update_data["username"] = "foobar"
     update_data["email"] = "foobar@gmail.com"
 
     update_cmd = commands.UpdateUser(id=user_id, **update_data)
-    updated_user = await handlers.update_user(update_cmd, uow=uow, hasher=password_hasher)
+    updated_user = await handlers.update_user(update_cmd, uow=uow, hasher=hashing_service)
     assert updated_user
     async with uow:
         found_user: list[Users] = await uow.users.list()
@@ -76,7 +76,7 @@ async def test_update_user_with_handlers(
     # unhappy path: update handler not found test case
     update_cmd.id = uuid4()
     try:
-        await handlers.update_user(update_cmd, uow=uow, hasher=password_hasher)
+        await handlers.update_user(update_cmd, uow=uow, hasher=hashing_service)
         assert False
     except service_exc.ItemNotFound:
         assert True
@@ -92,7 +92,7 @@ async def test_update_user_with_handlers(
     # unhappy path: user is deleted test case
     update_cmd.id = user_id
     try:
-        await handlers.update_user(update_cmd, uow=uow, hasher=password_hasher)
+        await handlers.update_user(update_cmd, uow=uow, hasher=hashing_service)
         assert False
     except service_exc.ItemNotFound:
         assert True
@@ -102,17 +102,17 @@ async def test_update_user_with_handlers(
 async def test_login_handler(
     uow: AbstractUnitOfWork,
     user_data_in: dict,
-    password_hasher: PasswordHasher,
+    hashing_service: PasswordHashingService,
 ):
     email = user_data_in["email"]
     password = user_data_in["password"]
     cmd = commands.CreateUser(**user_data_in)
-    user_id = await handlers.create_user(cmd, uow=uow, hasher=password_hasher)
+    user_id = await handlers.create_user(cmd, uow=uow, hasher=hashing_service)
     assert user_id
 
     try:
         ideal_login = commands.Login(email=email, password=password)
-        tokens = await handlers.login(ideal_login, uow=uow, hasher=password_hasher)
+        tokens = await handlers.login(ideal_login, uow=uow, hasher=hashing_service)
         assert tokens["message"] == "logged in"
         assert tokens["token"] is not None
         assert tokens["refresh_token"] is not None
@@ -122,40 +122,75 @@ async def test_login_handler(
     # unhappy paths
     try:
         bad_email = commands.Login(email="email", password=password)
-        await handlers.login(bad_email, uow=uow, hasher=password_hasher)
+        await handlers.login(bad_email, uow=uow, hasher=hashing_service)
         assert False
     except service_exc.Unauthorized:
         assert True
 
     try:
         bad_password = commands.Login(email=email, password="password")
-        await handlers.login(bad_password, uow=uow, hasher=password_hasher)
+        await handlers.login(bad_password, uow=uow, hasher=hashing_service)
         assert False
     except service_exc.Unauthorized:
         assert True
 
+    # the email's case doesn't matter
+    tokens = await handlers.login(
+        commands.Login(email=email.upper(), password=password), uow=uow, hasher=hashing_service
+    )
+    assert tokens["message"] == "logged in"
+
+    # a deleted user is told the same as an unknown email
     delete_cmd = commands.SoftDeleteUser(id=user_id)
     await handlers.soft_delete_user(delete_cmd, uow=uow)
     try:
         deleted = commands.Login(email=email, password=password)
-        await handlers.login(deleted, uow=uow, hasher=password_hasher)
+        await handlers.login(deleted, uow=uow, hasher=hashing_service)
         assert False
-    except service_exc.ItemNotFound:
+    except service_exc.Unauthorized:
         assert True
 
 
+@pytest.mark.asyncio
+async def test_email_unique_among_active_users(
+    uow: AbstractUnitOfWork,
+    user_data_in: dict,
+    hashing_service: PasswordHashingService,
+):
+    user_id = await handlers.create_user(commands.CreateUser(**user_data_in), uow=uow, hasher=hashing_service)
+    with pytest.raises(service_exc.DuplicateRecord):
+        await handlers.create_user(
+            commands.CreateUser(**{**user_data_in, "email": user_data_in["email"].upper()}),
+            uow=uow,
+            hasher=hashing_service,
+        )
+
+    other_data = {**user_data_in, "username": "other", "email": "other@gmail.com"}
+    other_id = await handlers.create_user(commands.CreateUser(**other_data), uow=uow, hasher=hashing_service)
+    with pytest.raises(service_exc.DuplicateRecord):
+        await handlers.update_user(
+            commands.UpdateUser(id=other_id, email=user_data_in["email"]), uow=uow, hasher=hashing_service
+        )
+
+    # the email is free again once its user is deleted
+    await handlers.soft_delete_user(commands.SoftDeleteUser(id=user_id), uow=uow)
+    assert await handlers.create_user(commands.CreateUser(**user_data_in), uow=uow, hasher=hashing_service)
+    async with uow:
+        assert len(await uow.users.list()) == 3
+
+
 @pytest.mark.asyncio
 async def test_refresh_handler(
-    uow: AbstractUnitOfWork, user_data_in: dict, password_hasher: PasswordHasher, expired_refresh_token: str
+    uow: AbstractUnitOfWork, user_data_in: dict, hashing_service: PasswordHashingService, expired_refresh_token: str
 ):
     email = user_data_in["email"]
     password = user_data_in["password"]
     cmd = commands.CreateUser(**user_data_in)
-    user_id = await handlers.create_user(cmd, uow=uow, hasher=password_hasher)
+    user_id = await handlers.create_user(cmd, uow=uow, hasher=hashing_service)
     assert user_id
 
     login = commands.Login(email=email, password=password)
-    tokens = await handlers.login(login, uow=uow, hasher=password_hasher)
+    tokens = await handlers.login(login, uow=uow, hasher=hashing_service)
 
     try:
         good_refresh = commands.Refresh(
@@ -0,0 +1,229 @@
+import asyncio
+from uuid import UUID
+
+import pytest
+import sqlalchemy as sa
+
+from app.adapters.orm import (
+    event_store,
+    projection_bug_state,
+    projection_checkpoints,
+    projection_comment_state,
+    replay_progress,
+    user_read_model,
+)
+from app.domain.enums import BugStatusEnum, RecordStatusEnum
+from app.service.bugs import commands as bug_commands
+from app.service.bugs import handlers as bug_handlers
+from app.service.hashing import PasswordHashingService
+from app.service.projections.replay import Replayer, ReplayReport
+from app.service.projections.runner import ProjectionRunner
+from app.service.projections.users import UserReadModelProjector
+from app.service.unit_of_work import AbstractUnitOfWork
+from app.service.users import commands as user_commands
+from app.service.users import handlers as user_handlers
+
+COUNTERS = ("bugs_raised_count", "bugs_assigned_to_count", "bugs_closed_count", "comment_count", "votes_count")
+
+
+async def make_history(
+    uow: AbstractUnitOfWork,
+    user_id: UUID,
+    user_data_in: dict,
+    bug_data_in: dict,
+    hasher: PasswordHashingService,
+) -> UUID:
+    other = {**user_data_in, "username": "assignee", "email": "assignee@example.com"}
+    assignee_id = await user_handlers.create_user(user_commands.CreateUser(**other), uow=uow, hasher=hasher)
+    await user_handlers.update_user(
+        user_commands.UpdateUser(**{**user_data_in, "id": user_id, "username": "renamed"}), uow=uow, hasher=hasher
+    )
+
+    bug = {
+        **bug_data_in,
+        "author_id": user_id,
+        "assignee_id": assignee_id,
+        "status": BugStatusEnum.NEW,
+        "record_status": RecordStatusEnum.ACTIVE,
+    }
+    bug_ids = [
+        await bug_handlers.create_bug(bug_commands.CreateBug(**{**bug, "title": f"bug {i}"}), uow=uow) for i in range(3)
+    ]
+    await bug_handlers.update_bug(
+        bug_commands.UpdateBug(**{**bug, "id": bug_ids[0], "status": BugStatusEnum.RESOLVED}), uow=uow
+    )
+    await bug_handlers.soft_delete_bug(bug_commands.SoftDeleteBug(id=bug_ids[2], author_id=user_id), uow=uow)
+
+    kept = await bug_handlers.create_comment(
+        bug_commands.CreateComment(bug_id=bug_ids[0], author_id=assignee_id, text="fixed it"), uow=uow
+    )
+    dropped = await bug_handlers.create_comment(
+        bug_commands.CreateComment(bug_id=bug_ids[0], author_id=assignee_id, text="never mind"), uow=uow
+    )
+    await bug_handlers.upvote_downvote_comment(bug_commands.Upvote(id=kept, user_id=user_id), uow=uow)
+    await bug_handlers.upvote_downvote_comment(bug_commands.Upvote(id=dropped, user_id=user_id), uow=uow)
+    await bug_handlers.delete_comment(
+        bug_commands.DeleteComment(id=dropped, bug_id=bug_ids[0], author_id=assignee_id), uow=uow
+    )
+    return assignee_id
+
+
+async def read_model(uow: AbstractUnitOfWork) -> dict[UUID, dict]:
+    async with uow:
+        execution = await uow.session.execute(sa.select(user_read_model))
+        # update_dt only says when the projector last touched the row
+        return {row.id: {k: v for k, v in row._mapping.items() if k != "update_dt"} for row in execution.all()}
+
+
+@pytest.mark.asyncio
+async def test_projection_builds_user_read_model(
+    uow: AbstractUnitOfWork,
+    create_user_id: UUID,
+    user_data_in: dict,
+    bug_data_in: dict,
+    hashing_service: PasswordHashingService,
+    pooled_session_factory,
+):
+    assignee_id = await make_history(uow, create_user_id, user_data_in, bug_data_in, hashing_service)
+    runner = ProjectionRunner([UserReadModelProjector()], pooled_session_factory, batch_size=500)
+    projector = runner.projectors[0]
+
+    assert await runner.catch_up(projector) > 0
+    assert await runner.catch_up(projector) == 0  # nothing new past the checkpoint
+
+    rows = await read_model(uow)
+    author, assignee = rows[create_user_id], rows[assignee_id]
+    assert author["username"] == "renamed"
+    assert {key: author[key] for key in COUNTERS} == {
+        "bugs_raised_count": 2,
+        "bugs_assigned_to_count": 0,
+        "bugs_closed_count": 0,
+        "comment_count": 0,
+        "votes_count": 0,
+    }
+    assert {key: assignee[key] for key in COUNTERS} == {
+        "bugs_raised_count": 0,
+        "bugs_assigned_to_count": 2,
+        "bugs_closed_count": 1,
+        "comment_count": 1,
+        "votes_count": 1,
+    }
+
+
+@pytest.mark.asyncio
+async def test_projection_does_not_depend_on_batch_size(
+    uow: AbstractUnitOfWork,
+    create_user_id: UUID,
+    user_data_in: dict,
+    bug_data_in: dict,
+    hashing_service: PasswordHashingService,
+    pooled_session_factory,
+):
+    await make_history(uow, create_user_id, user_data_in, bug_data_in, hashing_service)
+    runner = ProjectionRunner([UserReadModelProjector()], pooled_session_factory, batch_size=500)
+    await runner.catch_up(runner.projectors[0])
+    in_one_batch = await read_model(uow)
+
+    async with uow:
+        await uow.session.execute(sa.delete(user_read_model))
+        await uow.session.execute(sa.delete(projection_checkpoints))
+        await uow.session.execute(sa.delete(projection_bug_state))
+        await uow.session.execute(sa.delete(projection_comment_state))
+        await uow.commit()
+
+    runner = ProjectionRunner([UserReadModelProjector()], pooled_session_factory, batch_size=1)
+    projected = await runner.catch_up(runner.projectors[0])
+    assert await read_model(uow) == in_one_batch
+    async with uow:
+        execution = await uow.session.execute(sa.select(sa.func.count()).select_from(event_store))
+        assert projected == execution.scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_replay_rebuilds_and_hands_over_to_the_runner(
+    uow: AbstractUnitOfWork,
+    create_user_id: UUID,
+    user_data_in: dict,
+    bug_data_in: dict,
+    hashing_service: PasswordHashingService,
+    pooled_session_factory,
+):
+    await make_history(uow, create_user_id, user_data_in, bug_data_in, hashing_service)
+    runner = ProjectionRunner([UserReadModelProjector()], pooled_session_factory)
+    await runner.catch_up(runner.projectors[0])
+    projected = await read_model(uow)
+
+    report = await Replayer(UserReadModelProjector(), pooled_session_factory, workers=0).run()
+    assert report.aggregates == 5  # two users and three bugs
+    assert report.events_per_second > 0
+    assert await read_model(uow) == projected
+
+    # the checkpoint sits right after the replay, so only newer events reach the swapped in tables
+    assert await runner.catch_up(runner.projectors[0]) == 0
+    await user_handlers.update_user(
+        user_commands.UpdateUser(**{**user_data_in, "id": create_user_id, "username": "after replay"}),
+        uow=uow,
+        hasher=hashing_service,
+    )
+    assert await runner.catch_up(runner.projectors[0]) == 1
+    assert (await read_model(uow))[create_user_id]["username"] == "after replay"
+
+
+@pytest.mark.asyncio
+async def test_replay_resumes_after_a_crash(
+    uow: AbstractUnitOfWork,
+    create_user_id: UUID,
+    user_data_in: dict,
+    bug_data_in: dict,
+    hashing_service: PasswordHashingService,
+    pooled_session_factory,
+):
+    await make_history(uow, create_user_id, user_data_in, bug_data_in, hashing_service)
+    runner = ProjectionRunner([UserReadModelProjector()], pooled_session_factory)
+    await runner.catch_up(runner.projectors[0])
+    projected = await read_model(uow)
+
+    def crash(report: ReplayReport):
+        if report.aggregates == 2:
+            raise RuntimeError("killed")
+
+    with pytest.raises(RuntimeError):
+        await Replayer(UserReadModelProjector(), pooled_session_factory, workers=0, chunk_size=1, progress=crash).run()
+    async with uow:
+        execution = await uow.session.execute(sa.select(replay_progress.c.last_aggregate_id))
+        assert execution.scalar_one() is not None
+    assert await read_model(uow) == projected  # live tables untouched
+
+    # the rest goes through the process pool
+    report = await Replayer(UserReadModelProjector(), pooled_session_factory, workers=2, chunk_size=1).run()
+    assert report.aggregates == 3
+    assert await read_model(uow) == projected
+    async with uow:
+        execution = await uow.session.execute(sa.select(sa.func.count()).select_from(replay_progress))
+        assert execution.scalar_one() == 0
+
+
+@pytest.mark.asyncio
+async def test_failing_projector_is_logged_and_stays_put(
+    uow: AbstractUnitOfWork,
+    create_user_id: UUID,
+    user_data_in: dict,
+    bug_data_in: dict,
+    hashing_service: PasswordHashingService,
+    pooled_session_factory,
+    caplog: pytest.LogCaptureFixture,
+):
+    class Failing(UserReadModelProjector):
+        async def apply(self, session, events):
+            raise RuntimeError("bad event")
+
+    await make_history(uow, create_user_id, user_data_in, bug_data_in, hashing_service)
+    runner = ProjectionRunner([Failing()], pooled_session_factory, poll_interval=0.01)
+    runner.start()
+    await asyncio.sleep(0.2)
+    await runner.stop()
+
+    failures = [record for record in caplog.records if record.name == "app.service.projections.runner"]
+    assert failures and failures[0].exc_info is not None
+    assert f"projector {Failing.name} failed after checkpoint (0, 0)" in failures[0].getMessage()
+    assert await read_model(uow) == {}
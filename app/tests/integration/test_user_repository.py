@@ -72,3 +72,35 @@ async def test_user_repository_delete(
     execution = await session.execute(select(Users))
     user: Users | None = execution.scalars().first()
     assert user is None
+
+
+@pytest.mark.asyncio
+async def test_user_repository_keyset_page(
+    session: AsyncSession,
+    user_data_list: list[dict],
+    password_hasher: PasswordHasher,
+):
+    user_repo = UserRepository(session=session)
+    user_repo.add_all([Users.create_user(data, password_hasher) for data in user_data_list])
+    await session.commit()  # same transaction so create_dt ties and id has to break them
+
+    first = await user_repo.page(count_per_page=2)
+    assert len(first.items) == 2
+    assert first.prev is None and first.next is not None
+
+    second = await user_repo.page(cursor=first.next, count_per_page=2)
+    third = await user_repo.page(cursor=second.next, count_per_page=2)
+    assert len(second.items) == 2
+    assert len(third.items) == 1
+    assert third.next is None and third.prev is not None
+
+    seen = [user.id for page in (first, second, third) for user in page.items]
+    assert len(seen) == len(set(seen)) == len(user_data_list)
+
+    back = await user_repo.page(cursor=third.prev, count_per_page=2)
+    assert [user.id for user in back.items] == [user.id for user in second.items]
+    assert back.next is not None and back.prev is not None
+
+    active = await user_repo.page(count_per_page=10, user_status__eq=enums.RecordStatusEnum.ACTIVE)
+    assert len(active.items) == len(user_data_list)
+    assert active.next is None
@@ -0,0 +1,90 @@
+from datetime import datetime, timezone
+from uuid import UUID, uuid4
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.adapters.orm import bugs_read_model, user_read_model
+from app.common.security import create_jwt_token, validate_jwt_token
+from app.service.users import views
+from app.utils.helpers import Page, encode_cursor
+
+# every row shares one create_dt, so the id has to break the tie at each page boundary
+TIED = datetime(2026, 10, 17, 12, 0, tzinfo=timezone.utc)
+
+
+async def walk(view, ids: list[UUID]):
+    # forward to the end, then back to the start, pages of 2 over rows sorted newest first then by id descending
+    expected = sorted(ids, reverse=True)
+    pages: list[Page] = [await view(None)]
+    while pages[-1].next:
+        pages.append(await view(pages[-1].next))
+    assert [page.items for page in pages] == [expected[i : i + 2] for i in range(0, len(expected), 2)]
+    assert pages[0].prev is None and pages[-1].next is None
+
+    back = pages[-1]
+    for page in reversed(pages[:-1]):
+        assert back.prev is not None
+        back = await view(back.prev)
+        assert back.items == page.items and back.next is not None
+    assert back.prev is None
+
+    # before the first row there is nothing
+    empty = await view(encode_cursor([TIED, expected[0]], backwards=True))
+    assert empty.items == [] and empty.next is None and empty.prev is None
+
+
+@pytest.mark.asyncio
+async def test_bo_users_list_cursor_round_trip(session: AsyncSession):
+    ids = [uuid4() for _ in range(5)]
+    await session.execute(
+        sa.insert(user_read_model),
+        [
+            {
+                "id": ident,
+                "create_dt": TIED,
+                "username": f"user{i}",
+                "email": f"user{i}@example.com",
+                "user_type": "backend",
+                "user_status": "active",
+                "is_admin": False,
+            }
+            for i, ident in enumerate(ids)
+        ],
+    )
+    await session.commit()
+    token = validate_jwt_token(create_jwt_token(subject=str(uuid4()), private_claims={"admin": True}, refresh=False))
+
+    async def view(cursor: str | None) -> Page:
+        page = await views.bo_get_users_list(session, token, cursor=cursor, count_per_page=2)
+        return Page(items=[user.id for user in page.items], next=page.next, prev=page.prev)
+
+    await walk(view, ids)
+
+
+@pytest.mark.asyncio
+async def test_my_bugs_cursor_round_trip(session: AsyncSession):
+    author_id, ids = uuid4(), [uuid4() for _ in range(5)]
+    bug = {
+        "bug_created_dt": TIED,
+        "bug_updated_dt": TIED,
+        "description": "",
+        "environment": "production",
+        "urgency": "low",
+        "status": "new",
+        "record_status": "active",
+        "version": 1,
+    }
+    await session.execute(
+        sa.insert(bugs_read_model),
+        [{**bug, "bug_id": ident, "title": f"bug {i}", "author_id": author_id} for i, ident in enumerate(ids)]
+        + [{**bug, "bug_id": uuid4(), "title": "someone else's", "author_id": uuid4()}],
+    )
+    await session.commit()
+
+    async def view(cursor: str | None) -> Page:
+        page = await views.get_my_bugs(session, author_id, {"author": True}, None, cursor, count_per_page=2)
+        return Page(items=[bug.bug_id for bug in page.items], next=page.next, prev=page.prev)
+
+    await walk(view, ids)
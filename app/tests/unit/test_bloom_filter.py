@@ -0,0 +1,13 @@
+from uuid import uuid4
+
+from app.utils.bloom_filter import BloomFilter
+
+
+def test_bloom_filter():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    added = [uuid4().hex for _ in range(1000)]
+    for jti in added:
+        bloom.add(jti)
+    assert all(jti in bloom for jti in added) and not bloom.full
+    false_positives = sum(uuid4().hex in bloom for _ in range(10000))
+    assert false_positives < 300
@@ -1,4 +1,5 @@
 import copy
+import json
 
 from app.domain import enums
 from app.domain.models import Bugs, Comments
@@ -30,12 +31,16 @@ def test_bug_update(bug_data_in: dict):
     assert len(new_bug.events) == 2
     assert isinstance(new_bug.events[0], events.BugCreated)
     assert isinstance(new_bug.events[1], events.BugUpdated)
+    # only what changed is stored
+    assert set(new_bug.events[1].dict()) - {"edited"} == {"id", "status", "version"}
 
     bug_from_event = Bugs()
     for event in new_bug.events:
         event.apply(bug_from_event)
     assert new_bug.status == enums.BugStatusEnum.IN_PROGRESS
     assert new_bug.edited is True
+    restored = Bugs.from_events(type(event).from_dict(event.dict()) for event in new_bug.events)
+    assert restored.snapshot() == new_bug.snapshot()
 
 
 def test_bug_delete(bug_data_in: dict):
@@ -125,3 +130,48 @@ def test_comment_delete(bug_data_in: dict, comment_data_in: dict):
     comment = new_bug.add_comment(comment_data_in)
     new_bug.delete_comment(comment.id)
     assert len(new_bug.comments) == 0
+
+
+def test_bug_from_events_and_snapshot(bug_data_in: dict, comment_data_in: dict):
+    new_bug = Bugs.create_bug(bug_data_in)
+    comment_data_in["bug_id"] = new_bug.id
+    kept = new_bug.add_comment(copy.deepcopy(comment_data_in))
+    dropped = new_bug.add_comment(copy.deepcopy(comment_data_in))
+    new_bug.upvote_comment(kept.id)
+    new_bug.upvote_comment(kept.id)
+    new_bug.update_comment(kept.id, {**comment_data_in, "id": kept.id, "text": "edited"})
+    new_bug.delete_comment(dropped.id)
+    new_bug.update_bug({**bug_data_in, "id": new_bug.id, "status": enums.BugStatusEnum.READY})
+
+    replayed = Bugs.from_events(new_bug.events)
+    assert replayed.snapshot() == new_bug.snapshot()
+    assert [(c.id, c.text, c.vote_count) for c in replayed.comments] == [(kept.id, "edited", 2)]
+
+    # snapshots go through json
+    restored = Bugs.from_snapshot(json.loads(json.dumps(new_bug.snapshot())))
+    assert restored.snapshot() == new_bug.snapshot()
+    assert restored.status is enums.BugStatusEnum.READY
+    assert restored.comments[0].id == kept.id
+
+
+def test_comment_index_follows_the_comments(bug_data_in: dict, comment_data_in: dict):
+    new_bug = Bugs.create_bug(bug_data_in)
+    comment_data_in["bug_id"] = new_bug.id
+    added = [new_bug.add_comment(copy.deepcopy(comment_data_in)) for _ in range(6)]
+
+    for comment in (added[1], added[4], added[0]):
+        assert new_bug.delete_comment(comment.id) is comment
+    assert new_bug.delete_comment(added[1].id) is None
+    late = new_bug.add_comment(copy.deepcopy(comment_data_in))
+    assert new_bug.delete_comment(added[3].id) is added[3]
+    assert new_bug.comments == [added[2], added[5], late]
+    assert all(new_bug.find_comment(c.id) is c for c in new_bug.comments)
+    assert new_bug.find_comment(added[0].id) is None
+
+    # comments replaced or appended to from outside, like an orm load or a backref would
+    new_bug.comments = list(reversed(new_bug.comments))
+    outside = Comments.create(copy.deepcopy(comment_data_in))
+    new_bug.comments.append(outside)
+    assert new_bug.find_comment(outside.id) is outside
+    assert new_bug.delete_comment(late.id) is late
+    assert new_bug.comments == [added[5], added[2], outside]
@@ -0,0 +1,43 @@
+import json
+from uuid import uuid4
+
+from app.domain import codecs, enums
+from app.domain.events import AggregateCompacted
+from app.domain.models import Bugs, Comments
+from app.service.bugs import events
+
+
+def test_json_and_binary_round_trip(bug_data_in: dict):
+    bug = Bugs.create_bug(bug_data_in)
+    bug.update_bug({"status": enums.BugStatusEnum.RESOLVED, "assignee_id": None, "version": 2})
+    created, updated = bug.events
+    compacted = AggregateCompacted(aggregate="Bugs", state=bug.snapshot(), version=2)
+
+    for event in (created, updated, events.Downvoted(comment_id=uuid4(), weight=2), compacted):
+        stored = json.loads(json.dumps(event.dict()))
+        assert type(event).from_dict(stored) == event
+        assert codecs.unpack(event.name(), codecs.pack(event)) == event
+
+    # enums and uuids go out as plain values and come back as themselves, fields left UNSET stay out
+    assert updated.dict() == {
+        "id": str(bug.id),
+        "status": "resolved",
+        "assignee_id": None,
+        "version": 2,
+        "edited": True,
+    }
+    decoded = events.BugUpdated.from_dict(updated.dict())
+    assert decoded.status is enums.BugStatusEnum.RESOLVED and decoded.title is events.UNSET
+    assert len(codecs.pack(updated)) < len(json.dumps(updated.dict())) / 3
+
+
+def test_registry_and_appliers():
+    assert codecs.EVENTS["CommentCreated"] is events.CommentCreated
+    assert events.BugSoftDeleted(id=uuid4()).name() == "BugSoftDeleted"
+
+    comment = events.CommentUpdated(id=uuid4(), bug_id=uuid4(), author_id=uuid4(), text="edited", edited=True)
+    assert codecs.applier(events.CommentUpdated, Comments()) is codecs.applier(events.CommentUpdated, Comments())
+    applied = comment.apply(Comments())
+    assert (applied.id, applied.text, applied.edited) == (comment.id, "edited", True)
+    # fields the model doesn't have are left alone
+    assert events.Upvoted(comment_id=uuid4()).apply(Bugs()).comments == []
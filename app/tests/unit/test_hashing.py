@@ -0,0 +1,35 @@
+import asyncio
+
+import pytest
+from argon2 import PasswordHasher
+
+from app.service import exceptions as service_exc
+from app.service.hashing import PasswordHashingService
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify(hashing_service: PasswordHashingService, password: str):
+    hashed = await hashing_service.hash(password)
+    assert hashed != password
+    assert await hashing_service.verify(hashed, password) is True
+    assert await hashing_service.verify(hashed, "wrong password") is False
+    assert hashing_service.check_needs_rehash(hashed) is False
+    assert hashing_service.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_rejects_when_saturated(password_hasher: PasswordHasher, password: str):
+    service = PasswordHashingService(hasher=password_hasher, max_workers=1, max_queue=1)
+    try:
+        results = await asyncio.gather(
+            *[service.hash(password) for _ in range(3)],
+            return_exceptions=True,
+        )
+        rejected = [r for r in results if isinstance(r, service_exc.ServiceUnavailable)]
+        assert len(rejected) == 1
+        assert service.pending == 0
+
+        # capacity frees up again once the in flight calls are done
+        assert await service.hash(password)
+    finally:
+        service.shutdown()
@@ -0,0 +1,24 @@
+import pytest
+
+from app.common.rate_limit import MemoryRateLimitBackend, RateLimit
+
+
+@pytest.mark.asyncio
+async def test_token_bucket():
+    now = 100.0
+    backend = MemoryRateLimitBackend(max_keys=2, clock=lambda: now)
+    limit = RateLimit(backend, "test", burst=3, per_second=0.5)
+
+    assert [await limit.take("a") for _ in range(4)] == [0, 0, 0, 2.0]
+    now += 1  # half a token back
+    assert await limit.take("a") == 1.0
+    now += 1
+    assert await limit.take("a") == 0
+
+    # buckets are per key and per limit
+    assert await limit.take("b") == 0
+    assert await RateLimit(backend, "other", burst=1, per_second=1).take("a") == 0
+    assert len(backend) == 2 and ("test", "a") not in backend.buckets  # least recently used dropped, full again
+
+    await limit.reset("b")
+    assert [await limit.take("b") for _ in range(3)] == [0, 0, 0]
@@ -0,0 +1,64 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+
+from app.common.cache import MISSING, MemoryCache
+from app.service.read_cache import ReadCache, evict_aggregate, evict_bug
+from app.service.users import events
+
+
+@pytest.mark.asyncio
+async def test_lru_and_ttl():
+    cache = MemoryCache(max_size=2, ttl=60)
+    await cache.set("a", 1)
+    await cache.set("b", None)
+    assert await cache.get("a") == 1  # b is least recently used now
+    await cache.set("c", 3)
+    assert (await cache.get("b"), await cache.get("c"), cache.evictions) == (MISSING, 3, 1)
+
+    cache.ttl = 0
+    await cache.set("d", 4)
+    assert await cache.get("d") is MISSING and cache.expirations == 1
+
+
+@pytest.mark.asyncio
+async def test_single_flight_and_invalidation():
+    cache = ReadCache(MemoryCache())
+    key = uuid4()
+    loads = 0
+    release = asyncio.Event()
+
+    async def load():
+        nonlocal loads
+        loads += 1
+        await release.wait()
+        return f"load {loads}"
+
+    stampede = asyncio.gather(*[cache.get_or_load(key, load) for _ in range(10)])
+    await asyncio.sleep(0)
+    release.set()
+    assert await stampede == ["load 1"] * 10
+    assert await cache.get_or_load(key, load) == "load 1"
+    assert (loads, cache.hits, cache.misses, cache.coalesced) == (1, 1, 10, 9)
+
+    # evicted while loading, the old read is returned but not kept
+    release.clear()
+    await evict_aggregate(events.UserUpdated(id=key), cache)
+    loading = asyncio.create_task(cache.get_or_load(key, load))
+    await asyncio.sleep(0)
+    await evict_bug(type("CommentCreated", (), {"bug_id": key})(), cache)
+    release.set()
+    assert await loading == "load 2"
+    assert await cache.get_or_load(key, load) == "load 3"
+
+    # failures reach every waiter and aren't cached
+    async def fail():
+        await asyncio.sleep(0)
+        raise LookupError(key)
+
+    other = uuid4()
+    results = await asyncio.gather(*[cache.get_or_load(other, fail) for _ in range(3)], return_exceptions=True)
+    assert all(isinstance(result, LookupError) for result in results)
+    assert other not in cache.loading and await cache.backend.get(other) is MISSING
+    assert cache.stats()["invalidations"] == 2
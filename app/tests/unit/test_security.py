@@ -0,0 +1,41 @@
+import time
+from uuid import uuid4
+
+import pytest
+
+from app.common import exceptions as exc
+from app.common import security
+from app.common.security import VerifiedTokens, create_jwt_token, validate_jwt_token
+
+
+def test_verified_tokens_skip_the_signature_check(monkeypatch: pytest.MonkeyPatch):
+    decodes = 0
+    decode = security.jwt.decode
+
+    def counted(*args, **kwargs):
+        nonlocal decodes
+        decodes += 1
+        return decode(*args, **kwargs)
+
+    monkeypatch.setattr(security.jwt, "decode", counted)
+    cache = VerifiedTokens(max_size=2)
+    tokens = [create_jwt_token(subject=str(uuid4()), private_claims={"admin": False}, refresh=False) for _ in range(3)]
+
+    first = validate_jwt_token(tokens[0], cache)
+    assert validate_jwt_token(tokens[0], cache) is first and decodes == 1
+    assert first == validate_jwt_token(tokens[0])
+
+    # bounded, the least recently used token is checked again next time
+    validate_jwt_token(tokens[1], cache)
+    validate_jwt_token(tokens[2], cache)
+    assert len(cache) == 2 and cache.get(cache.digest(tokens[0])) is None
+
+    # and never outlives its exp
+    digest = cache.digest(tokens[2])
+    cache.add(digest, time.time() - 1, first)
+    assert cache.get(digest) is None
+
+    # another token's claims under this one's signature
+    header, _, signature = tokens[1].split(".")
+    with pytest.raises(exc.InvalidToken):
+        validate_jwt_token(".".join([header, tokens[2].split(".")[1], signature]), cache)
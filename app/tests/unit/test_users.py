@@ -59,6 +59,10 @@ def test_user_update(user_data_in: dict, password_hasher: PasswordHasher):
     assert len(new_user.events) == 2
     assert isinstance(new_user.events[0], UserCreated)
     assert isinstance(new_user.events[1], UserUpdated)
+    stored = new_user.events[1].dict()
+    assert stored["is_admin"] is True
+    assert "username" not in stored and "email" not in stored
+    assert Users.from_events(type(event).from_dict(event.dict()) for event in new_user.events).is_admin is True
 
     # user_from_event = Users()
     # for event in new_user.events:
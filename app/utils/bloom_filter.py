@@ -0,0 +1,44 @@
+import math
+
+MASK_64 = (1 << 64) - 1
+
+
+# set membership with false positives and no false negatives, sized for capacity items at error_rate
+# positions come from python's hash(), which is salted per process, so a filter is never shared across processes
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = max(1, capacity)
+        self.size = max(64, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _positions(self, item: str) -> list[int]:
+        # double hashing, the two halves of one 64 bit hash stand in for k independent ones
+        h = hash(item) & MASK_64
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        # inlined and stopping at the first unset bit, most lookups are misses that end after a probe or two
+        h = hash(item) & MASK_64
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        bits, size = self.bits, self.size
+        for i in range(self.hashes):
+            position = (h1 + i * h2) % size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    @property
+    def full(self) -> bool:
+        # past capacity the false positive rate climbs above error_rate
+        return self.count > self.capacity
@@ -1,3 +1,91 @@
-def set_pagination(query, page, count_per_page):
-    offset = count_per_page * (page - 1)
-    return query.offset(offset).limit(count_per_page)
+import base64
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any
+from uuid import UUID
+
+import sqlalchemy as sa
+
+
+@dataclass
+class Page:
+    items: list[Any] = field(default_factory=list)
+    next: str | None = None
+    prev: str | None = None
+
+
+def _encode_value(value: Any):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, UUID):
+        return {"uuid": str(value)}
+    return value
+
+
+def _decode_value(value: Any):
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "uuid" in value:
+            return UUID(value["uuid"])
+    return value
+
+
+# cursors are opaque to clients, they hold the sort key of the row to seek from and the direction
+def encode_cursor(values: list[Any], backwards: bool = False) -> str:
+    payload = {"k": [_encode_value(v) for v in values], "b": backwards}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[list[Any], bool]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return [_decode_value(v) for v in payload["k"]], bool(payload["b"])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("invalid cursor")
+
+
+def set_keyset_pagination(
+    query,
+    sort_columns: list[Any],
+    cursor: str | None,
+    count_per_page: int,
+    descending: bool = False,
+):
+    # seeks past the cursor row with a row value comparison so every page is an index range scan
+    backwards = False
+    if cursor:
+        values, backwards = decode_cursor(cursor)
+        key: Any = sa.tuple_(*sort_columns)
+        bound: Any = sa.tuple_(*values)
+        query = query.where(key < bound if descending != backwards else key > bound)
+    reverse = descending != backwards
+    query = query.order_by(*[column.desc() if reverse else column.asc() for column in sort_columns])
+    return query.limit(count_per_page + 1)  # one extra row tells us if there is another page
+
+
+def build_keyset_page(
+    rows: list[Any],
+    sort_columns: list[Any],
+    cursor: str | None,
+    count_per_page: int,
+) -> Page:
+    backwards = decode_cursor(cursor)[1] if cursor else False
+    has_more = len(rows) > count_per_page
+    items = list(rows[:count_per_page])
+    if backwards:
+        items.reverse()
+    if not items:
+        return Page(items=items)
+
+    def sort_key(row: Any) -> list[Any]:
+        return [getattr(row, column.key) for column in sort_columns]
+
+    has_next = has_more if not backwards else True
+    has_prev = (cursor is not None) if not backwards else has_more
+    return Page(
+        items=items,
+        next=encode_cursor(sort_key(items[-1])) if has_next else None,
+        prev=encode_cursor(sort_key(items[0]), backwards=True) if has_prev else None,
+    )
@@ -0,0 +1,178 @@
+# bytes held per loaded bug as its comment count grows: the mapped aggregate, the event store fold,
+# a page of slotted comment values and the aggregate's events, slotted vs the dict backed dataclasses they were
+# usage: make bench BENCH=aggregate_memory ARGS="--comments 10 1000 10000"
+import argparse
+import asyncio
+import dataclasses
+import gc
+import tracemalloc
+from typing import Any, Awaitable, Callable
+from uuid import uuid4
+
+import sqlalchemy as sa
+
+from app.adapters.orm import bugs, comments, event_store, snapshots, users
+from app.common.db import async_transactional_session_factory, engine
+from app.domain.enums import BugStatusEnum, EnvironmentEnum, RecordStatusEnum, UrgencyEnum, UserTypeEnum
+from app.domain.models import Bugs
+from app.service.bugs import events
+from app.service.bugs.repository import BugRepository
+from app.service.bugs.views import get_bug_comments
+from app.service.event_store.repository import EventStoreRepository
+
+# CommentCreated as it was before events had slots, every instance carrying its own __dict__
+DictCommentCreated = dataclasses.make_dataclass(
+    "DictCommentCreated",
+    [
+        (f.name, f.type) if f.default_factory is dataclasses.MISSING else (f.name, f.type, f)
+        for f in dataclasses.fields(events.CommentCreated)
+    ],
+    frozen=True,
+)
+
+
+async def measured(load: Callable[[], Awaitable[Any]]) -> tuple[int, int]:
+    # what the result still holds once loaded and the high water mark on the way there
+    await load()  # statement caches and the like aren't the aggregate's
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = await load()
+        gc.collect()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return current, peak
+
+
+def held(build: Callable[[], Any]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = build()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return current
+
+
+def report(label: str, count: int, current: int, peak: int | None = None):
+    line = f"{label:<28} comments={count:<6} held={current / 1024:10.1f}KiB per comment={current / count:7.0f}B"
+    if peak is not None:
+        line += f" peak={peak / 1024:10.1f}KiB"
+    print(line)
+
+
+async def seed(count: int) -> tuple[Any, Any, list[events.Event]]:
+    assert async_transactional_session_factory is not None
+    bug_id, user_id = uuid4(), uuid4()
+    bug = {
+        "id": bug_id,
+        "title": "long lived bug",
+        "author_id": user_id,
+        "assignee_id": None,
+        "description": "it keeps coming back",
+        "environment": EnvironmentEnum.PROD,
+        "urgency": UrgencyEnum.HIGH,
+        "status": BugStatusEnum.IN_PROGRESS,
+        "record_status": RecordStatusEnum.ACTIVE,
+        "version": 1,
+        "edited": False,
+        "images": [],
+    }
+    history: list[events.Event] = [events.BugCreated(**bug)]
+    history += [
+        events.CommentCreated(id=uuid4(), bug_id=bug_id, author_id=user_id, text=f"comment #{i}", edited=False)
+        for i in range(count)
+    ]
+    async with async_transactional_session_factory() as session:
+        await session.execute(
+            sa.insert(users).values(
+                id=user_id,
+                username=f"memory{bug_id.hex[:8]}",
+                email=f"memory{bug_id.hex[:8]}@example.com",
+                password="not a hash",
+                user_type=UserTypeEnum.BACKEND.value,
+                user_status=RecordStatusEnum.ACTIVE.value,
+                is_admin=False,
+                security_question="?",
+                security_question_answer="!",
+            )
+        )
+        await session.execute(
+            sa.insert(bugs).values(
+                **{key: value.value if hasattr(value, "value") else value for key, value in bug.items()}
+            )
+        )
+        await session.execute(
+            sa.insert(comments),
+            [{**event.dict(), "id": event.id, "bug_id": bug_id, "author_id": user_id} for event in history[1:]],
+        )
+        await session.execute(
+            sa.insert(event_store),
+            [
+                {"id": uuid4(), "aggregate_id": bug_id, "event_name": event.name(), "event_data": event.dict()}
+                for event in history
+            ],
+        )
+        await session.commit()
+    return bug_id, user_id, history
+
+
+async def cleanup(bug_id, user_id):
+    assert async_transactional_session_factory is not None
+    async with async_transactional_session_factory() as session:
+        await session.execute(sa.delete(comments).where(comments.c.bug_id == bug_id))
+        await session.execute(sa.delete(bugs).where(bugs.c.id == bug_id))
+        await session.execute(sa.delete(users).where(users.c.id == user_id))
+        await session.execute(sa.delete(event_store).where(event_store.c.aggregate_id == bug_id))
+        await session.execute(sa.delete(snapshots).where(snapshots.c.aggregate_id == bug_id))
+        await session.commit()
+
+
+async def run(count: int):
+    assert async_transactional_session_factory is not None
+    bug_id, user_id, history = await seed(count)
+    try:
+        # a fresh session per load, the identity map is part of what a mapped aggregate costs
+        async def mapped():
+            session = async_transactional_session_factory()
+            bug = await BugRepository(session).get(bug_id, profile="comments")
+            await session.close()
+            return session, bug
+
+        async def folded():
+            async with async_transactional_session_factory() as session:
+                return await EventStoreRepository(session, snapshot_every=0).load(Bugs, bug_id)
+
+        async def page():
+            async with async_transactional_session_factory() as session:
+                return await get_bug_comments(session, bug_id, None, count_per_page=count)
+
+        report("mapped Bugs + Comments", count, *await measured(mapped))
+        report("event store fold", count, *await measured(folded))
+        report("slotted comment page", count, *await measured(page))
+
+        created = [dataclasses.asdict(event) for event in history[1:]]
+        report("events with __dict__", count, held(lambda: [DictCommentCreated(**data) for data in created]))
+        report("slotted events", count, held(lambda: [events.CommentCreated(**data) for data in created]))
+    finally:
+        await cleanup(bug_id, user_id)
+
+
+async def main(counts: list[int]):
+    assert engine is not None
+    try:
+        for count in counts:
+            await run(count)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--comments", type=int, nargs="+", default=[10, 1_000, 10_000])
+    args = parser.parse_args()
+    asyncio.run(main(args.comments))
@@ -0,0 +1,101 @@
+# loading a bug with a long history: replaying every event vs the latest snapshot and what came after it
+# usage: make bench BENCH=aggregate_snapshots ARGS="--events 10000 --tail 50"
+import argparse
+import asyncio
+import statistics
+import time
+from uuid import uuid4
+
+import sqlalchemy as sa
+
+from app.adapters.orm import event_store, snapshots
+from app.common.db import async_transactional_session_factory, engine
+from app.domain.enums import BugStatusEnum, EnvironmentEnum, RecordStatusEnum, UrgencyEnum
+from app.domain.events import Event
+from app.domain.models import Bugs
+from app.service.bugs import events
+from app.service.event_store.repository import EventStoreRepository
+
+
+def history(bug_id, author_id, count: int) -> list[Event]:
+    bug = {
+        "id": bug_id,
+        "title": "long lived bug",
+        "author_id": author_id,
+        "assignee_id": None,
+        "description": "it keeps coming back",
+        "environment": EnvironmentEnum.PROD,
+        "urgency": UrgencyEnum.HIGH,
+        "status": BugStatusEnum.IN_PROGRESS,
+        "record_status": RecordStatusEnum.ACTIVE,
+        "version": 1,
+        "edited": False,
+        "images": [],
+    }
+    out: list[Event] = [events.BugCreated(**bug)]
+    comment_ids = []
+    while len(out) < count:
+        i = len(out)
+        if i % 5 == 1 or not comment_ids:
+            comment_ids.append(uuid4())
+            out.append(events.CommentCreated(id=comment_ids[-1], bug_id=bug_id, author_id=author_id, text=f"#{i}"))
+        elif i % 50 == 0:
+            out.append(events.BugUpdated(**{**bug, "version": i, "edited": True}))
+        elif i % 7 == 0:
+            out.append(
+                events.CommentUpdated(id=comment_ids[-1], bug_id=bug_id, author_id=author_id, text=f"#{i}", edited=True)
+            )
+        else:
+            out.append(events.Upvoted(comment_id=comment_ids[i % len(comment_ids)], user_id=uuid4()))
+    return out
+
+
+async def timed_loads(repeat: int, snapshot_every: int, bug_id) -> list[float]:
+    assert async_transactional_session_factory is not None
+    timings = []
+    for _ in range(repeat):
+        async with async_transactional_session_factory() as session:
+            start = time.perf_counter()
+            await EventStoreRepository(session, snapshot_every=snapshot_every).load(Bugs, bug_id)
+            timings.append((time.perf_counter() - start) * 1000)
+            await session.commit()
+    return timings
+
+
+def report(label: str, timings: list[float]):
+    print(f"{label:<24} n={len(timings):<3} p50={statistics.median(timings):9.2f}ms max={max(timings):9.2f}ms")
+
+
+async def main(count: int, tail: int, repeat: int):
+    assert async_transactional_session_factory is not None and engine is not None
+    bug_id, author_id = uuid4(), uuid4()
+    rows = [
+        {"id": uuid4(), "aggregate_id": bug_id, "event_name": event.name(), "event_data": event.dict()}
+        for event in history(bug_id, author_id, count + tail)
+    ]
+    try:
+        async with async_transactional_session_factory() as session:
+            await session.execute(sa.insert(event_store), rows[:count])
+            await session.commit()
+        report(f"full replay, {count}", await timed_loads(repeat, 0, bug_id))
+
+        await timed_loads(1, count, bug_id)  # leaves a snapshot at version count
+        async with async_transactional_session_factory() as session:
+            await session.execute(sa.insert(event_store), rows[count:])
+            await session.commit()
+        report(f"snapshot + {tail}", await timed_loads(repeat, 0, bug_id))
+    finally:
+        async with async_transactional_session_factory() as session:
+            await session.execute(sa.delete(event_store).where(event_store.c.aggregate_id == bug_id))
+            await session.execute(sa.delete(snapshots).where(snapshots.c.aggregate_id == bug_id))
+            await session.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=10_000)
+    parser.add_argument("--tail", type=int, default=50, help="events written after the snapshot")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.events, args.tail, args.repeat))
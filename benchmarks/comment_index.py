@@ -0,0 +1,91 @@
+# comment votes, edits and deletes on a bug with a lot of comments: scanning the list like Bugs used to
+# vs the id index it keeps now, first op on a freshly loaded bug (index build included) and the ones after
+# usage: make bench BENCH=comment_index ARGS="--comments 1000 10000 50000"
+import argparse
+import gc
+import random
+import time
+from dataclasses import replace
+from typing import Any, Callable
+from uuid import UUID, uuid4
+
+from app.adapters.orm import start_mappers
+from app.domain.models import Bugs, Comments
+from app.service.bugs import events
+
+
+# what Bugs.find_comment and delete_comment did before the index
+def scanned_find(bug: Bugs, ident: UUID) -> Comments | None:
+    comment = [c for c in bug.comments if c.id == ident]
+    if comment:
+        return comment[0]
+    return None
+
+
+def scanned_upvote(bug: Bugs, ident: UUID, data: dict[str, Any]):
+    comment = scanned_find(bug, ident)
+    if comment:
+        comment.upvote()
+        bug.events.append(events.Upvoted(comment_id=ident))
+
+
+def scanned_update(bug: Bugs, ident: UUID, data: dict[str, Any]):
+    comment = scanned_find(bug, ident)
+    if comment:
+        comment.update_comment(data)
+        bug.events.append(replace(events.CommentUpdated(**data), edited=True))
+
+
+def scanned_delete(bug: Bugs, ident: UUID, data: dict[str, Any]):
+    comment = scanned_find(bug, ident)
+    if comment:
+        idx = bug.comments.index(comment)
+        bug.events.append(events.CommentDeleted(id=comment.id))
+        bug.comments.pop(idx)
+
+
+def loaded(count: int) -> Bugs:
+    # comments appended straight to the list like a load does, nothing indexed yet
+    bug = Bugs(title="long lived bug", author_id=uuid4())
+    for i in range(count):
+        bug.comments.append(Comments(bug_id=bug.id, author_id=bug.author_id, text=f"comment #{i}"))
+    return bug
+
+
+def timed(count: int, ops: int, op: Callable[[Bugs, UUID, dict[str, Any]], Any]) -> tuple[float, float]:
+    bug = loaded(count)
+    targets = random.Random(count).sample([comment.id for comment in bug.comments], ops + 1)
+    data = [{"id": t, "bug_id": bug.id, "author_id": bug.author_id, "text": "edited", "edited": True} for t in targets]
+    gc.collect()
+    start = time.perf_counter()
+    op(bug, targets[0], data[0])
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    for target, values in zip(targets[1:], data[1:]):
+        op(bug, target, values)
+    return first * 1e6, (time.perf_counter() - start) / ops * 1e6
+
+
+def main(counts: list[int], ops: int):
+    start_mappers()  # the instrumented classes the handlers get
+    cases = {
+        "upvote_comment": (scanned_upvote, lambda bug, ident, data: bug.upvote_comment(ident)),
+        "update_comment": (scanned_update, lambda bug, ident, data: bug.update_comment(ident, data)),
+        "delete_comment": (scanned_delete, lambda bug, ident, data: bug.delete_comment(ident)),
+    }
+    for count in counts:
+        for label, (before, after) in cases.items():
+            scan_first, scan = timed(count, ops, before)
+            index_first, index = timed(count, ops, after)
+            print(
+                f"{label:<15} comments={count:<6} scan first={scan_first:9.1f}us then={scan:9.1f}us  "
+                f"index first={index_first:9.1f}us then={index:7.1f}us  x{scan / index:7.1f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--comments", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--ops", type=int, default=200, help="per bug after the first")
+    args = parser.parse_args()
+    main(args.comments, args.ops)
@@ -0,0 +1,118 @@
+# a credential stuffing burst on one account from a handful of addresses, with and without the login throttle:
+# cpu burnt (argon2 runs on the hashing service's threads, process time counts them), what the attempts got back
+# and how long the account's owner waits to log in from their own address meanwhile
+# usage: make bench BENCH=credential_stuffing ARGS="--attempts 300 --ips 5 --concurrency 20"
+import argparse
+import asyncio
+import statistics
+import time
+from collections import Counter
+from uuid import uuid4
+
+import httpx
+import sqlalchemy as sa
+from argon2 import PasswordHasher
+
+from app.adapters.orm import users
+from app.common.db import async_autocommit_session_factory, engine
+from app.common.rate_limit import MemoryRateLimitBackend
+from app.common.settings import settings
+from app.domain.enums import RecordStatusEnum, UserTypeEnum
+from app.entrypoints import dependencies as deps
+from app.main import app
+from app.service.users.throttle import LoginThrottle
+
+PASSWORD = "correct horse battery staple"
+
+
+async def seed() -> tuple[str, str]:
+    assert async_autocommit_session_factory is not None
+    user_id = uuid4()
+    email = f"victim{user_id.hex[:8]}@example.com"
+    async with async_autocommit_session_factory() as session:
+        await session.execute(
+            sa.insert(users).values(
+                id=user_id,
+                username=f"victim{user_id.hex[:8]}",
+                email=email,
+                password=PasswordHasher().hash(PASSWORD),
+                user_type=UserTypeEnum.BACKEND.value,
+                user_status=RecordStatusEnum.ACTIVE.value,
+                is_admin=False,
+                security_question="?",
+                security_question_answer="!",
+            )
+        )
+    return str(user_id), email
+
+
+async def cleanup(user_id: str):
+    assert async_autocommit_session_factory is not None
+    async with async_autocommit_session_factory() as session:
+        await session.execute(sa.delete(users).where(users.c.id == user_id))
+
+
+def client(ip: str) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app, client=(ip, 4321)), base_url=settings.test_url)
+
+
+async def run(email: str, attempts: int, ips: int, concurrency: int) -> tuple[float, float, Counter, list[float]]:
+    login_url = app.url_path_for("login")
+    sem = asyncio.Semaphore(concurrency)
+    statuses: Counter = Counter()
+    owner: list[float] = []
+    done = asyncio.Event()
+    attackers = [client(f"203.0.113.{i + 1}") for i in range(ips)]
+
+    async def attempt(i: int):
+        async with sem:
+            res = await attackers[i % ips].post(login_url, data={"username": email, "password": f"guess {i}"})
+            statuses[res.status_code] += 1
+
+    async def log_in_as_owner():
+        async with client("198.51.100.7") as own:
+            while not done.is_set():
+                start = time.perf_counter()
+                await own.post(login_url, data={"username": email, "password": PASSWORD})
+                owner.append((time.perf_counter() - start) * 1000)
+                await asyncio.sleep(0.05)
+
+    cpu, wall = time.process_time(), time.perf_counter()
+    owner_task = asyncio.create_task(log_in_as_owner())
+    await asyncio.gather(*[attempt(i) for i in range(attempts)])
+    done.set()
+    await owner_task
+    cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+    for attacker in attackers:
+        await attacker.aclose()
+    return cpu, wall, statuses, owner
+
+
+async def main(attempts: int, ips: int, concurrency: int):
+    assert engine is not None
+    user_id, email = await seed()
+    try:
+        for label, throttle in (
+            ("no throttle", None),
+            ("login throttle", LoginThrottle(MemoryRateLimitBackend())),
+        ):
+            app.dependency_overrides[deps.get_login_throttle] = lambda: throttle
+            cpu, wall, statuses, owner = await run(email, attempts, ips, concurrency)
+            print(
+                f"{label:<15} cpu={cpu:6.2f}s wall={wall:6.2f}s cpu/attempt={cpu / attempts * 1000:6.1f}ms "
+                f"statuses={dict(statuses)} owner logins={len(owner)} p50={statistics.median(owner):7.1f}ms"
+            )
+    finally:
+        app.dependency_overrides.clear()
+        deps.PASSWORD_HASHER.shutdown()
+        await cleanup(user_id)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--attempts", type=int, default=300)
+    parser.add_argument("--ips", type=int, default=5, help="addresses the attempts are spread over")
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.attempts, args.ips, args.concurrency))
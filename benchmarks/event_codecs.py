@@ -0,0 +1,123 @@
+# event serialization per call: the reflection Event used to do vs the compiled codecs, plus json vs binary size
+# usage: make bench BENCH=event_codecs ARGS="--number 100000"
+import argparse
+import dataclasses
+import json
+import timeit
+import typing
+from typing import Any
+from uuid import UUID, uuid4
+
+from app.domain import codecs
+from app.domain.enums import BugStatusEnum, EnvironmentEnum, RecordStatusEnum, UrgencyEnum
+from app.domain.events import UNSET
+from app.domain.models import Bugs
+from app.service.bugs import events
+
+
+# what Event.dict/from_dict/name/apply did before the codecs, walking the fields where they walked __dict__
+# events have slots and no __dict__ now
+def reflected_dict(event: Any) -> dict[str, Any]:
+    out = {}
+    for key in (f.name for f in dataclasses.fields(event)):
+        value = getattr(event, key)
+        if value is UNSET:
+            continue
+        if isinstance(value, UUID):
+            value = str(value)
+        out[key] = value
+    return out
+
+
+def reflected_from_dict(cls: type, data: dict[str, Any]) -> Any:
+    hints = typing.get_type_hints(cls)
+    values = {}
+    for key, value in data.items():
+        if key not in hints:
+            continue
+        if isinstance(value, str) and (hints[key] is UUID or UUID in typing.get_args(hints[key])):
+            value = UUID(value)
+        values[key] = value
+    return cls(**values)
+
+
+def reflected_name(event: Any) -> str:
+    return event.__repr__().replace("()", "")
+
+
+def reflected_apply(event: Any, model: Any) -> Any:
+    for key in (f.name for f in dataclasses.fields(event)):
+        if hasattr(model, key):
+            val = getattr(event, key)
+            if val is not UNSET:
+                setattr(model, key, val)
+    return model
+
+
+def sample() -> list[events.Event]:
+    return [
+        events.BugCreated(
+            id=uuid4(),
+            title="flaky login on safari",
+            author_id=uuid4(),
+            assignee_id=uuid4(),
+            description="steps to reproduce: open the login page, type the password, submit",
+            environment=EnvironmentEnum.PROD,
+            urgency=UrgencyEnum.HIGH,
+            status=BugStatusEnum.NEW,
+            record_status=RecordStatusEnum.ACTIVE,
+            version=1,
+            edited=False,
+            images=["https://images.example.com/1.png"],
+        ),
+        events.BugUpdated(id=uuid4(), status=BugStatusEnum.IN_PROGRESS, version=2, edited=True),
+        events.Upvoted(comment_id=uuid4(), user_id=uuid4()),
+    ]
+
+
+def main(number: int):
+    batch = sample()
+    stored = [json.loads(json.dumps(event.dict())) for event in batch]
+    bug = Bugs()
+    cases = {
+        "dict": (
+            lambda: [reflected_dict(event) for event in batch],
+            lambda: [event.dict() for event in batch],
+        ),
+        "from_dict": (
+            lambda: [reflected_from_dict(type(event), data) for event, data in zip(batch, stored)],
+            lambda: [type(event).from_dict(data) for event, data in zip(batch, stored)],
+        ),
+        "name": (
+            lambda: [reflected_name(event) for event in batch],
+            lambda: [event.name() for event in batch],
+        ),
+        "apply": (
+            lambda: [reflected_apply(event, bug) for event in batch[:2]],
+            lambda: [event.apply(bug) for event in batch[:2]],
+        ),
+    }
+    for label, (before, after) in cases.items():
+        reflected = min(timeit.repeat(before, number=number, repeat=3)) / number / len(batch) * 1e6
+        compiled = min(timeit.repeat(after, number=number, repeat=3)) / number / len(batch) * 1e6
+        print(f"{label:<10} reflected={reflected:7.2f} us  compiled={compiled:7.2f} us  x{reflected / compiled:5.1f}")
+
+    packed = [codecs.pack(event) for event in batch]
+    pack = min(timeit.repeat(lambda: [codecs.pack(event) for event in batch], number=number, repeat=3))
+    unpack = min(
+        timeit.repeat(
+            lambda: [codecs.unpack(event.name(), data) for event, data in zip(batch, packed)], number=number, repeat=3
+        )
+    )
+    print(
+        f"{'pack':<10} {pack / number / len(batch) * 1e6:7.2f} us  unpack {unpack / number / len(batch) * 1e6:7.2f} us"
+    )
+    for event, data in zip(batch, packed):
+        print(f"{event.name():<12} json={len(json.dumps(event.dict())):4} bytes  binary={len(data):4} bytes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=100000)
+    args = parser.parse_args()
+    main(args.number)
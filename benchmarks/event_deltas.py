@@ -0,0 +1,89 @@
+# event store row size and WAL written for status-only edits: full BugUpdated payloads vs deltas
+# usage: make bench BENCH=event_deltas ARGS="--updates 5000"
+import argparse
+import asyncio
+import dataclasses
+from uuid import uuid4
+
+import sqlalchemy as sa
+
+from app.adapters.orm import event_store
+from app.common.db import async_transactional_session_factory, engine
+from app.domain.enums import BugStatusEnum, EnvironmentEnum, RecordStatusEnum, UrgencyEnum
+from app.domain.models import Bugs
+from app.service.bugs import events
+from app.service.event_store.writer import append_events, event_rows
+
+FIELDS = [field.name for field in dataclasses.fields(events.BugUpdated)]
+WAL_POSITION = "SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), '0/0')"
+STATUSES = [BugStatusEnum.NEW, BugStatusEnum.IN_PROGRESS, BugStatusEnum.RESOLVED]
+
+
+def updates(count: int, full: bool) -> list[events.Event]:
+    bug = Bugs.create_bug(
+        {
+            "title": "flaky login on safari",
+            "author_id": uuid4(),
+            "assignee_id": uuid4(),
+            "description": "steps to reproduce: " + "open the login page, type the password, submit. " * 20,
+            "environment": EnvironmentEnum.PROD,
+            "urgency": UrgencyEnum.HIGH,
+            "status": BugStatusEnum.NEW,
+            "record_status": RecordStatusEnum.ACTIVE,
+            "images": [f"https://images.example.com/{uuid4()}.png" for _ in range(3)],
+            "version": 1,
+            "edited": False,
+        }
+    )
+    out = []
+    for i in range(count):
+        bug.update_bug({"status": STATUSES[(i + 1) % len(STATUSES)]})
+        event = bug.events.pop()
+        out.append(events.BugUpdated(**{name: getattr(bug, name) for name in FIELDS}) if full else event)
+    return out
+
+
+async def write(label: str, batch: list[events.Event], bug_id):
+    assert async_transactional_session_factory is not None
+    async with async_transactional_session_factory() as session:
+        execution = await session.execute(sa.text(WAL_POSITION))
+        start = execution.scalar_one()
+        await session.commit()
+    for i in range(0, len(batch), 100):
+        async with async_transactional_session_factory() as session:
+            await append_events(session, event_rows((bug_id, event) for event in batch[i : i + 100]))
+            await session.commit()
+    async with async_transactional_session_factory() as session:
+        execution = await session.execute(
+            sa.select(
+                sa.text(f"({WAL_POSITION})"),
+                sa.select(sa.func.avg(sa.func.pg_column_size(event_store.c.event_data)))
+                .where(event_store.c.aggregate_id == bug_id)
+                .scalar_subquery(),
+            )
+        )
+        end, row_size = execution.one()
+    print(
+        f"{label:<8} n={len(batch):<6} "
+        f"event_data avg={float(row_size):8.1f} bytes  wal={int(end - start) / 1024:10.1f} KiB"
+    )
+
+
+async def main(count: int):
+    assert async_transactional_session_factory is not None and engine is not None
+    full_id, delta_id = uuid4(), uuid4()
+    try:
+        await write("full", updates(count, full=True), full_id)
+        await write("delta", updates(count, full=False), delta_id)
+    finally:
+        async with async_transactional_session_factory() as session:
+            await session.execute(sa.delete(event_store).where(event_store.c.aggregate_id.in_([full_id, delta_id])))
+            await session.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(main(args.updates))
@@ -0,0 +1,77 @@
+# event store append throughput: an INSERT per event vs one INSERT per transaction vs group commit
+# usage: make bench BENCH=event_store_append ARGS="--writers 1 10 100 --transactions 2000 --events 3"
+import argparse
+import asyncio
+import time
+from uuid import uuid4
+
+import sqlalchemy as sa
+
+from app.adapters.orm import event_store
+from app.common.db import async_transactional_session_factory, engine
+from app.service.bugs import events
+from app.service.event_store.writer import GroupCommitAppender, append_events, event_rows
+
+BUG_ID = uuid4()  # every appended event goes to this one throwaway aggregate
+
+
+def transaction_rows(count: int) -> list[dict]:
+    return event_rows([(BUG_ID, events.CommentDeleted(id=uuid4())) for _ in range(count)])
+
+
+async def per_event(rows: list[dict]):
+    assert async_transactional_session_factory is not None
+    async with async_transactional_session_factory() as session:
+        for row in rows:
+            await session.execute(sa.insert(event_store).values(row))
+        await session.commit()
+
+
+async def per_transaction(rows: list[dict]):
+    assert async_transactional_session_factory is not None
+    async with async_transactional_session_factory() as session:
+        await append_events(session, rows)
+        await session.commit()
+
+
+async def run(append, writers: int, transactions: int, events_per_transaction: int) -> float:
+    queue = [transaction_rows(events_per_transaction) for _ in range(transactions)]
+
+    async def writer():
+        while queue:
+            await append(queue.pop())
+
+    start = time.perf_counter()
+    await asyncio.gather(*[writer() for _ in range(writers)])
+    return time.perf_counter() - start
+
+
+async def main(writer_counts: list[int], transactions: int, events_per_transaction: int, window: float):
+    assert async_transactional_session_factory is not None and engine is not None
+    appender = GroupCommitAppender(async_transactional_session_factory, window=window)
+    modes = {"insert per event": per_event, "insert per transaction": per_transaction, "group commit": appender.append}
+    try:
+        for writers in writer_counts:
+            for label, append in modes.items():
+                seconds = await run(append, writers, transactions, events_per_transaction)
+                print(
+                    f"{label:<24} writers={writers:<4} "
+                    f"{transactions / seconds:9.0f} transactions/s "
+                    f"{transactions * events_per_transaction / seconds:9.0f} events/s"
+                )
+    finally:
+        await appender.stop()
+        async with async_transactional_session_factory() as session:
+            await session.execute(sa.delete(event_store).where(event_store.c.aggregate_id == BUG_ID))
+            await session.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--transactions", type=int, default=2000)
+    parser.add_argument("--events", type=int, default=3, help="events appended per transaction")
+    parser.add_argument("--window", type=float, default=0.002, help="group commit window in seconds")
+    args = parser.parse_args()
+    asyncio.run(main(args.writers, args.transactions, args.events, args.window))
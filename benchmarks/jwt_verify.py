@@ -0,0 +1,90 @@
+# what authenticating a request costs: validate_jwt_token as it was (key rebuilt and signature checked every call)
+# vs the verified token cache, per call and per request through decode_token
+# usage: make bench BENCH=jwt_verify ARGS="--number 20000 --requests 2000"
+import argparse
+import asyncio
+import time
+import timeit
+from uuid import uuid4
+
+import httpx
+from fastapi import Depends, FastAPI
+from jose import jwt
+
+from app.common import security
+from app.common.settings import settings
+from app.domain.common_schemas import Token
+from app.entrypoints import dependencies as deps
+
+
+# what validate_jwt_token did before
+def uncached(token: str) -> Token:
+    decoded_token = jwt.decode(token=token, key=settings.jwt_settings.secret_key.get_secret_value())
+    return Token(**decoded_token)
+
+
+def per_call(token: str, number: int):
+    cache = security.VerifiedTokens()
+    cases = {
+        "before": lambda: uncached(token),
+        "key once": lambda: security.validate_jwt_token(token),
+        "cached": lambda: security.validate_jwt_token(token, cache),
+    }
+    for label, case in cases.items():
+        elapsed = min(timeit.repeat(case, number=number, repeat=3)) / number * 1e6
+        print(f"validate   {label:<9} {elapsed:8.2f}us")
+
+
+async def per_request(token: str, user_id: str, requests: int):
+    app = FastAPI()
+
+    @app.get("/anonymous/{user_id}")
+    async def anonymous(user_id: str):
+        return "ok"
+
+    @app.get("/authenticated/{user_id}")
+    async def authenticated(user_id: str, token: Token = Depends(deps.decode_token)):
+        return "ok"
+
+    headers = {"Authorization": f"Bearer {token}"}
+    async with httpx.AsyncClient(app=app, base_url=settings.test_url, headers=headers) as client:
+
+        async def timed(path: str) -> float:
+            for _ in range(50):
+                await client.get(path)
+            start = time.perf_counter()
+            for _ in range(requests):
+                res = await client.get(path)
+            assert res.status_code == 200
+            return (time.perf_counter() - start) / requests * 1e6
+
+        baseline = await timed(f"/anonymous/{user_id}")
+        cache = deps.VERIFIED_TOKENS
+        deps.VERIFIED_TOKENS = None
+        without = await timed(f"/authenticated/{user_id}")
+        deps.VERIFIED_TOKENS = security.VerifiedTokens()
+        with_cache = await timed(f"/authenticated/{user_id}")
+        deps.VERIFIED_TOKENS = cache
+    print(
+        f"request    anonymous={baseline:7.1f}us  auth overhead without cache={without - baseline:7.1f}us  "
+        f"with cache={with_cache - baseline:7.1f}us"
+    )
+
+
+def main(number: int, requests: int):
+    user_id = str(uuid4())
+    token = security.create_jwt_token(
+        subject=user_id,
+        private_claims={"email": "bench@example.com", "user_type": "backend", "admin": False},
+        refresh=False,
+    )
+    per_call(token, number)
+    asyncio.run(per_request(token, user_id, requests))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.number, args.requests)
@@ -0,0 +1,89 @@
+# p99 latency of an unrelated GET while a login storm is running
+# usage: make bench BENCH=login_storm ARGS="--logins 200 --workers 4"
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from argon2 import PasswordHasher
+
+from app.common.settings import settings
+from app.main import app
+from app.service.hashing import PasswordHashingService
+
+PASSWORD = "correct horse battery staple"
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+async def measure_gets(client: httpx.AsyncClient, stop: asyncio.Event, interval: float) -> list[float]:
+    latencies: list[float] = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/health")
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def run(storm, logins: int, concurrency: int, interval: float) -> list[float]:
+    stop = asyncio.Event()
+    sem = asyncio.Semaphore(concurrency)
+
+    async def login():
+        async with sem:
+            await storm()
+
+    async with httpx.AsyncClient(app=app, base_url=settings.test_url) as client:
+        await client.get("/health")  # warm up
+        getter = asyncio.create_task(measure_gets(client, stop, interval))
+        await asyncio.gather(*[login() for _ in range(logins)])
+        stop.set()
+        return await getter
+
+
+def report(label: str, latencies: list[float]):
+    print(
+        f"{label:<24} n={len(latencies):<5} "
+        f"p50={statistics.median(latencies):8.2f}ms "
+        f"p99={percentile(latencies, 99):8.2f}ms "
+        f"max={max(latencies):8.2f}ms"
+    )
+
+
+async def main(logins: int, workers: int, concurrency: int, interval: float):
+    hasher = PasswordHasher()
+    hashed = hasher.hash(PASSWORD)
+    service = PasswordHashingService(hasher=hasher, max_workers=workers, max_queue=logins)
+
+    async def idle():
+        await asyncio.sleep(0.05)
+
+    async def inline_login():
+        hasher.verify(hashed, PASSWORD)
+        await asyncio.sleep(0)
+
+    async def offloaded_login():
+        await service.verify(hashed, PASSWORD)
+
+    try:
+        report("no storm", await run(idle, logins, concurrency, interval))
+        report("storm, inline argon2", await run(inline_login, logins, concurrency, interval))
+        report("storm, hashing service", await run(offloaded_login, logins, concurrency, interval))
+    finally:
+        service.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--interval", type=float, default=0.005)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.workers, args.concurrency, args.interval))
@@ -0,0 +1,102 @@
+# the user page read straight from postgres vs through the read cache, and a stampede of concurrent misses
+# on one user with and without single flight (queries run / time to serve all of them)
+# usage: make bench BENCH=read_cache ARGS="--reads 2000 --stampede 200"
+import argparse
+import asyncio
+import time
+from uuid import uuid4
+
+import sqlalchemy as sa
+
+from app.adapters.orm import users
+from app.common.cache import MemoryCache
+from app.common.db import async_autocommit_session_factory, engine
+from app.domain.enums import RecordStatusEnum, UserTypeEnum
+from app.service.read_cache import ReadCache
+from app.service.users.views import get_my_user_page
+
+
+async def seed():
+    assert async_autocommit_session_factory is not None
+    user_id = uuid4()
+    async with async_autocommit_session_factory() as session:
+        await session.execute(
+            sa.insert(users).values(
+                id=user_id,
+                username=f"cache{user_id.hex[:8]}",
+                email=f"cache{user_id.hex[:8]}@example.com",
+                password="not a hash",
+                user_type=UserTypeEnum.BACKEND.value,
+                user_status=RecordStatusEnum.ACTIVE.value,
+                is_admin=False,
+                security_question="?",
+                security_question_answer="!",
+            )
+        )
+    return user_id
+
+
+async def cleanup(user_id):
+    assert async_autocommit_session_factory is not None
+    async with async_autocommit_session_factory() as session:
+        await session.execute(sa.delete(users).where(users.c.id == user_id))
+
+
+async def sequential(user_id, reads: int, cache: ReadCache | None) -> float:
+    assert async_autocommit_session_factory is not None
+    start = time.perf_counter()
+    for _ in range(reads):
+        async with async_autocommit_session_factory() as session:  # a session per request like the routes
+            await get_my_user_page(session, user_id, cache)
+    return (time.perf_counter() - start) / reads * 1e6
+
+
+async def stampede(user_id, requests: int, single_flight: bool) -> tuple[int, float]:
+    assert async_autocommit_session_factory is not None
+    cache = ReadCache(MemoryCache())
+    queries = 0
+
+    async def request():
+        nonlocal queries
+        async with async_autocommit_session_factory() as session:
+            if single_flight:
+
+                async def load():
+                    nonlocal queries
+                    queries += 1
+                    return await get_my_user_page(session, user_id)
+
+                return await cache.get_or_load(user_id, load)
+            queries += 1
+            return await get_my_user_page(session, user_id)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[request() for _ in range(requests)])
+    return queries, (time.perf_counter() - start) * 1e3
+
+
+async def main(reads: int, requests: int):
+    assert engine is not None
+    user_id = await seed()
+    try:
+        await sequential(user_id, 50, None)  # warm up the pool and statement caches
+        direct = await sequential(user_id, reads, None)
+        cache = ReadCache(MemoryCache())
+        cached = await sequential(user_id, reads, cache)
+        print(f"user page  postgres={direct:8.1f}us  cached={cached:8.1f}us  x{direct / cached:6.1f}  {cache.stats()}")
+        for single_flight in (False, True):
+            queries, elapsed = await stampede(user_id, requests, single_flight)
+            print(
+                f"stampede   requests={requests:<5} single_flight={single_flight!s:<5} {queries=:<5} {elapsed:8.1f}ms"
+            )
+    finally:
+        await cleanup(user_id)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reads", type=int, default=2000)
+    parser.add_argument("--stampede", type=int, default=200, help="concurrent misses on one user")
+    args = parser.parse_args()
+    asyncio.run(main(args.reads, args.stampede))
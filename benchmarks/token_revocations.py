@@ -0,0 +1,108 @@
+# checking a token for revocation: a query against the revoked tokens table vs the per worker mirror,
+# with that many revoked tokens around and false positive rate of the bloom filter at its capacity
+# usage: make bench BENCH=token_revocations ARGS="--revoked 10000 100000 --checks 2000"
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import sqlalchemy as sa
+
+from app.adapters.orm import revoked_tokens, users
+from app.common.db import async_autocommit_session_factory, engine
+from app.common.security import create_jwt_token, validate_jwt_token
+from app.domain.enums import RecordStatusEnum, UserTypeEnum
+from app.service.users.tokens import TokenRevocations
+from app.utils.bloom_filter import BloomFilter
+
+
+async def seed(count: int):
+    assert async_autocommit_session_factory is not None
+    user_id = uuid4()
+    expires_at = datetime.now(timezone.utc) + timedelta(hours=1)
+    async with async_autocommit_session_factory() as session:
+        await session.execute(
+            sa.insert(users).values(
+                id=user_id,
+                username=f"revoked{user_id.hex[:8]}",
+                email=f"revoked{user_id.hex[:8]}@example.com",
+                password="not a hash",
+                user_type=UserTypeEnum.BACKEND.value,
+                user_status=RecordStatusEnum.ACTIVE.value,
+                is_admin=False,
+                security_question="?",
+                security_question_answer="!",
+            )
+        )
+        for start in range(0, count, 10000):
+            await session.execute(
+                sa.insert(revoked_tokens),
+                [
+                    {"user_id": user_id, "jti": uuid4().hex, "expires_at": expires_at}
+                    for _ in range(min(10000, count - start))
+                ],
+            )
+    return user_id
+
+
+async def cleanup(user_id):
+    assert async_autocommit_session_factory is not None
+    async with async_autocommit_session_factory() as session:
+        await session.execute(sa.delete(users).where(users.c.id == user_id))  # cascades to its revoked tokens
+
+
+async def run(count: int, checks: int):
+    assert async_autocommit_session_factory is not None
+    user_id = await seed(count)
+    try:
+        token = validate_jwt_token(create_jwt_token(subject=str(user_id), private_claims={}, refresh=False))
+        start = time.perf_counter()
+        for _ in range(checks):
+            async with async_autocommit_session_factory() as session:
+                execution = await session.execute(
+                    sa.select(sa.exists().where(revoked_tokens.c.jti == token.jti)),
+                )
+                execution.scalar_one()
+        queried = (time.perf_counter() - start) / checks * 1e6
+
+        revocations = TokenRevocations(async_autocommit_session_factory, capacity=count)
+        start = time.perf_counter()
+        await revocations.load()
+        loaded = (time.perf_counter() - start) * 1e3
+        start = time.perf_counter()
+        for _ in range(checks):
+            revocations.is_revoked(token)
+        mirrored = (time.perf_counter() - start) / checks * 1e6
+        print(
+            f"revoked={count:<7} query={queried:8.1f}us  mirror={mirrored:6.2f}us  x{queried / mirrored:8.0f}  "
+            f"load={loaded:7.1f}ms  filter={len(revocations.filter.bits) / 1024:7.1f}KiB"
+        )
+    finally:
+        await cleanup(user_id)
+
+
+def false_positives(capacity: int, error_rate: float) -> float:
+    bloom = BloomFilter(capacity, error_rate)
+    for _ in range(capacity):
+        bloom.add(uuid4().hex)
+    probes = 100000
+    return sum(uuid4().hex in bloom for _ in range(probes)) / probes
+
+
+async def main(counts: list[int], checks: int):
+    assert engine is not None
+    try:
+        for count in counts:
+            await run(count, checks)
+    finally:
+        await engine.dispose()
+    print(f"bloom filter false positives at capacity {false_positives(100000, 0.001):.4%} (error_rate 0.1%)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--revoked", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--checks", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args.revoked, args.checks))
@@ -0,0 +1,96 @@
+# finding a user by email among that many users: the old lookup, email = :email through list(), against
+# get_active_by_email on the unique partial index over lower(email), plus what each plans to
+# usage: make bench BENCH=user_email_lookup ARGS="--users 1000000 --lookups 500"
+import argparse
+import asyncio
+import time
+
+import sqlalchemy as sa
+
+from app.adapters.orm import users
+from app.common.db import async_autocommit_session_factory, engine
+from app.domain import enums
+from app.service.users.repository import UserRepository
+
+PREFIX = "lookupbench"
+
+
+async def seed(count: int):
+    assert async_autocommit_session_factory is not None
+    async with async_autocommit_session_factory() as session:
+        # generated server side, a million rows through the driver would take longer than the benchmark
+        await session.execute(
+            sa.text(
+                "INSERT INTO bug_tracker_users "
+                "(id, username, email, password, user_type, user_status, is_admin, "
+                "security_question, security_question_answer) "
+                "SELECT gen_random_uuid(), :prefix || n, :prefix || n || '@Example.com', 'not a hash', "
+                ":user_type, CASE WHEN n % 10 = 0 THEN 'deleted' ELSE 'active' END, false, '?', '!' "
+                "FROM generate_series(1, :count) AS n"
+            ),
+            {"prefix": PREFIX, "count": count, "user_type": enums.UserTypeEnum.BACKEND.value},
+        )
+        await session.execute(sa.text("ANALYZE bug_tracker_users"))
+
+
+async def cleanup():
+    assert async_autocommit_session_factory is not None
+    async with async_autocommit_session_factory() as session:
+        await session.execute(sa.delete(users).where(users.c.username.startswith(PREFIX)))
+
+
+async def explain(query) -> str:
+    assert async_autocommit_session_factory is not None
+    async with async_autocommit_session_factory() as session:
+        compiled = query.compile(engine, compile_kwargs={"literal_binds": True})
+        execution = await session.execute(sa.text(f"EXPLAIN {compiled}"))
+        return execution.scalars().first()
+
+
+async def timed(lookups: int, count: int, find) -> float:
+    assert async_autocommit_session_factory is not None
+    start = time.perf_counter()
+    for i in range(lookups):
+        async with async_autocommit_session_factory() as session:
+            n = (i * 7919) % count + 1
+            await find(UserRepository(session), f"{PREFIX}{n}@Example.com")
+    return (time.perf_counter() - start) / lookups * 1e3
+
+
+async def main(count: int, lookups: int):
+    assert engine is not None
+    start = time.perf_counter()
+    await seed(count)
+    print(f"seeded {count} users in {time.perf_counter() - start:.1f}s")
+    try:
+
+        async def listed(repo: UserRepository, email: str):
+            await repo.list(email__eq=email, user_status__eq=enums.RecordStatusEnum.ACTIVE, profile="credentials")
+
+        async def indexed(repo: UserRepository, email: str):
+            await repo.get_active_by_email(email)
+
+        email = f"{PREFIX}1@example.com"
+        async with async_autocommit_session_factory() as session:  # type: ignore
+            repo = UserRepository(session)
+            old = repo.profiles["credentials"].where(
+                users.c.email == email, users.c.user_status == enums.RecordStatusEnum.ACTIVE.value
+            )
+            new = repo.profiles["credentials"].where(
+                sa.func.lower(users.c.email) == sa.func.lower(email),
+                users.c.user_status == sa.literal_column("'active'"),
+            )
+        for label, find, query in (("list email__eq", listed, old), ("get_active_by_email", indexed, new)):
+            per_lookup = await timed(lookups if find is indexed else max(1, lookups // 50), count, find)
+            print(f"{label:<20} {per_lookup:9.3f}ms/lookup  {await explain(query)}")
+    finally:
+        await cleanup()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=500, help="the sequential scan runs a 50th of them")
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.lookups))